@@ -0,0 +1,180 @@
+import json
+import math
+import sqlite3
+
+import numpy as np
+
+# Dense answer codes, as the page reports them: one character per question
+SKIPPED = ord('-')
+UNANSWERED = ord('.')
+# Key character for questions no single-character pick can answer (missing or multi-character answer)
+NO_KEY = '!'
+
+# Share of attempts in each of the upper and lower groups for the discrimination index
+GROUP_FRACTION = 0.27
+
+def js_string(value):
+    """String a value the way a JavaScript template literal would"""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(value)
+
+def _marks(value, default):
+    # Mirrors `question.plus_marks || 4`: missing or zero marks fall back to the default
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and value else default
+
+class AnswerKey:
+    """Correct options and marks of one test, in the dense one-character-per-question form"""
+
+    def __init__(self, test_key, answers, plus, minus):
+        self.test_key = test_key
+        self.answers = answers
+        self.plus = np.asarray(plus, dtype=np.float64)
+        self.minus = np.asarray(minus, dtype=np.float64)
+        self.codes = np.frombuffer(answers.encode('latin-1'), dtype=np.uint8)
+
+    @classmethod
+    def from_items(cls, test_key, items):
+        """Build the key from test data items"""
+        builder = AnswerKeyBuilder()
+        for item in items:
+            builder.add(item)
+        return builder.finish(test_key)
+
+    def __len__(self):
+        return len(self.answers)
+
+class AnswerKeyBuilder:
+    """Collects an AnswerKey one item at a time, e.g. from the items a render job streams past"""
+
+    def __init__(self):
+        self.answers = []
+        self.plus = []
+        self.minus = []
+
+    def add(self, item):
+        answer = js_string(item['answer']) if 'answer' in item else "undefined"
+        self.answers.append(answer if len(answer) == 1 and answer.isascii() else NO_KEY)
+        self.plus.append(_marks(item.get('plus_marks'), 4.0))
+        self.minus.append(_marks(item.get('minus_marks'), 1.0))
+
+    def finish(self, test_key):
+        """The AnswerKey, stored and reported under test_key (the page's content key)"""
+        return AnswerKey(test_key, "".join(self.answers), self.plus, self.minus)
+
+def load_answer_key(db_path, test_key):
+    """AnswerKey registered for test_key, or None"""
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = db.execute(
+            "SELECT answers, plus_marks, minus_marks FROM tests WHERE test_key = ?", (test_key,)
+        ).fetchone()
+    finally:
+        db.close()
+    if row is None:
+        return None
+    return AnswerKey(test_key, row[0], json.loads(row[1]), json.loads(row[2]))
+
+def load_attempts(db_path, key):
+    """Dense answers matrix (attempts x questions, uint8 codes) and the user id of each row
+
+    Records whose answers do not cover the whole test are left out.
+    """
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            "SELECT user_id, answers FROM results WHERE test_key = ? AND length(answers) = ?",
+            (key.test_key, len(key))
+        ).fetchall()
+    finally:
+        db.close()
+    users = [user for user, _ in rows]
+    text = "".join(answers for _, answers in rows)
+    # The page only sends ASCII codes; anything else cannot match a key and counts as a wrong pick
+    data = text.encode('ascii', errors='replace')
+    matrix = np.frombuffer(data, dtype=np.uint8).reshape(len(rows), len(key))
+    return users, matrix
+
+def percentile_ranks(scores):
+    """Percent of attempts scoring below each attempt, counting ties as half"""
+    ordered = np.sort(scores)
+    below = np.searchsorted(ordered, scores, side='left')
+    at_or_below = np.searchsorted(ordered, scores, side='right')
+    return (below + at_or_below) * (50.0 / max(len(scores), 1))
+
+def analyze(key, matrix):
+    """Score every attempt and compute per-question statistics in bulk
+
+    Scoring follows submitTest: a correct pick earns plus marks, any other pick loses
+    minus marks, and skipped or unanswered questions score nothing. Returns arrays
+    indexed by attempt (scores, percentiles) or by question (difficulty etc.).
+    """
+    attempts, questions = matrix.shape
+    correct = matrix == key.codes
+    picked = (matrix != SKIPPED) & (matrix != UNANSWERED)
+    incorrect = picked & ~correct
+    scores = correct @ key.plus - incorrect @ key.minus
+    correct_counts = correct.sum(axis=1)
+    incorrect_counts = incorrect.sum(axis=1)
+
+    # Classical difficulty: share of attempts answering correctly
+    difficulty = correct.mean(axis=0) if attempts else np.zeros(questions)
+
+    # Upper-lower discrimination index over the top and bottom GROUP_FRACTION by score
+    group = max(1, math.ceil(attempts * GROUP_FRACTION)) if attempts else 0
+    order = np.argsort(scores, kind='stable')
+    lower, upper = order[:group], order[attempts - group:]
+    if group:
+        discrimination = correct[upper].mean(axis=0) - correct[lower].mean(axis=0)
+    else:
+        discrimination = np.zeros(questions)
+
+    # Distractor analysis: how often each code was picked, overall and by group
+    codes = np.unique(matrix)
+    picks = {}
+    for code in codes:
+        chosen = matrix == code
+        picks[chr(code)] = {
+            "all": chosen.sum(axis=0),
+            "upper": chosen[upper].sum(axis=0),
+            "lower": chosen[lower].sum(axis=0),
+        }
+    # A distractor that pulls the upper group more than the lower group usually means an ambiguous question
+    misleading = np.zeros(questions, dtype=bool)
+    for option, counts in picks.items():
+        if ord(option) in (SKIPPED, UNANSWERED):
+            continue
+        distractor = key.codes != ord(option)
+        misleading |= distractor & (counts["upper"] > counts["lower"])
+
+    return {
+        "attempts": attempts,
+        "scores": scores,
+        "percentiles": percentile_ranks(scores),
+        "correct": correct_counts,
+        "incorrect": incorrect_counts,
+        "skipped": questions - correct_counts - incorrect_counts,
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "picks": picks,
+        "misleading": misleading,
+    }
+
+def test_stats(db_path, test_key):
+    """Load and analyze every complete attempt at test_key; None if the test is unknown"""
+    key = load_answer_key(db_path, test_key)
+    if key is None:
+        return None
+    users, matrix = load_attempts(db_path, key)
+    stats = analyze(key, matrix)
+    stats["users"] = users
+    stats["questions"] = len(key)
+    return stats
@@ -0,0 +1,193 @@
+"""Render folders of test JSON to HTML offline
+
+    python batch_generate.py INPUT [INPUT ...] [-o OUTPUT_DIR] [--workers N] [--user-id LABEL]
+                             [--theme dark|light] [--device desktop|mobile] [--force]
+
+INPUT is a JSON file, a directory (searched recursively for *.json) or a glob
+pattern. Outputs mirror the input layout as <name>.html; each page carries every
+theme x device variant, and --theme/--device only pick the view it opens in.
+A manifest in the output directory records each input's mtime, size and hash,
+so re-runs only render files that changed or moved to another initial view.
+No bot token or network access is needed.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from schema import validate_test
+from template_engine import DEVICES, THEMES
+
+MANIFEST_NAME = ".manifest.json"
+
+# Generator built once per worker process
+_generator = None
+
+# mkstemp creates files as 0600; outputs get the mode open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _init_worker():
+    global _generator
+    from main import PremiumTestGenerator
+    _generator = PremiumTestGenerator()
+
+def render_file(path, outputs, user_id):
+    """Parse one input and write its pages; runs inside the pool
+
+    outputs maps "theme/device" initial views to output paths. Returns the bytes written per view.
+    """
+    with open(path, 'rb') as f:
+        json_data = json.loads(f.read())
+    validate_test(json_data)
+    written = {}
+    for variant, output_path in outputs.items():
+        theme, device = variant.split('/')
+        html = _generator.render_premium_html_test(json_data, user_id, theme=theme, device=device)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        write_atomic(output_path, html)
+        written[variant] = len(html)
+    return written
+
+def write_atomic(path, data):
+    """Replace path with data through a temp file of its own, so concurrent writers never share one"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def find_inputs(patterns):
+    """Expand files, directories and globs into a sorted list of JSON paths"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '**', '*.json'), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.update(os.path.abspath(match) for match in matches if os.path.isfile(match))
+    return sorted(paths)
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(output_dir, manifest):
+    data = json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8')
+    write_atomic(os.path.join(output_dir, MANIFEST_NAME), data)
+
+def plan(inputs, output_dir, manifest, settings, variant, force=False):
+    """Work list of (path, stat, hash, {variant: output path}); unchanged inputs are left out"""
+    root = os.path.commonpath([os.path.dirname(path) for path in inputs])
+    jobs = []
+    for path in inputs:
+        stat = os.stat(path)
+        rel = os.path.splitext(os.path.relpath(path, root))[0]
+        outputs = {variant: os.path.join(output_dir, f"{rel}.html")}
+        entry = manifest.get(path)
+        digest = None
+        if entry and not force and entry.get('settings') == settings:
+            if (entry['mtime_ns'], entry['size']) != (stat.st_mtime_ns, stat.st_size):
+                # Touched but maybe not edited; only the hash decides
+                digest = file_hash(path)
+                if digest != entry['sha256']:
+                    entry = None
+            if entry:
+                outputs = {
+                    variant: output_path for variant, output_path in outputs.items()
+                    if entry['variants'].get(variant) != output_path or not os.path.exists(output_path)
+                }
+        if outputs:
+            jobs.append((path, stat, digest, outputs))
+        elif digest:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="JSON files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="generated")
+    parser.add_argument("--workers", type=int, default=0, help="render processes (default: one per CPU)")
+    parser.add_argument("--user-id", default="offline", help="label printed in the page header")
+    parser.add_argument("--theme", choices=list(THEMES), default="dark", help="initial theme")
+    parser.add_argument("--device", choices=DEVICES, default="desktop", help="initial device view")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and render everything")
+    args = parser.parse_args()
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print("No JSON inputs found", file=sys.stderr)
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_dir = os.path.abspath(args.output_dir)
+
+    # Outputs rendered with other templates or settings are stale even if the input is unchanged
+    from main import Config
+    config = Config()
+    from template_engine import TemplateEngine
+    fingerprint = TemplateEngine(**config.engine_options()).fingerprint
+    settings = f"{fingerprint}|{config.PAYLOAD_MODE}|{args.user_id}"
+    variant = f"{args.theme}/{args.device}"
+
+    manifest = load_manifest(output_dir)
+    jobs = plan(inputs, output_dir, manifest, settings, variant, args.force)
+    skipped = len(inputs) - len(jobs)
+    print(f"{len(inputs)} inputs, {len(jobs)} to render, {skipped} unchanged")
+
+    start = time.perf_counter()
+    pages = 0
+    out_bytes = 0
+    in_bytes = 0
+    failed = 0
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(render_file, path, outputs, args.user_id): (path, stat, digest, outputs)
+                       for path, stat, digest, outputs in jobs}
+            for future in as_completed(futures):
+                path, stat, digest, outputs = futures[future]
+                try:
+                    written = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"FAILED {path}: {e}", file=sys.stderr)
+                    for error in getattr(e, 'errors', ()):
+                        print(f"    {error}", file=sys.stderr)
+                    continue
+                pages += len(written)
+                out_bytes += sum(written.values())
+                in_bytes += stat.st_size
+                # Each output holds one initial view, so the latest render replaces what was recorded
+                manifest[path] = {
+                    "settings": settings, "variants": outputs, "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size, "sha256": digest or file_hash(path),
+                }
+    finally:
+        save_manifest(output_dir, manifest)
+
+    elapsed = time.perf_counter() - start
+    rate = lambda n: n / elapsed if elapsed else 0.0
+    print(f"Rendered {len(jobs) - failed} files ({pages} pages, {out_bytes / 1024 / 1024:.1f} MiB) "
+          f"in {elapsed:.2f}s with {workers} workers; {skipped} skipped, {failed} failed")
+    print(f"Throughput: {rate(len(jobs) - failed):.1f} files/s, {rate(pages):.1f} pages/s, "
+          f"{rate(in_bytes) / 1024 / 1024:.1f} MiB/s in, {rate(out_bytes) / 1024 / 1024:.1f} MiB/s out")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
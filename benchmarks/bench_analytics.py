@@ -0,0 +1,88 @@
+"""/stats cost over a results database: NumPy matrix analytics vs. scoring attempt by attempt
+
+    python benchmarks/bench_analytics.py [attempts] [questions]
+
+Fills a temporary results database with synthetic attempts at one test, then times
+analytics.test_stats end to end (SQLite read + analysis) and a pure-Python baseline
+that scores each attempt the way submitTest does and tallies per-question counts.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analytics import AnswerKey, load_answer_key, load_attempts, test_stats
+from results_store import ResultStore
+
+def make_test(questions):
+    return [{"id": str(i + 1), "answer": "abcd"[i % 4], "plus_marks": 4, "minus_marks": 1} for i in range(questions)]
+
+def make_answers(rng, key, ability):
+    out = []
+    for answer in key.answers:
+        roll = rng.random()
+        if roll < 0.1:
+            out.append(rng.choice("-."))
+        elif roll < 0.1 + 0.9 * ability:
+            out.append(answer)
+        else:
+            out.append(rng.choice("abcd"))
+    return "".join(out)
+
+async def fill(path, key, attempts):
+    rng = random.Random(1)
+    store = ResultStore(path, batch_size=5000)
+    await store.register_test(key)
+    for i in range(attempts):
+        store.add((key.test_key, str(i), 0.0, 0, 0, 0, 0, make_answers(rng, key, rng.random())))
+        if len(store.pending) >= 5000:
+            await store.flush()
+    await store.close()
+
+def python_stats(db_path, test_key):
+    """Baseline: per-attempt loops over the same rows"""
+    key = load_answer_key(db_path, test_key)
+    _, matrix = load_attempts(db_path, key)
+    correct_by_question = [0] * len(key)
+    scores = []
+    for row in matrix.tolist():
+        score = 0.0
+        for index, code in enumerate(row):
+            char = chr(code)
+            if char == key.answers[index]:
+                score += key.plus[index]
+                correct_by_question[index] += 1
+            elif char not in "-.":
+                score -= key.minus[index]
+        scores.append(score)
+    ordered = sorted(scores)
+    return [sum(1 for other in ordered if other < score) for score in scores[:100]]
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    attempts = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    key = AnswerKey.from_items("bench", make_test(questions))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.sqlite3")
+        asyncio.run(fill(path, key, attempts))
+        load = best_of(lambda: load_attempts(path, key))
+        total = best_of(lambda: test_stats(path, key.test_key))
+        print(f"{attempts} attempts x {questions} questions")
+        print(f"  numpy test_stats: {total * 1000:8.1f} ms ({load * 1000:.1f} ms of it loading from SQLite)")
+        baseline = best_of(lambda: python_stats(path, key.test_key), repeat=1)
+        print(f"  python loops:     {baseline * 1000:8.1f} ms (scores, per-question correct counts and 100 ranks only)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Bytes written to disk per handled upload, in-memory pipeline vs. spilling every upload
+
+Uses the write character count from /proc/self/io (Linux), which includes
+the render cache's disk tier and the file_id index.
+
+    python benchmarks/bench_disk_io.py [uploads] [questions]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from fake_telegram import make_upload
+from synthetic import make_test_bank
+
+def written_bytes():
+    with open('/proc/self/io') as f:
+        for line in f:
+            if line.startswith('wchar:'):
+                return int(line.split()[1])
+    return 0
+
+async def handle_all(bot, uploads):
+    for update in uploads:
+        await bot.handle_json_file(update, None)
+
+def run(spill_threshold, uploads, questions, repeat):
+    from main import TelegramTestBot
+    from render_pool import RenderPool
+    os.environ['SPILL_THRESHOLD'] = str(spill_threshold)
+    bot = TelegramTestBot()
+    bot.render_pool.shutdown()
+    # Thread workers keep every write inside this process's counters
+    bot.render_pool = RenderPool(executor="thread", workers=2)
+    banks = [json.dumps(make_test_bank(questions + i), ensure_ascii=False).encode('utf-8') for i in range(uploads)]
+    if repeat:
+        banks = [banks[0]] * uploads
+    updates = [make_upload(1000 + i, content, latency=0) for i, content in enumerate(banks)]
+    before = written_bytes()
+    asyncio.run(handle_all(bot, updates))
+    written = written_bytes() - before
+    bot.render_pool.shutdown()
+    bot.file_ids.close()
+    return written / uploads, sum(len(content) for content in banks) / uploads
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    print(f"{'mode':>22} {'upload KiB':>11} {'disk KiB/request':>17}")
+    cwd = os.getcwd()
+    for label, threshold, repeat in (
+        ("spill every upload", 0, False),
+        ("in memory", 1 << 40, False),
+        ("in memory, repeats", 1 << 40, True),
+    ):
+        # A fresh working directory per mode, so no mode starts with another's cache
+        with tempfile.TemporaryDirectory(prefix="bench_disk_io_") as workdir:
+            os.chdir(workdir)
+            try:
+                per_request, upload_size = run(threshold, uploads, questions, repeat)
+            finally:
+                os.chdir(cwd)
+        print(f"{label:>22} {upload_size / 1024:>11.0f} {per_request / 1024:>17.1f}")
+
+if __name__ == "__main__":
+    main()
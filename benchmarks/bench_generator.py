@@ -0,0 +1,161 @@
+"""Generator regression suite: time, peak memory and output size across question banks
+
+    python benchmarks/bench_generator.py [--save] [--quick] [-k FILTER] [--baseline PATH]
+                                         [--time-threshold 0.25] [--memory-threshold 0.15]
+                                         [--size-threshold 0.05]
+
+Runs PremiumTestGenerator.generate_premium_html_test and the older
+TestSeriesGenerator.generate_html_test (main.pyttt) over synthetic banks of 10
+to 50,000 questions with 4 or 8 options, ASCII or Hindi text, long text and
+embedded media. Time is the best of repeated runs; peak memory is the
+tracemalloc high-water mark of one call; output size is UTF-8 bytes.
+
+--save records the results as the baseline (run it on the reference commit);
+later runs compare against it and exit 1 if any case got slower, hungrier or
+bigger than the thresholds allow. Timings only compare on the same machine,
+so differences under --min-ms are ignored as noise.
+"""
+import argparse
+import importlib.machinery
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from synthetic import ROOT, make_test_bank
+
+SIZES = (10, 100, 1000, 10000, 50000)
+
+# name -> (make_test_bank arguments, largest bank it is run at)
+VARIANTS = {
+    "ascii-4opt": ({}, 50000),
+    "ascii-8opt": ({"num_options": 8}, 50000),
+    "hindi-4opt": ({"hindi": True}, 50000),
+    "longtext-4opt": ({"text_size": 2000}, 10000),
+    "media16k-4opt": ({"media_bytes": 16 * 1024}, 1000),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generator_baseline.json")
+
+def load_legacy_generator():
+    """TestSeriesGenerator from main.pyttt, which is not importable by name"""
+    loader = importlib.machinery.SourceFileLoader("main_legacy", os.path.join(ROOT, "main.pyttt"))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    return module.TestSeriesGenerator()
+
+def generators():
+    from main import PremiumTestGenerator
+    premium = PremiumTestGenerator()
+    legacy = load_legacy_generator()
+    return {
+        "premium": lambda json_data: premium.generate_premium_html_test(json_data, 123456789),
+        "legacy": lambda json_data: legacy.generate_html_test(json_data, 123456789),
+    }
+
+def cases(quick, pattern):
+    for variant, (options, largest) in VARIANTS.items():
+        for size in SIZES:
+            if size > largest or (quick and size > 1000):
+                continue
+            name = f"{variant}-{size}"
+            if pattern and pattern not in name:
+                continue
+            yield name, size, options
+
+def best_time(fn, budget=1.0, max_runs=20):
+    """Best wall time over as many runs as fit in budget seconds (at least 2)"""
+    start = time.perf_counter()
+    fn()
+    times = [time.perf_counter() - start]
+    while len(times) < 2 or (len(times) < max_runs and sum(times) < budget):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def peak_memory(fn):
+    """(tracemalloc peak in bytes, result) of one call"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, result
+
+def measure(quick, pattern):
+    results = {}
+    runners = generators()
+    for name, size, options in cases(quick, pattern):
+        json_data = make_test_bank(size, **options)
+        for generator, run in runners.items():
+            peak, output = peak_memory(lambda: run(json_data))
+            output_bytes = len(output.encode('utf-8'))
+            del output
+            seconds = best_time(lambda: run(json_data))
+            results[f"{generator}/{name}"] = {
+                "questions": size,
+                "ms": seconds * 1000,
+                "peak_mib": peak / 1024 / 1024,
+                "output_kib": output_bytes / 1024,
+            }
+            yield f"{generator}/{name}", results[f"{generator}/{name}"]
+
+def regressions(current, baseline, args):
+    """Reasons this case regressed against its baseline entry, if any"""
+    problems = []
+    if current["ms"] - baseline["ms"] > args.min_ms and current["ms"] > baseline["ms"] * (1 + args.time_threshold):
+        problems.append(f"time +{current['ms'] / baseline['ms'] - 1:.0%}")
+    if current["peak_mib"] > baseline["peak_mib"] * (1 + args.memory_threshold) + 0.1:
+        problems.append(f"memory +{current['peak_mib'] / baseline['peak_mib'] - 1:.0%}")
+    if current["output_kib"] > baseline["output_kib"] * (1 + args.size_threshold) + 1:
+        problems.append(f"size +{current['output_kib'] / baseline['output_kib'] - 1:.0%}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", action="store_true", help="record this run as the baseline")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--quick", action="store_true", help="only banks of up to 1000 questions")
+    parser.add_argument("-k", dest="pattern", help="only cases whose name contains this")
+    parser.add_argument("--time-threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.15)
+    parser.add_argument("--size-threshold", type=float, default=0.05)
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    if not args.save and not baseline:
+        print(f"No baseline at {args.baseline}; run with --save on the reference commit to create one")
+
+    print(f"{'case':>30} {'ms':>9} {'peak MiB':>9} {'out KiB':>10} {'vs baseline':>28}")
+    results = {}
+    failed = []
+    for name, result in measure(args.quick, args.pattern):
+        results[name] = result
+        status = ""
+        if name in baseline:
+            before = baseline[name]
+            problems = regressions(result, before, args)
+            status = "REGRESSED " + ", ".join(problems) if problems else \
+                f"ok ({result['ms'] / before['ms'] - 1:+.0%} time)"
+            if problems:
+                failed.append(name)
+        print(f"{name:>30} {result['ms']:9.1f} {result['peak_mib']:9.1f} {result['output_kib']:10.0f} {status:>28}")
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for {len(results)} cases to {args.baseline}")
+    elif failed:
+        print(f"{len(failed)} of {len(results)} cases regressed: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
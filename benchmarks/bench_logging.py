@@ -0,0 +1,86 @@
+"""Time spent in logger.info() on the calling (event loop) thread: FileHandler vs. the queued setup
+
+    python benchmarks/bench_logging.py [records]
+
+"direct" is the old basicConfig setup (FileHandler + StreamHandler written inline);
+"queued" is log_config.setup_logging, where the caller only enqueues the record.
+Records are paced like a busy bot rather than logged in a tight loop, and the
+"stalling disk" rows make every 200th file write block for 5 ms, as writeback or
+a slow volume does. Console output goes to /dev/null.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from log_config import HUMAN_FORMAT, bind, setup_logging
+
+STALL_EVERY = 200
+STALL_SECONDS = 0.005
+
+class StallingFile:
+    """File wrapper whose writes occasionally block"""
+
+    def __init__(self, f):
+        self.f = f
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.writes % STALL_EVERY == 0:
+            time.sleep(STALL_SECONDS)
+        return self.f.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+def reset():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+def measure(records, stall, handlers):
+    if stall:
+        for handler in handlers:
+            if isinstance(handler, logging.FileHandler):
+                handler.stream = StallingFile(handler.stream)
+    logger = logging.getLogger("bench")
+    bind(request_id=1, user_id=42)
+    times = []
+    for i in range(records):
+        start = time.perf_counter()
+        logger.info(f"Render cache miss, hit rate {i / records:.1%}")
+        times.append(time.perf_counter() - start)
+        # Other work between records
+        time.sleep(0.0001)
+    times.sort()
+    return sum(times) / records * 1e6, times[len(times) // 2] * 1e6, times[int(records * 0.999)] * 1e6, times[-1] * 1e6
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sys.stderr = open(os.devnull, 'w')
+    print(f"{records} records, µs per logger.info() call on the caller's thread")
+    print(f"{'setup':>22} {'mean':>7} {'p50':>7} {'p99.9':>8} {'max':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for stall in (False, True):
+            label = " (stalling disk)" if stall else ""
+            logging.basicConfig(format=HUMAN_FORMAT, level=logging.INFO, handlers=[
+                logging.FileHandler(os.path.join(tmp, 'direct.log')), logging.StreamHandler()
+            ])
+            mean, p50, p999, worst = measure(records, stall, logging.getLogger().handlers)
+            print(f"{'direct' + label:>22} {mean:7.1f} {p50:7.1f} {p999:8.1f} {worst:8.1f}")
+            reset()
+
+            listener = setup_logging(os.path.join(tmp, 'queued.log'))
+            # The file handler hangs off the listener, behind the queue
+            mean, p50, p999, worst = measure(records, stall, listener.handlers)
+            listener.stop()
+            print(f"{'queued' + label:>22} {mean:7.1f} {p50:7.1f} {p999:8.1f} {worst:8.1f}")
+            reset()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Page size and render time with inline images: IMAGE_MODE off vs. dedupe vs. optimize
+
+    python benchmarks/bench_media.py [questions] [distinct_images]
+
+Each question and solution embeds one of a few large base64 PNGs (a photo-like
+gradient with noise and a flat diagram), the way scanned banks reuse figures.
+"optimize" is timed with a cold and a warm image cache.
+"""
+import base64
+import io
+import random
+import sys
+import tempfile
+import time
+
+from synthetic import make_test_bank
+
+from PIL import Image, ImageDraw
+
+from template_engine import TemplateEngine
+
+def make_png(seed, photo):
+    rng = random.Random(seed)
+    width, height = 1600, 1000
+    if photo:
+        image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+        noise = Image.effect_noise((width, height), 40).convert("RGB")
+        image = Image.blend(image, noise, 0.3)
+    else:
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(width), rng.randrange(height)
+            draw.rectangle((x, y, x + rng.randrange(50, 300), y + rng.randrange(20, 120)), outline="black", width=3)
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return "data:image/png;base64," + base64.b64encode(out.getvalue()).decode('ascii')
+
+def make_bank(questions, distinct):
+    images = [make_png(i, photo=i % 2 == 0) for i in range(distinct)]
+    bank = make_test_bank(questions)
+    for index, item in enumerate(bank['data']):
+        item['question'] += f'<br><img src="{images[index % distinct]}" alt="figure">'
+        item['solution'] += f'<br><img src="{images[(index + 1) % distinct]}">'
+    return bank
+
+def main():
+    questions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    bank = make_bank(questions, distinct)
+    print(f"{questions} questions, {2 * questions} image references, {distinct} distinct images")
+    print(f"{'mode':>16} {'page MiB':>9} {'render ms':>10}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runs = [("off", "off"), ("dedupe", "dedupe"), ("optimize (cold)", "optimize"), ("optimize (warm)", "optimize")]
+        for label, mode in runs:
+            engine = TemplateEngine(images=mode, image_cache_dir=cache_dir)
+            start = time.perf_counter()
+            page = engine.render_shared(bank)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>16} {len(page) / 1024 / 1024:9.2f} {elapsed * 1000:10.0f}")
+
+if __name__ == "__main__":
+    main()
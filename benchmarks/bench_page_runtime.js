@@ -0,0 +1,118 @@
+// Click-to-render cost of the generated page runtime, run under Node against the fake_dom.js stand-in
+//
+//     node benchmarks/bench_page_runtime.js [runtime.js] [questions ...]
+//
+// Each step answers the current question and clicks Next, the hot path while taking a test.
+// "writes" counts DOM mutations (class/text/child changes) on the click path, a proxy for the
+// style and layout work a browser would do before the next frame; "idle writes" are those made
+// in idle callbacks between clicks. "saves" counts localStorage writes per step (state saves are
+// debounced, so fast clicking batches them). Times cover the runtime's own JavaScript only.
+'use strict';
+const fs = require('fs');
+const path = require('path');
+const {PerformanceObserver, performance} = require('perf_hooks');
+const {FakeStorage, loadPage, click} = require('./fake_dom');
+
+const STEPS = 200;
+
+function makeTestBank(numQuestions) {
+    const data = [];
+    for (let i = 0; i < numQuestions; i++) {
+        data.push({
+            id: String(i + 1),
+            question: `Question ${i + 1}: ${'lorem ipsum '.repeat(10)}`,
+            options: {a: `Option A ${i}`, b: `Option B ${i}`, c: `Option C ${i}`, d: `Option D ${i}`},
+            answer: 'abcd'[i % 4],
+            solution: `Explanation ${i + 1}`,
+            plus_marks: 4,
+            minus_marks: 1,
+        });
+    }
+    return {data};
+}
+
+function percentile(samples, q) {
+    const ordered = [...samples].sort((a, b) => a - b);
+    return ordered[Math.min(ordered.length - 1, Math.floor(ordered.length * q))];
+}
+
+// Options of the question on screen; hidden prebuilt views and unused option slots are skipped
+function visibleOptions(document) {
+    const shown = node => {
+        for (; node; node = node.parentNode) if (node.classList.contains('hidden')) return false;
+        return true;
+    };
+    return document.getElementById('questionContainer').querySelectorAll('.option').filter(shown);
+}
+
+async function run(runtimeSource, numQuestions) {
+    const testData = makeTestBank(numQuestions);
+    let gcCount = 0;
+    let gcMs = 0;
+    const observer = new PerformanceObserver(list => list.getEntries().forEach(entry => {
+        gcCount++;
+        gcMs += entry.duration;
+    }));
+    observer.observe({entryTypes: ['gc']});
+
+    const storage = new FakeStorage();
+    const {document, ready} = loadPage(runtimeSource, testData, storage);
+    let start = performance.now();
+    ready();
+    const initMs = performance.now() - start;
+    const gridNodes = document.getElementById('questionGrid').childNodes.length;
+
+    const times = [];
+    let clickWrites = 0;
+    let idleWrites = 0;
+    const heapBefore = process.memoryUsage().heapUsed;
+    const savesBefore = storage.writes;
+    for (let step = 0; step < STEPS; step++) {
+        let writesBefore = document.writes;
+        start = performance.now();
+        const options = visibleOptions(document);
+        click(options[step % options.length]);
+        click(document.getElementById('nextBtn'));
+        times.push(performance.now() - start);
+        clickWrites += document.writes - writesBefore;
+        // Let idle callbacks run between clicks, as a browser would between user input
+        writesBefore = document.writes;
+        await new Promise(resolve => setTimeout(resolve, 0));
+        idleWrites += document.writes - writesBefore;
+    }
+    const writes = clickWrites / STEPS;
+    const idle = idleWrites / STEPS;
+    const saves = (storage.writes - savesBefore) / STEPS;
+    const heapGrowth = process.memoryUsage().heapUsed - heapBefore;
+    // GC entries are delivered asynchronously
+    await new Promise(resolve => setImmediate(resolve));
+    observer.disconnect();
+    return {initMs, gridNodes, times, writes, idle, saves, heapGrowth, gcCount, gcMs};
+}
+
+async function main() {
+    const args = process.argv.slice(2);
+    const runtimePath = args[0] && args[0].endsWith('.js') ? args.shift()
+        : path.join(__dirname, '..', 'runtime', 'test_page.js');
+    const sizes = args.length ? args.map(Number) : [100, 2000, 10000];
+    const runtimeSource = fs.readFileSync(runtimePath, 'utf8');
+
+    console.log(`${path.relative(process.cwd(), runtimePath)}: ${STEPS} steps of answer + Next`);
+    console.log(`${'questions'.padStart(9)} ${'init ms'.padStart(8)} ${'grid nodes'.padStart(10)} `
+        + `${'step ms'.padStart(8)} ${'p95 ms'.padStart(7)} ${'writes'.padStart(7)} ${'idle writes'.padStart(11)} ${'saves'.padStart(6)} `
+        + `${'heap KiB'.padStart(9)} ${'gc'.padStart(4)} ${'gc ms'.padStart(6)}`);
+    for (const size of sizes) {
+        // Warm up the JIT on the same size so its code paths are optimised before measuring
+        await run(runtimeSource, size);
+        const result = await run(runtimeSource, size);
+        const mean = result.times.reduce((a, b) => a + b, 0) / result.times.length;
+        console.log(`${String(size).padStart(9)} ${result.initMs.toFixed(1).padStart(8)} `
+            + `${String(result.gridNodes).padStart(10)} ${mean.toFixed(3).padStart(8)} `
+            + `${percentile(result.times, 0.95).toFixed(3).padStart(7)} ${result.writes.toFixed(1).padStart(7)} `
+            + `${result.idle.toFixed(1).padStart(11)} ${result.saves.toFixed(2).padStart(6)} `
+            + `${(result.heapGrowth / 1024).toFixed(0).padStart(9)} ${String(result.gcCount).padStart(4)} `
+            + `${result.gcMs.toFixed(1).padStart(6)}`);
+    }
+}
+
+main();
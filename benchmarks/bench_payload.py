@@ -0,0 +1,43 @@
+"""Page size and data parse cost for each PAYLOAD_MODE
+
+Parse time is json.loads of the eagerly parsed testData, used as a proxy for
+the browser's JSON.parse at page load; compact pages defer solutions entirely.
+
+    python benchmarks/bench_payload.py
+"""
+import json
+import time
+
+from synthetic import make_test_bank
+from template_engine import PAYLOAD_MODES, TemplateEngine, compact_item
+
+SIZES = (200, 2000, 10000)
+
+def parse_ms(text, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json.loads(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    engine = TemplateEngine()
+    print(f"{'questions':>10} {'mode':>13} {'page KiB':>9} {'vs full':>8} {'testData parse ms':>18}")
+    for size in SIZES:
+        json_data = make_test_bank(size, text_size=300)
+        # Unused keys like real exports carry
+        for item in json_data['data']:
+            item.update({"created_at": "2024-01-01T00:00:00Z", "tags": ["mock", "physics"], "source_url": "https://example.com/q"})
+        full_size = None
+        for mode in PAYLOAD_MODES:
+            page = engine.render(json_data, 123456789, payload=mode)
+            if mode == "full":
+                eager = json.dumps(json_data, ensure_ascii=False)
+                full_size = len(page)
+            else:
+                eager = json.dumps({"data": [compact_item(item) for item in json_data['data']]}, ensure_ascii=False)
+            print(f"{size:>10} {mode:>13} {len(page) / 1024:>9.0f} {len(page) / full_size:>7.0%} {parse_ms(eager):>18.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Event-loop lag under a burst of concurrent uploads: inline rendering vs. RenderPool
+
+    python benchmarks/bench_render_pool.py [uploads] [questions]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fake_telegram import make_upload
+from synthetic import make_test_bank
+
+class InlineRender:
+    """The pre-pool behaviour: parse and render on the event loop thread"""
+    pending = 0
+    capacity = float('inf')
+
+    def queue_position(self):
+        return 0
+
+    async def render(self, content, theme="dark", device="desktop", cache_dir=None, payload="full", answer_key=False):
+        from render_pool import render_job
+        key, page, _, answers = render_job(content, theme, device, cache_dir, payload, answer_key)
+        return key, page, answers
+
+    def shutdown(self):
+        pass
+
+async def burst(bot, uploads, content):
+    from render_pool import LoopLagMonitor
+    monitor = LoopLagMonitor(interval=0.01, warn_after=float('inf'))
+    monitor.start()
+    updates = [make_upload(100000 + i, content) for i in range(uploads)]
+    start = time.perf_counter()
+    await asyncio.gather(*(bot.handle_json_file(update, None) for update in updates))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    delivered = sum(1 for update in updates if update.message.replied_document_at)
+    return elapsed, delivered, monitor.summary()
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    os.chdir(tempfile.mkdtemp(prefix="bench_render_pool_"))
+    from main import TelegramTestBot
+
+    content = json.dumps(make_test_bank(questions), ensure_ascii=False).encode('utf-8')
+    print(f"{uploads} concurrent uploads of {questions} questions ({len(content) / 1024:.0f} KiB)")
+    print(f"{'mode':>8} {'seconds':>8} {'sent':>5} {'lag max ms':>11} {'lag p99 ms':>11}")
+    for mode in ("inline", "thread", "process"):
+        bot = TelegramTestBot()
+        if mode == "inline":
+            bot.render_pool.shutdown()
+            bot.render_pool = InlineRender()
+        else:
+            bot.render_pool.shutdown()
+            from render_pool import RenderPool
+            bot.render_pool = RenderPool(executor=mode, queue_size=uploads)
+        elapsed, delivered, lag = asyncio.run(burst(bot, uploads, content))
+        bot.render_pool.shutdown()
+        print(f"{mode:>8} {elapsed:>8.2f} {delivered:>5} {lag['max_ms']:>11.1f} {lag['p99_ms']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
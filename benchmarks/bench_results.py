@@ -0,0 +1,83 @@
+"""Result ingestion at exam end: POST throughput through ResultsServer into ResultStore
+
+    python benchmarks/bench_results.py [records] [concurrency]
+
+Compares the batched store against committing each record as it arrives (the
+obvious implementation), both over real HTTP on localhost.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from results_server import ResultsServer
+from results_store import ResultStore
+
+PORT = 18081
+
+class PerRowStore(ResultStore):
+    """Baseline: one INSERT and commit per record on the event loop, with SQLite's default journal"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.db.execute("PRAGMA journal_mode=DELETE")
+        self.db.execute("PRAGMA synchronous=FULL")
+
+    def add(self, row, source="http"):
+        self._insert([row + (source, time.time())])
+        self.written += 1
+
+def make_record(i, questions=100):
+    return json.dumps({
+        "v": 1, "test": "100:abc123", "user": str(100000 + i), "score": 212.0, "correct": 55,
+        "incorrect": 8, "skipped": 37, "time": 9000 + i % 1000,
+        "answers": ("abcd-." * questions)[:questions],
+    })
+
+async def scenario(store, records, concurrency):
+    server = ResultsServer(store)
+    await server.start("127.0.0.1", PORT)
+    store.start()
+    bodies = [make_record(i) for i in range(records)]
+    latencies = []
+
+    async with aiohttp.ClientSession() as session:
+        async def worker(offset):
+            for body in bodies[offset::concurrency]:
+                sent = time.perf_counter()
+                async with session.post(f"http://127.0.0.1:{PORT}/results", data=body,
+                                        headers={"Content-Type": "text/plain"}) as response:
+                    assert response.status == 204, response.status
+                latencies.append(time.perf_counter() - sent)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    await server.stop()
+    await store.close()
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+async def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"{records} result POSTs, {concurrency} concurrent clients")
+    print(f"{'store':>10} {'records/s':>10} {'p50 ms':>7} {'p99 ms':>7} {'batches':>8} {'rows':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cls in (("per-row", PerRowStore), ("batched", ResultStore)):
+            path = os.path.join(tmp, f"{name}.sqlite3")
+            store = cls(path)
+            elapsed, p50, p99 = await scenario(store, records, concurrency)
+            rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            print(f"{name:>10} {records / elapsed:10.0f} {p50 * 1000:7.2f} {p99 * 1000:7.2f} "
+                  f"{store.batches:8d} {rows:6d}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
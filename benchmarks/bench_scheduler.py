@@ -0,0 +1,64 @@
+"""Wait time of light users behind one heavy user: FIFO semaphore vs. FairScheduler
+
+    python benchmarks/bench_scheduler.py [heavy_jobs] [light_users] [job_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scheduler import FairScheduler
+
+class FifoScheduler:
+    """The pre-scheduler behaviour: one global limit, served in arrival order"""
+
+    def __init__(self, max_concurrent):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def run(self, user_id, job, on_queued=None):
+        async with self.semaphore:
+            return await job()
+
+async def scenario(scheduler, heavy_jobs, light_users, job_seconds):
+    waits = {}
+
+    async def submit(user_id, index):
+        queued = time.perf_counter()
+        started = []
+
+        async def job():
+            started.append(time.perf_counter())
+            await asyncio.sleep(job_seconds)
+
+        await scheduler.run(user_id, job)
+        waits[(user_id, index)] = started[0] - queued
+
+    tasks = [asyncio.create_task(submit("heavy", i)) for i in range(heavy_jobs)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(submit(f"light{i}", 0)) for i in range(light_users)]
+    await asyncio.gather(*tasks)
+    light = sorted(wait for (user_id, _), wait in waits.items() if user_id != "heavy")
+    heavy = sorted(wait for (user_id, _), wait in waits.items() if user_id == "heavy")
+    return light, heavy
+
+def main():
+    heavy_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    light_users = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    job_seconds = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+    workers = 4
+    print(f"{heavy_jobs} jobs from one user, then 1 job each from {light_users} users; "
+          f"{workers} slots, {job_seconds * 1000:.0f} ms per job")
+    print(f"{'scheduler':>10} {'light p50 ms':>13} {'light max ms':>13} {'heavy max ms':>13}")
+    for name in ("fifo", "fair"):
+        if name == "fifo":
+            scheduler = FifoScheduler(workers)
+        else:
+            scheduler = FairScheduler(max_concurrent=workers, user_rate=1000, user_burst=heavy_jobs,
+                                      user_max_pending=heavy_jobs)
+        light, heavy = asyncio.run(scenario(scheduler, heavy_jobs, light_users, job_seconds))
+        print(f"{name:>10} {light[len(light) // 2] * 1000:>13.0f} {light[-1] * 1000:>13.0f} {heavy[-1] * 1000:>13.0f}")
+
+if __name__ == "__main__":
+    main()
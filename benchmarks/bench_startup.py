@@ -0,0 +1,82 @@
+"""Startup cost of the bot: importing main and building TelegramTestBot, in fresh interpreters
+
+    python benchmarks/bench_startup.py [runs] [--top N]
+
+Each run is a new `python -X importtime` process, as a container restart is.
+Reports the median wall time to import main and to construct the bot (config,
+template compilation, pools, databases), plus the slowest imports main pulls in
+directly, by median cumulative import time.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from synthetic import ROOT
+
+PROBE = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+bot = main.TelegramTestBot()
+built = time.perf_counter()
+print(imported - start, built - imported)
+bot.render_pool.shutdown()
+"""
+
+def parse_importtime(stderr):
+    """{module: cumulative µs} for the modules main imports directly"""
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # Lines are printed after a module's own imports, indented two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            children[name] = int(cumulative)
+        elif depth == 0:
+            if name == "main":
+                return children
+            children = {}
+    return {}
+
+def run_once(cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT, METRICS_PORT="0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    import_s, build_s = map(float, result.stdout.split())
+    return import_s, build_s, parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("runs", nargs="?", type=int, default=7)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    imports, builds, modules = [], [], {}
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as cwd:
+        for _ in range(args.runs):
+            import_s, build_s, children = run_once(cwd)
+            imports.append(import_s)
+            builds.append(build_s)
+            for name, micros in children.items():
+                modules.setdefault(name, []).append(micros)
+
+    print(f"{args.runs} fresh interpreters, medians")
+    print(f"import main:         {statistics.median(imports) * 1000:7.0f} ms")
+    print(f"TelegramTestBot():   {statistics.median(builds) * 1000:7.0f} ms")
+    print("slowest imports under main (cumulative, -X importtime):")
+    slowest = sorted(modules.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+    for name, micros in slowest:
+        print(f"  {statistics.median(micros) / 1000:7.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Peak RSS of a render worker: whole-file json.loads vs. streamed items
+
+Each measurement runs in a fresh process and reads VmHWM from /proc (Linux);
+ru_maxrss would also count the parent's high-water mark inherited over fork.
+
+    python benchmarks/bench_streaming.py
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from synthetic import make_test_bank
+
+SIZES = (1000, 5000, 20000)
+MEDIA_BYTES = 2048
+
+def peak_rss_mib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def measure(mode, path, cache_dir, queue):
+    from render_pool import render_job, render_stream_job
+    start = time.perf_counter()
+    if mode == "loads":
+        with open(path, 'rb') as f:
+            render_job(f.read(), cache_dir=None)
+    else:
+        render_stream_job(path, cache_dir=cache_dir)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss_mib()))
+
+def run(mode, path, cache_dir):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(mode, path, cache_dir, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_streaming_")
+    print(f"{'questions':>10} {'file MiB':>9} {'loads MiB RSS':>14} {'stream MiB RSS':>15} {'loads s':>8} {'stream s':>9}")
+    for size in SIZES:
+        path = os.path.join(workdir, f"bank_{size}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_test_bank(size, media_bytes=MEDIA_BYTES), f, ensure_ascii=False)
+        file_mib = os.path.getsize(path) / (1024 * 1024)
+        cache_dir = os.path.join(workdir, f"cache_{size}")
+        os.makedirs(cache_dir)
+        loads_s, loads_rss = run("loads", path, cache_dir)
+        stream_s, stream_rss = run("stream", path, cache_dir)
+        print(f"{size:>10} {file_mib:>9.1f} {loads_rss:>14.1f} {stream_rss:>15.1f} {loads_s:>8.2f} {stream_s:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Pages per second: precompiled TemplateEngine vs. the per-call f-string path
+
+    python benchmarks/bench_template_engine.py
+"""
+import time
+
+from synthetic import make_test_bank
+from template_engine import TemplateEngine, render_uncompiled
+
+SIZES = (10, 200, 5000)
+
+def pages_per_second(render, json_data, min_seconds=1.0):
+    """Call render repeatedly for at least min_seconds and return the rate"""
+    count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        render(json_data, 123456789, theme="dark", device="desktop")
+        count += 1
+        elapsed = time.perf_counter() - start
+    return count / elapsed
+
+def main():
+    start = time.perf_counter()
+    engine = TemplateEngine()
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"Compiled {len(engine.templates)} shells in {compile_ms:.1f} ms")
+    print(f"{'questions':>10} {'f-string p/s':>14} {'engine p/s':>12} {'speedup':>9}")
+    for size in SIZES:
+        json_data = make_test_bank(size)
+        assert engine.render(json_data, 123456789) == render_uncompiled(json_data, 123456789)
+        legacy = pages_per_second(render_uncompiled, json_data)
+        compiled = pages_per_second(engine.render, json_data)
+        print(f"{size:>10} {legacy:>14.1f} {compiled:>12.1f} {compiled / legacy:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
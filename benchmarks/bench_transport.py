@@ -0,0 +1,171 @@
+"""Transfer throughput of the Bot API and MTProto transports against local stand-ins
+
+    python benchmarks/bench_transport.py [--sizes 1 10 50 200] [--runs 3] [--parallel 1]
+                                         [--transmissions 1 4] [--latency MS] [--local]
+
+Each backend runs the bot's own transfer code: transport.BotApiTransport through
+python-telegram-bot against fake_bot_api.py, and transport.MTProtoTransport
+through Pyrogram against fake_mtproto.py, both serving the same files from a
+child process so they do not compete with the client for its event loop.
+Downloads are written to disk as spilled uploads are; uploads send a file of
+random bytes from disk. Each case runs --parallel transfers at once and
+reports the best MB/s over --runs, for MTProto once per --transmissions
+(max_concurrent_transmissions) setting.
+
+Sizes over a transport's limit are reported instead of tried; --local lifts
+the Bot API limits as a self-hosted telegram-bot-api server does. --latency
+delays every Bot API call and MTProto RPC, the round trip that MTProto's
+sequential 1 MB download requests and parallel 512 KB upload parts pay
+differently.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import synthetic  # noqa: F401 (makes the bot modules importable)
+
+from fake_bot_api import FakeBotApi
+from fake_mtproto import FakeDataCenter, point_pyrogram_at, session_string
+
+from aiohttp import web
+
+from transport import MB, MTPROTO_LIMIT, BotApiTransport, MTProtoTransport
+
+USER_ID = 100000
+
+def serve(bot_api_port, mtproto_port, auth_key, sizes, latency, local, files, stop):
+    """Child process: serve one file of each size from both stand-ins until stop is set"""
+
+    async def run():
+        api = FakeBotApi(latency, local=local)
+        runner = web.AppRunner(api.app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", bot_api_port).start()
+        dc = FakeDataCenter(auth_key, latency)
+        await dc.start("127.0.0.1", mtproto_port)
+        file_ids = {}
+        for size in sizes:
+            content = os.urandom(size)
+            api.files[f"bench-{size}"] = content
+            file_ids[size] = {"botapi": f"bench-{size}", "mtproto": dc.add_file(content, file_name="bench.json")}
+        files.put(file_ids)
+        await asyncio.to_thread(stop.wait)
+        await dc.stop()
+        await runner.cleanup()
+
+    asyncio.run(run())
+
+async def bot_api_backend(port, local):
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+    bot = Bot(
+        "123456:BENCH",
+        base_url=f"http://127.0.0.1:{port}/bot",
+        base_file_url=f"http://127.0.0.1:{port}/file/bot",
+        request=HTTPXRequest(connection_pool_size=32, read_timeout=300, write_timeout=300),
+    )
+    await bot.initialize()
+    transport = BotApiTransport(MTPROTO_LIMIT, MTPROTO_LIMIT) if local else BotApiTransport()
+    return bot, transport
+
+def mtproto_backend(port, auth_key, transmissions):
+    from pyrogram import Client
+    point_pyrogram_at("127.0.0.1", port)
+    client = Client(
+        f"bench_{transmissions}",
+        api_id=1,
+        api_hash="0" * 32,
+        session_string=session_string(auth_key),
+        in_memory=True,
+        no_updates=True,
+        max_concurrent_transmissions=transmissions,
+    )
+    return MTProtoTransport(1, "0" * 32, None, transmissions=transmissions, client=client)
+
+def telegram_objects(bot, file_id, size):
+    """The Message and Document of an upload, as the bot receives them"""
+    from telegram import Chat, Document, Message
+    message = Message(1, datetime.now(), Chat(USER_ID, Chat.PRIVATE))
+    document = Document(file_id, file_id, file_name="bench.json", file_size=size)
+    message.set_bot(bot)
+    document.set_bot(bot)
+    return message, document
+
+async def best_mb_per_s(transfer, size, runs, parallel):
+    best = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        await asyncio.gather(*(transfer(i) for i in range(parallel)))
+        best = max(best, size * parallel / MB / (time.perf_counter() - start))
+    return best
+
+async def bench(args, file_ids, auth_key, workdir):
+    bot, bot_api = await bot_api_backend(args.bot_api_port, args.local)
+    backends = [("botapi", bot_api)] + [
+        (f"mtproto x{n}", mtproto_backend(args.mtproto_port, auth_key, n)) for n in args.transmissions
+    ]
+    print(f"{'size MB':>8} {'direction':>9} {'backend':>12} {'MB/s':>9}")
+    for size in sorted(file_ids):
+        upload_path = workdir / f"upload-{size}.bin"
+        upload_path.write_bytes(os.urandom(size))
+        for direction in ("download", "upload"):
+            for name, transport in backends:
+                limit = transport.download_limit if direction == "download" else transport.upload_limit
+                if size > limit:
+                    print(f"{size / MB:8.0f} {direction:>9} {name:>12}    over the {limit / MB:.0f} MB limit")
+                    continue
+                message, document = telegram_objects(bot, file_ids[size][name.split()[0]], size)
+
+                async def transfer(i):
+                    if direction == "upload":
+                        await transport.send_document(message, upload_path, "bench.html")
+                        return
+                    path = workdir / f"download-{i}.bin"
+                    await transport.download(document, path)
+                    assert path.stat().st_size == size, f"{name} downloaded {path.stat().st_size} of {size} bytes"
+
+                mb_per_s = await best_mb_per_s(transfer, size, args.runs, args.parallel)
+                print(f"{size / MB:8.0f} {direction:>9} {name:>12} {mb_per_s:9.1f}")
+        upload_path.unlink()
+    for _, transport in backends[1:]:
+        await transport.close()
+    await bot.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50, 200], help="file sizes in MB")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--parallel", type=int, default=1, help="transfers at once in each case")
+    parser.add_argument("--transmissions", type=int, nargs="+", default=[1, 4],
+                        help="max_concurrent_transmissions settings to run MTProto with")
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every API call and RPC")
+    parser.add_argument("--local", action="store_true", help="lift the Bot API's 20/50 MB limits")
+    parser.add_argument("--bot-api-port", type=int, default=8998)
+    parser.add_argument("--mtproto-port", type=int, default=9443)
+    args = parser.parse_args()
+
+    sizes = [int(size * MB) for size in args.sizes]
+    auth_key = os.urandom(256)
+    files = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(
+        args.bot_api_port, args.mtproto_port, auth_key, sizes, args.latency / 1000, args.local, files, stop
+    ))
+    server.start()
+    try:
+        file_ids = files.get(timeout=120)
+        print(f"{args.parallel} transfer(s) at once, best of {args.runs}, latency {args.latency:.0f} ms"
+              f"{', local Bot API' if args.local else ''}")
+        with tempfile.TemporaryDirectory(prefix="bench_transport_") as workdir:
+            asyncio.run(bench(args, file_ids, auth_key, Path(workdir)))
+    finally:
+        stop.set()
+        server.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Validation cost per upload: compiled TestValidator vs. naive per-field checks
+
+    python benchmarks/bench_validate.py [questions ...]
+
+Both check the same rules on already parsed data; the naive version runs the
+field-by-field checks (the validator's slow path, used for error messages) on
+every item, with no fast path for valid ones.
+"""
+import io
+import json
+import sys
+import time
+
+from synthetic import make_test_bank
+
+from json_stream import TestDataStream
+from schema import TestValidator, item_errors, validate_test
+
+def naive_validate(json_data):
+    errors = []
+    ids = set()
+    for index, item in enumerate(json_data['data']):
+        errors.extend((index, message) for message in item_errors(item))
+        question_id = str(item.get('id'))
+        if question_id in ids:
+            errors.append((index, "duplicate 'id'"))
+        ids.add(question_id)
+    return errors
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def stream_validate(raw):
+    validator = TestValidator()
+    for _ in validator.check(TestDataStream(io.BytesIO(raw)).items()):
+        pass
+    validator.finish()
+
+def stream_only(raw):
+    for _ in TestDataStream(io.BytesIO(raw)).items():
+        pass
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    print(f"{'questions':>9} {'compiled ms':>12} {'naive ms':>9} {'json.loads ms':>14} "
+          f"{'stream ms':>10} {'stream+check ms':>16}")
+    for size in sizes:
+        json_data = make_test_bank(size)
+        raw = json.dumps(json_data).encode('utf-8')
+        compiled = best_of(lambda: validate_test(json_data))
+        naive = best_of(lambda: naive_validate(json_data))
+        parse = best_of(lambda: json.loads(raw))
+        stream = best_of(lambda: stream_only(raw), repeat=3)
+        stream_checked = best_of(lambda: stream_validate(raw), repeat=3)
+        print(f"{size:9d} {compiled:12.1f} {naive:9.1f} {parse:14.1f} {stream:10.1f} {stream_checked:16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Local stand-in for the Telegram Bot API, so load tests never touch Telegram
+
+    python benchmarks/fake_bot_api.py [--port 8999] [--latency MS]
+
+Serves the methods the bot calls (getMe, deleteWebhook, getUpdates, getFile,
+sendMessage, sendDocument) under /bot<token>/ and file downloads under
+/file/bot<token>/, for any token; point the bot at it with BOT_API_URL.
+Users' uploads are injected with FakeBotApi.upload() or POST /_fake/upload,
+and every reply is timestamped so latency is measured as the user sees it.
+Telegram's file size limits apply (getFile up to 20 MB, sendDocument up to
+50 MB) unless --local is given, as for a self-hosted server in --local mode.
+
+Replies are matched to uploads per chat in order (the API does not say which
+message a document answers), so each user should have one upload in flight.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import deque
+
+from aiohttp import web
+
+# Replies that end the handling of an upload; anything else ("🔄", "⏳") is progress
+TERMINAL_PREFIXES = ("❌", "🚦", "⌛")
+
+DOWNLOAD_LIMIT = 20 * 1024 * 1024
+UPLOAD_LIMIT = 50 * 1024 * 1024
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Fake Bot", "username": "fake_test_bot"}
+
+def ok(result):
+    return web.json_response({"ok": True, "result": result})
+
+def error(code, description):
+    return web.json_response({"ok": False, "error_code": code, "description": description}, status=code)
+
+class Upload:
+    """One document sent by a simulated user, and when the bot answered it"""
+
+    def __init__(self, user_id, message_id, size):
+        self.user_id = user_id
+        self.message_id = message_id
+        self.size = size
+        self.sent_at = time.perf_counter()
+        self.first_reply_at = None
+        self.done_at = None
+        self.outcome = None
+        self.done = asyncio.get_running_loop().create_future()
+
+    def as_dict(self):
+        return {
+            "user_id": self.user_id,
+            "size": self.size,
+            "first_reply_ms": (self.first_reply_at - self.sent_at) * 1000 if self.first_reply_at else None,
+            "reply_ms": (self.done_at - self.sent_at) * 1000 if self.done_at else None,
+            "outcome": self.outcome,
+        }
+
+class FakeBotApi:
+    """aiohttp application implementing the Bot API subset the bot uses"""
+
+    def __init__(self, latency=0.0, local=False):
+        self.latency = latency
+        self.local = local
+        self.updates = deque()
+        self.update_ids = itertools.count(1)
+        self.message_ids = itertools.count(1)
+        self.file_ids = itertools.count(1)
+        self.new_update = asyncio.Event()
+        self.polling = asyncio.Event()
+        self.files = {}      # file_id -> bytes sent by users
+        self.sent = {}       # file_id -> size of documents the bot uploaded
+        self.open = {}       # chat id -> deque of Uploads awaiting their final reply
+        self.uploads = []
+        self.calls = {}
+        self.app = web.Application(client_max_size=1024 * 1024 * 1024)
+        self.app.router.add_post("/bot{token}/{method}", self.handle_method)
+        self.app.router.add_get("/bot{token}/{method}", self.handle_method)
+        self.app.router.add_get("/file/bot{token}/{path:.+}", self.handle_file)
+        self.app.router.add_post("/_fake/upload", self.handle_upload)
+        self.app.router.add_get("/_fake/uploads", self.handle_uploads)
+        self.methods = {
+            "getMe": self.get_me,
+            "deleteWebhook": self.delete_webhook,
+            "getUpdates": self.get_updates,
+            "getFile": self.get_file,
+            "sendMessage": self.send_message,
+            "sendDocument": self.send_document,
+        }
+
+    def upload(self, user_id, content, file_name="test.json"):
+        """Queue a document message from user_id; returns its Upload"""
+        file_id = f"in-{next(self.file_ids)}"
+        self.files[file_id] = content
+        upload = Upload(user_id, next(self.message_ids), len(content))
+        user = {"id": user_id, "is_bot": False, "first_name": f"Load {user_id}"}
+        self.updates.append({
+            "update_id": next(self.update_ids),
+            "message": {
+                "message_id": upload.message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+                "from": user,
+                "document": {
+                    "file_id": file_id,
+                    "file_unique_id": file_id,
+                    "file_name": file_name,
+                    "mime_type": "application/json",
+                    "file_size": len(content),
+                },
+            },
+        })
+        self.open.setdefault(user_id, deque()).append(upload)
+        self.uploads.append(upload)
+        self.new_update.set()
+        return upload
+
+    def _reply(self, chat_id, outcome, terminal):
+        waiting = self.open.get(chat_id)
+        if not waiting:
+            return
+        upload = waiting[0]
+        now = time.perf_counter()
+        if upload.first_reply_at is None:
+            upload.first_reply_at = now
+        if terminal:
+            waiting.popleft()
+            upload.done_at = now
+            upload.outcome = outcome
+            upload.done.set_result(upload)
+
+    def _message(self, chat_id, **fields):
+        return {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            **fields,
+        }
+
+    async def handle_method(self, request):
+        method = request.match_info["method"]
+        handler = self.methods.get(method)
+        if handler is None:
+            return error(404, f"Not Found: {method} is not implemented by the fake API")
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        params.update(request.query)
+        if self.latency and method != "getUpdates":
+            await asyncio.sleep(self.latency)
+        return await handler(params)
+
+    async def get_me(self, params):
+        return ok(BOT_USER)
+
+    async def delete_webhook(self, params):
+        return ok(True)
+
+    async def get_updates(self, params):
+        self.polling.set()
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # Updates below offset were confirmed by the client
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        if not self.updates and timeout:
+            self.new_update.clear()
+            try:
+                await asyncio.wait_for(self.new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return ok(list(itertools.islice(self.updates, limit)))
+
+    async def get_file(self, params):
+        file_id = params.get("file_id")
+        if file_id not in self.files:
+            return error(400, "Bad Request: invalid file_id")
+        if not self.local and len(self.files[file_id]) > DOWNLOAD_LIMIT:
+            return error(400, "Bad Request: file is too big")
+        return ok({
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_size": len(self.files[file_id]),
+            "file_path": f"documents/{file_id}.json",
+        })
+
+    async def handle_file(self, request):
+        file_id = request.match_info["path"].rsplit("/", 1)[-1].removesuffix(".json")
+        if file_id not in self.files:
+            return web.Response(status=404)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.Response(body=self.files[file_id], content_type="application/octet-stream")
+
+    async def send_message(self, params):
+        chat_id = int(params["chat_id"])
+        text = params.get("text", "")
+        self._reply(chat_id, text, terminal=text.startswith(TERMINAL_PREFIXES))
+        return ok(self._message(chat_id, text=text))
+
+    async def send_document(self, params):
+        chat_id = int(params["chat_id"])
+        document = params.get("document")
+        if isinstance(document, web.FileField):
+            size = len(document.file.read())
+            if not self.local and size > UPLOAD_LIMIT:
+                return error(413, "Request Entity Too Large")
+            file_id = f"out-{next(self.file_ids)}"
+            self.sent[file_id] = size
+            outcome = "document"
+        elif document in self.sent:
+            # Resent by file_id: nothing was uploaded
+            file_id, size, outcome = document, self.sent[document], "document (file_id)"
+        else:
+            return error(400, "Bad Request: wrong file identifier/HTTP URL specified")
+        self._reply(chat_id, outcome, terminal=True)
+        return ok(self._message(chat_id, document={
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_name": getattr(document, "filename", "test.html"),
+            "file_size": size,
+        }))
+
+    async def handle_upload(self, request):
+        """POST /_fake/upload?user_id=N with the JSON file as the body"""
+        upload = self.upload(int(request.query.get("user_id", "100000")), await request.read())
+        return web.json_response({"message_id": upload.message_id})
+
+    async def handle_uploads(self, request):
+        return web.json_response([upload.as_dict() for upload in self.uploads])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every API call")
+    parser.add_argument("--local", action="store_true", help="no file size limits")
+    args = parser.parse_args()
+
+    async def make_app():
+        return FakeBotApi(args.latency / 1000, local=args.local).app
+
+    print(f"Fake Bot API on http://{args.host}:{args.port} (BOT_API_URL=http://{args.host}:{args.port})")
+    web.run_app(make_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+// Minimal DOM stand-in for running the page runtime under Node without a browser or jsdom.
+// Enough of the API the runtime uses, plus a count of DOM writes as a proxy for style/layout work.
+'use strict';
+const vm = require('vm');
+
+const VOID_TAGS = new Set(['br', 'hr', 'img', 'input', 'meta']);
+
+class FakeElement {
+    constructor(document, tagName) {
+        this.ownerDocument = document;
+        this.tagName = tagName.toUpperCase();
+        this.childNodes = [];
+        this.parentNode = null;
+        this.dataset = {};
+        this.style = {};
+        this.listeners = {};
+        this.disabled = false;
+        this.scrollTop = 0;
+        this.clientHeight = 400;
+        this.offsetHeight = 40;
+        this._classes = new Set();
+        this._text = '';
+        this._id = '';
+        const element = this;
+        this.classList = {
+            add(...names) { names.forEach(name => element._classes.add(name)); document.writes++; },
+            remove(...names) { names.forEach(name => element._classes.delete(name)); document.writes++; },
+            toggle(name, force) {
+                const on = force === undefined ? !element._classes.has(name) : force;
+                on ? element._classes.add(name) : element._classes.delete(name);
+                document.writes++;
+                return on;
+            },
+            contains(name) { return element._classes.has(name); },
+        };
+    }
+
+    get id() { return this._id; }
+    set id(value) { this._id = value; this.ownerDocument.ids.set(value, this); }
+
+    get className() { return [...this._classes].join(' '); }
+    set className(value) {
+        this._classes = new Set(String(value).split(/\s+/).filter(Boolean));
+        this.ownerDocument.writes++;
+    }
+
+    get children() { return this.childNodes; }
+    get firstChild() { return this.childNodes[0] || null; }
+    get lastChild() { return this.childNodes[this.childNodes.length - 1] || null; }
+
+    get textContent() { return this._text + this.childNodes.map(child => child.textContent).join(''); }
+    set textContent(value) {
+        this._detachChildren();
+        this._text = String(value);
+        this.ownerDocument.writes++;
+    }
+
+    set innerHTML(html) {
+        this._detachChildren();
+        this._text = '';
+        this.ownerDocument.writes++;
+        parseHTML(this, String(html));
+    }
+
+    _detachChildren() {
+        this.childNodes.forEach(child => { child.parentNode = null; });
+        this.childNodes = [];
+    }
+
+    _adopt(child) {
+        if (child.tagName === '#FRAGMENT') {
+            const nodes = child.childNodes;
+            child.childNodes = [];
+            return nodes.flatMap(node => this._adopt(node));
+        }
+        if (child.parentNode) child.remove();
+        child.parentNode = this;
+        this.ownerDocument.writes++;
+        return [child];
+    }
+
+    appendChild(child) {
+        this.childNodes.push(...this._adopt(child));
+        return child;
+    }
+
+    insertBefore(child, reference) {
+        const nodes = this._adopt(child);
+        const at = reference ? this.childNodes.indexOf(reference) : -1;
+        this.childNodes.splice(at < 0 ? this.childNodes.length : at, 0, ...nodes);
+        return child;
+    }
+
+    replaceChildren(...nodes) {
+        this._detachChildren();
+        this._text = '';
+        this.ownerDocument.writes++;
+        nodes.forEach(node => this.appendChild(node));
+    }
+
+    remove() {
+        if (!this.parentNode) return;
+        const siblings = this.parentNode.childNodes;
+        siblings.splice(siblings.indexOf(this), 1);
+        this.parentNode = null;
+        this.ownerDocument.writes++;
+    }
+
+    setAttribute(name, value) {
+        if (name === 'class') this.className = value;
+        else if (name === 'id') this.id = value;
+        else if (name.startsWith('data-')) {
+            this.dataset[name.slice(5).replace(/-([a-z])/g, (_, c) => c.toUpperCase())] = String(value);
+        }
+        this.ownerDocument.writes++;
+    }
+
+    addEventListener(type, listener) {
+        (this.listeners[type] = this.listeners[type] || []).push(listener);
+    }
+
+    contains(node) {
+        for (; node; node = node.parentNode) if (node === this) return true;
+        return false;
+    }
+
+    closest(selector) {
+        for (let node = this; node; node = node.parentNode) if (node.matches && node.matches(selector)) return node;
+        return null;
+    }
+
+    matches(selector) {
+        if (selector.startsWith('.')) return selector.slice(1).split('.').every(name => this._classes.has(name));
+        if (selector.startsWith('#')) return this._id === selector.slice(1);
+        return this.tagName === selector.toUpperCase();
+    }
+
+    querySelectorAll(selector) {
+        const found = [];
+        const walk = node => node.childNodes.forEach(child => {
+            if (child.matches(selector)) found.push(child);
+            walk(child);
+        });
+        walk(this);
+        return found;
+    }
+
+    querySelector(selector) {
+        return this.querySelectorAll(selector)[0] || null;
+    }
+}
+
+function parseHTML(root, html) {
+    const document = root.ownerDocument;
+    const stack = [root];
+    const token = /<\/([a-zA-Z0-9]+)\s*>|<([a-zA-Z0-9]+)([^>]*)>|([^<]+)/g;
+    let match;
+    while ((match = token.exec(html))) {
+        const parent = stack[stack.length - 1];
+        if (match[1]) {
+            if (stack.length > 1) stack.pop();
+        } else if (match[2]) {
+            const element = new FakeElement(document, match[2]);
+            const attribute = /([a-zA-Z-]+)="([^"]*)"/g;
+            let attr;
+            while ((attr = attribute.exec(match[3]))) element.setAttribute(attr[1], attr[2]);
+            parent.childNodes.push(element);
+            element.parentNode = parent;
+            if (!VOID_TAGS.has(match[2].toLowerCase())) stack.push(element);
+        } else if (match[4].trim()) {
+            const text = new FakeElement(document, '#text');
+            text._text = match[4];
+            text.matches = () => false;
+            parent.childNodes.push(text);
+            text.parentNode = parent;
+        }
+    }
+}
+
+class FakeDocument {
+    constructor() {
+        this.ids = new Map();
+        this.writes = 0;
+        this.listeners = {};
+        this.documentElement = new FakeElement(this, 'html');
+        this.documentElement.dataset = {theme: 'dark', device: 'desktop'};
+        this.body = new FakeElement(this, 'body');
+        this.documentElement.appendChild(this.body);
+    }
+
+    createElement(tagName) { return new FakeElement(this, tagName); }
+    createDocumentFragment() { return new FakeElement(this, '#fragment'); }
+    getElementById(id) {
+        const element = this.ids.get(id);
+        return element && this.documentElement.contains(element) ? element : null;
+    }
+    querySelectorAll(selector) { return this.documentElement.querySelectorAll(selector); }
+    querySelector(selector) { return this.documentElement.querySelector(selector); }
+    addEventListener(type, listener) { (this.listeners[type] = this.listeners[type] || []).push(listener); }
+}
+
+// localStorage stand-in that counts writes and stored bytes
+class FakeStorage {
+    constructor(quota = 5 * 1024 * 1024) {
+        this.items = new Map();
+        this.quota = quota;
+        this.writes = 0;
+    }
+
+    get length() { return this.items.size; }
+    get bytes() {
+        let total = 0;
+        this.items.forEach((value, key) => { total += (key.length + value.length) * 2; });
+        return total;
+    }
+
+    key(index) { return [...this.items.keys()][index] ?? null; }
+    getItem(key) { return this.items.has(key) ? this.items.get(key) : null; }
+    removeItem(key) { this.items.delete(key); }
+    setItem(key, value) {
+        const previous = this.items.get(key);
+        this.items.set(key, String(value));
+        if (this.bytes > this.quota) {
+            previous === undefined ? this.items.delete(key) : this.items.set(key, previous);
+            throw new Error('QuotaExceededError');
+        }
+        this.writes++;
+    }
+}
+
+// The page body as build_page writes it, reduced to the elements the runtime looks up
+const PAGE_BODY = `
+<div class="header"><div class="timer" id="timer">03:00:00</div></div>
+<div class="control-panel">
+    <button class="mode-btn active" data-theme="dark"></button>
+    <button class="mode-btn" data-theme="light"></button>
+    <button class="mode-btn" data-device="mobile"></button>
+    <button class="mode-btn active" data-device="desktop"></button>
+</div>
+<div class="main-content">
+    <div class="question-nav">
+        <div class="question-grid" id="questionGrid"></div>
+        <div class="solution" id="solutionContainer"><div id="solutionText"></div></div>
+    </div>
+    <div class="questions-section">
+        <div class="question" id="questionContainer"></div>
+        <div class="actions">
+            <button class="btn" id="prevBtn"></button>
+            <button class="btn" id="skipBtn"></button>
+            <button class="btn" id="nextBtn"></button>
+            <button class="btn" id="submitBtn"></button>
+        </div>
+    </div>
+</div>`;
+
+// Load the runtime against a fresh page; returns the document, a vm context to call into,
+// and ready() which fires DOMContentLoaded. Pages report nothing unless resultsEndpoint and
+// testKey are given; reported records go to navigator.sendBeacon.
+function loadPage(runtimeSource, testData, storage, {resultsEndpoint = null, testKey = '', navigator = {}} = {}) {
+    const document = new FakeDocument();
+    document.body.innerHTML = PAGE_BODY;
+    document.writes = 0;
+    const context = {
+        document,
+        console,
+        getComputedStyle: () => ({gridTemplateColumns: '40px 40px 40px 40px 40px 40px', rowGap: '10px'}),
+        requestAnimationFrame: callback => { callback(); return 1; },
+        cancelAnimationFrame: () => {},
+        requestIdleCallback: callback => setTimeout(() => callback({didTimeout: false, timeRemaining: () => 50}), 0),
+        cancelIdleCallback: handle => clearTimeout(handle),
+        setInterval: () => 0,
+        clearInterval: () => {},
+        setTimeout: (callback, ms) => setTimeout(callback, ms),
+        clearTimeout: handle => clearTimeout(handle),
+        localStorage: storage,
+        addEventListener: (type, listener) => document.addEventListener(type, listener),
+        alert: () => {},
+        navigator,
+    };
+    context.window = context;
+    vm.createContext(context);
+    vm.runInContext(`const testData = ${JSON.stringify(testData)};\n` +
+        `const resultsEndpoint = ${JSON.stringify(resultsEndpoint)};\nconst testKey = ${JSON.stringify(testKey)};`, context);
+    vm.runInContext(runtimeSource, context);
+    const ready = () => (document.listeners.DOMContentLoaded || []).forEach(listener => listener());
+    return {document, context, ready};
+}
+
+// Dispatch a click that bubbles like the browser's, reaching onclick and addEventListener handlers
+function click(element) {
+    const event = {target: element, currentTarget: null, stopPropagation() {}, preventDefault() {}};
+    for (let node = element; node; node = node.parentNode) {
+        event.currentTarget = node;
+        if (node.onclick) node.onclick(event);
+        (node.listeners.click || []).forEach(listener => listener(event));
+    }
+}
+
+module.exports = {FakeDocument, FakeElement, FakeStorage, loadPage, click};
@@ -0,0 +1,322 @@
+"""Local stand-in for a Telegram data center, so MTProto transfers are measured without Telegram
+
+    python benchmarks/fake_mtproto.py [--port 9443] [--latency MS]
+
+Speaks MTProto 2.0 over the abridged TCP transport the way Pyrogram's Session
+does: every packet is AES-256-IGE encrypted and replies are real TL objects.
+The auth key is shared with the client up front (session_string()) instead of
+negotiated, and only what a bot needs to move files is implemented: Ping, the
+InitConnection/GetConfig handshake, updates.GetState, users.GetFullUser and
+users.GetUsers, upload.SaveFilePart/SaveBigFilePart, upload.GetFile and
+messages.SendMedia with an uploaded or an existing document.
+
+Users' files are added with FakeDataCenter.add_file(), which returns a file_id
+to download; point_pyrogram_at() routes every Pyrogram connection in the
+process here. Like fake_bot_api.py, documents the bot sends are only counted,
+not kept, so they can be resent by file_id but not downloaded.
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import os
+import struct
+import time
+from hashlib import sha1, sha256
+from io import BytesIO
+
+from pyrogram import raw
+from pyrogram.crypto import aes, mtproto
+from pyrogram.file_id import FileId, FileType
+from pyrogram.raw.core import Bool, Int, Long, Message, MsgContainer, Vector
+from pyrogram.storage import Storage
+
+DC_ID = 2
+BOT_ID = 1
+
+# upload.GetFile serves at most this much per request, as Telegram does
+MAX_CHUNK = 1024 * 1024
+
+def session_string(auth_key, api_id=1, user_id=BOT_ID):
+    """Pyrogram session string logging a bot into the stand-in with auth_key"""
+    packed = struct.pack(Storage.SESSION_STRING_FORMAT, DC_ID, api_id, False, auth_key, user_id, True)
+    return base64.urlsafe_b64encode(packed).decode().rstrip("=")
+
+def point_pyrogram_at(host, port):
+    """Connect every Pyrogram session in this process, main and media, to host:port"""
+    from pyrogram.connection import connection
+    connection.DataCenter = lambda *args: (host, port)
+
+def frame(data):
+    """Abridged transport framing: the length in 4-byte words, then the data"""
+    length = len(data) // 4
+    return (bytes([length]) if length <= 126 else b"\x7f" + length.to_bytes(3, "little")) + data
+
+def rpc_error(code, message):
+    return raw.types.RpcError(error_code=code, error_message=message).write()
+
+class ClientConnection:
+    """Per-connection state: the client's session, and the ids of the messages sent to it"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.session_id = None
+        self.salt = 0
+        self.last_msg_id = 0
+        self.seq_no = itertools.count(1, 2)
+        # Replies are encrypted and written one at a time so their msg_ids reach the client in order
+        self.lock = asyncio.Lock()
+        self.tasks = set()
+
+    def next_msg_id(self):
+        # Server messages carry odd ids (1 mod 4 for replies) derived from the current time
+        msg_id = max(int(time.time() * 2 ** 32) & ~3, self.last_msg_id + 4) | 1
+        self.last_msg_id = msg_id
+        return msg_id
+
+class FakeDataCenter:
+    """MTProto server holding users' files and counting what the bot sends"""
+
+    def __init__(self, auth_key=None, latency=0.0):
+        self.auth_key = auth_key or os.urandom(256)
+        self.auth_key_id = sha1(self.auth_key).digest()[-8:]
+        self.latency = latency
+        self.ids = itertools.count(1)
+        self.pts = itertools.count(1)
+        self.documents = {}  # document id -> raw Document
+        self.contents = {}   # document id -> bytes of files added by users
+        self.sent = {}       # document id -> size of documents the bot uploaded
+        self.parts = {}      # upload file id -> {part number: bytes}
+        self.calls = {}
+        self.server = None
+        self.methods = {
+            raw.functions.help.GetConfig: self.get_config,
+            raw.functions.updates.GetState: self.get_state,
+            raw.functions.users.GetFullUser: self.get_full_user,
+            raw.functions.users.GetUsers: self.get_users,
+            raw.functions.upload.SaveFilePart: self.save_file_part,
+            raw.functions.upload.SaveBigFilePart: self.save_file_part,
+            raw.functions.upload.GetFile: self.get_file,
+            raw.functions.messages.SendMedia: self.send_media,
+        }
+
+    def _document(self, size, file_name, mime_type):
+        document = raw.types.Document(
+            id=next(self.ids),
+            access_hash=int.from_bytes(os.urandom(7), "little"),
+            file_reference=os.urandom(8),
+            date=int(time.time()),
+            mime_type=mime_type,
+            size=size,
+            dc_id=DC_ID,
+            attributes=[raw.types.DocumentAttributeFilename(file_name=file_name)],
+        )
+        self.documents[document.id] = document
+        return document
+
+    def add_file(self, content, file_name="test.json", mime_type="application/json"):
+        """Store a file as if a user had sent it; returns its file_id"""
+        document = self._document(len(content), file_name, mime_type)
+        self.contents[document.id] = content
+        return FileId(
+            file_type=FileType.DOCUMENT,
+            dc_id=DC_ID,
+            media_id=document.id,
+            access_hash=document.access_hash,
+            file_reference=document.file_reference,
+        ).encode()
+
+    async def start(self, host="127.0.0.1", port=9443):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        connection = ClientConnection(writer)
+        try:
+            # Only the abridged transport, which opens with a single 0xef
+            if await reader.readexactly(1) != b"\xef":
+                return
+            while True:
+                header = await reader.readexactly(1)
+                length = int.from_bytes(await reader.readexactly(3), "little") if header == b"\x7f" else header[0]
+                packet = await reader.readexactly(length * 4)
+                # Requests on one connection are served concurrently, as upload workers expect
+                task = asyncio.create_task(self.handle_packet(connection, packet))
+                connection.tasks.add(task)
+                task.add_done_callback(connection.tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in connection.tasks:
+                task.cancel()
+            writer.close()
+
+    def unpack(self, connection, packet):
+        msg_key = packet[8:24]
+        aes_key, aes_iv = mtproto.kdf(self.auth_key, msg_key, True)
+        data = aes.ige256_decrypt(packet[24:], aes_key, aes_iv)
+        if sha256(self.auth_key[88:120] + data).digest()[8:24] != msg_key:
+            raise ConnectionError("msg_key mismatch")
+        connection.salt = Long.read(BytesIO(data[:8]))
+        connection.session_id = data[8:16]
+        return Message.read(BytesIO(data[16:]))
+
+    def pack(self, connection, body):
+        data = (Long(connection.salt) + connection.session_id + Long(connection.next_msg_id())
+                + Int(next(connection.seq_no)) + Int(len(body)) + body)
+        padding = os.urandom(-(len(data) + 12) % 16 + 12)
+        msg_key = sha256(self.auth_key[96:128] + data + padding).digest()[8:24]
+        aes_key, aes_iv = mtproto.kdf(self.auth_key, msg_key, False)
+        return self.auth_key_id + msg_key + aes.ige256_encrypt(data + padding, aes_key, aes_iv)
+
+    async def handle_packet(self, connection, packet):
+        if packet[:8] != self.auth_key_id:
+            # Transport error -404: auth key not found
+            connection.writer.write(frame(Int(-404)))
+            return
+        message = await asyncio.to_thread(self.unpack, connection, packet)
+        messages = message.body.messages if isinstance(message.body, MsgContainer) else [message]
+        for msg in messages:
+            body = msg.body
+            if isinstance(body, (raw.types.MsgsAck, raw.functions.PingDelayDisconnect)):
+                continue
+            if isinstance(body, raw.functions.Ping):
+                reply = raw.types.Pong(msg_id=msg.msg_id, ping_id=body.ping_id).write()
+            else:
+                reply = Int(raw.types.RpcResult.ID, False) + Long(msg.msg_id) + await self.invoke(body)
+            async with connection.lock:
+                packed = await asyncio.to_thread(self.pack, connection, reply)
+                connection.writer.write(frame(packed))
+
+    async def invoke(self, query):
+        """Serialized result of query, or of the RpcError it fails with"""
+        while isinstance(query, (raw.functions.InvokeWithLayer, raw.functions.InitConnection,
+                                 raw.functions.InvokeWithoutUpdates)):
+            query = query.query
+        name = query.QUALNAME.split(".", 1)[-1]
+        self.calls[name] = self.calls.get(name, 0) + 1
+        handler = self.methods.get(type(query))
+        if handler is None:
+            return rpc_error(400, "INPUT_METHOD_INVALID")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        result = handler(query)
+        return result if isinstance(result, bytes) else result.write()
+
+    def user(self, user_id):
+        if user_id == BOT_ID:
+            return raw.types.User(
+                id=BOT_ID, access_hash=0, bot=True, bot_info_version=1, first_name="Fake Bot", username="fake_test_bot"
+            )
+        return raw.types.User(id=user_id, access_hash=user_id * 7919, first_name=f"User {user_id}")
+
+    def get_config(self, query):
+        now = int(time.time())
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return raw.types.Config(
+            date=now, expires=now + 3600, test_mode=False, this_dc=DC_ID,
+            dc_options=[raw.types.DcOption(id=DC_ID, ip_address=host, port=port)],
+            dc_txt_domain_name="", chat_size_max=200, megagroup_size_max=200000, forwarded_count_max=100,
+            online_update_period_ms=210000, offline_blur_timeout_ms=5000, offline_idle_timeout_ms=30000,
+            online_cloud_timeout_ms=300000, notify_cloud_delay_ms=30000, notify_default_delay_ms=1500,
+            push_chat_period_ms=60000, push_chat_limit=2, edit_time_limit=172800, revoke_time_limit=2147483647,
+            revoke_pm_time_limit=2147483647, rating_e_decay=2419200, stickers_recent_limit=200,
+            channels_read_media_period=604800, call_receive_timeout_ms=20000, call_ring_timeout_ms=90000,
+            call_connect_timeout_ms=30000, call_packet_timeout_ms=10000, me_url_prefix="https://t.me/",
+            caption_length_max=1024, message_length_max=4096, webfile_dc_id=4,
+        )
+
+    def get_state(self, query):
+        return raw.types.updates.State(pts=1, qts=0, date=int(time.time()), seq=0, unread_count=0)
+
+    def get_full_user(self, query):
+        return raw.types.users.UserFull(
+            full_user=raw.types.UserFull(
+                id=BOT_ID,
+                settings=raw.types.PeerSettings(),
+                notify_settings=raw.types.PeerNotifySettings(),
+                common_chats_count=0,
+            ),
+            chats=[],
+            users=[self.user(BOT_ID)],
+        )
+
+    def get_users(self, query):
+        ids = [BOT_ID if isinstance(user, raw.types.InputUserSelf) else user.user_id for user in query.id]
+        return Vector([self.user(user_id) for user_id in ids])
+
+    def save_file_part(self, query):
+        self.parts.setdefault(query.file_id, {})[query.file_part] = query.bytes
+        return Bool(True)
+
+    def get_file(self, query):
+        content = self.contents.get(getattr(query.location, "id", None))
+        if content is None:
+            return rpc_error(400, "FILE_REFERENCE_EXPIRED")
+        if query.limit > MAX_CHUNK or query.offset % 4096 or query.limit % 4096:
+            return rpc_error(400, "LIMIT_INVALID")
+        return raw.types.upload.File(
+            type=raw.types.storage.FilePartial(),
+            mtime=int(time.time()),
+            bytes=content[query.offset:query.offset + query.limit],
+        )
+
+    def send_media(self, query):
+        media = query.media
+        if isinstance(media, raw.types.InputMediaUploadedDocument):
+            parts = self.parts.pop(media.file.id, {})
+            if not parts or len(parts) != getattr(media.file, "parts", len(parts)):
+                return rpc_error(400, "FILE_PARTS_INVALID")
+            size = sum(len(part) for part in parts.values())
+            file_name = next((attribute.file_name for attribute in media.attributes
+                              if isinstance(attribute, raw.types.DocumentAttributeFilename)), media.file.name)
+            document = self._document(size, file_name, media.mime_type)
+            self.sent[document.id] = size
+        elif isinstance(media, raw.types.InputMediaDocument) and media.id.id in self.documents:
+            # Resent by file_id: nothing was uploaded
+            document = self.documents[media.id.id]
+        else:
+            return rpc_error(400, "MEDIA_EMPTY")
+        now = int(time.time())
+        message = raw.types.Message(
+            id=next(self.ids),
+            peer_id=raw.types.PeerUser(user_id=query.peer.user_id),
+            from_id=raw.types.PeerUser(user_id=BOT_ID),
+            out=True,
+            date=now,
+            message=query.message,
+            media=raw.types.MessageMediaDocument(document=document),
+            # An empty vector would be written without its flag set
+            entities=query.entities or None,
+        )
+        return raw.types.Updates(
+            updates=[
+                raw.types.UpdateMessageID(id=message.id, random_id=query.random_id),
+                raw.types.UpdateNewMessage(message=message, pts=next(self.pts), pts_count=1),
+            ],
+            users=[self.user(BOT_ID), self.user(query.peer.user_id)],
+            chats=[],
+            date=now,
+            seq=0,
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9443)
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every RPC")
+    args = parser.parse_args()
+
+    async def serve():
+        dc = FakeDataCenter(latency=args.latency / 1000)
+        await dc.start(args.host, args.port)
+        print(f"Fake DC{DC_ID} on {args.host}:{args.port}; session string: {session_string(dc.auth_key)}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""In-process stand-ins for the python-telegram-bot objects the handlers touch"""
+import asyncio
+import time
+
+class FakeUser:
+    def __init__(self, user_id, first_name="Bench"):
+        self.id = user_id
+        self.first_name = first_name
+
+class FakeFile:
+    def __init__(self, content, latency):
+        self.content = content
+        self.latency = latency
+
+    async def download_to_drive(self, custom_path):
+        await asyncio.sleep(self.latency)
+        with open(custom_path, 'wb') as f:
+            f.write(self.content)
+        return custom_path
+
+    async def download_as_bytearray(self, buf=None):
+        await asyncio.sleep(self.latency)
+        if buf is None:
+            buf = bytearray()
+        buf.extend(self.content)
+        return buf
+
+class FakeDocument:
+    def __init__(self, content, file_name="test.json", latency=0.01):
+        self.file_name = file_name
+        self.file_size = len(content)
+        self._file = FakeFile(content, latency)
+
+    async def get_file(self):
+        return self._file
+
+# file_id -> bytes "stored on Telegram's servers"
+uploaded_files = {}
+
+class FakeSentDocument:
+    def __init__(self, file_id, file_size):
+        self.file_id = file_id
+        self.file_size = file_size
+
+class FakeSentMessage:
+    def __init__(self, document):
+        self.document = document
+
+class FakeMessage:
+    def __init__(self, document=None, latency=0.01):
+        self.document = document
+        self.latency = latency
+        self.replies = []
+        self.created = time.perf_counter()
+        self.replied_document_at = None
+        self.uploaded_bytes = 0
+        self.captions = []
+
+    async def reply_text(self, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.replies.append(text)
+
+    async def reply_document(self, document, **kwargs):
+        if isinstance(document, str) and document in uploaded_files:
+            # Resending by file_id uploads nothing
+            payload = uploaded_files[document]
+            file_id = document
+        else:
+            # Read the payload like the real client would before uploading it
+            if isinstance(document, str):
+                with open(document, 'rb') as f:
+                    payload = f.read()
+            else:
+                payload = getattr(document, 'input_file_content', document)
+            file_id = f"FAKE-{len(uploaded_files)}"
+            uploaded_files[file_id] = payload
+            self.uploaded_bytes += len(payload)
+        await asyncio.sleep(self.latency)
+        self.replies.append(payload)
+        self.captions.append(kwargs.get('caption'))
+        self.replied_document_at = time.perf_counter()
+        return FakeSentMessage(FakeSentDocument(file_id, len(payload)))
+
+class FakeUpdate:
+    def __init__(self, user_id, message):
+        self.effective_user = FakeUser(user_id)
+        self.message = message
+
+def make_upload(user_id, content, latency=0.01):
+    """Update carrying a document upload from user_id"""
+    return FakeUpdate(user_id, FakeMessage(FakeDocument(content, latency=latency), latency=latency))
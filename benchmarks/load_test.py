@@ -0,0 +1,220 @@
+"""End-to-end load test: simulated users upload tests to TelegramTestBot over a fake Bot API
+
+    python benchmarks/load_test.py [--users 50] [--uploads 4] [--questions 200 2000 ...]
+                                   [--api-latency MS] [--think MS] [--json report.json]
+
+The bot runs unmodified in this process, long-polling benchmarks/fake_bot_api.py,
+which runs with the simulated users in a child process so they do not compete
+for the bot's event loop. Each user uploads one file at a time and waits for
+the page (or an error reply) before the next; files cycle through --questions
+sizes and each upload is a distinct test unless --same-file is given (which
+measures the render cache and file_id reuse instead). Per-user rate limits are
+lifted unless --keep-limits is given.
+Reports throughput, reply latency percentiles, peak RSS of the bot and its
+render workers, and the bot's own per-stage p99s.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+
+from synthetic import make_test_bank
+
+from fake_bot_api import FakeBotApi
+
+from aiohttp import web
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+def serve_and_drive(port, users, uploads, contents, same_file, think, api_latency, results, bot_stopped):
+    """Child process: run the fake API and the users, then put the upload records on results
+
+    The API keeps serving until bot_stopped is set, so the bot can shut down cleanly.
+    """
+
+    async def run():
+        api = FakeBotApi(api_latency)
+        runner = web.AppRunner(api.app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        # Users start once the bot is polling
+        await api.polling.wait()
+
+        async def user(user_id, content):
+            for n in range(uploads):
+                body = content
+                if not same_file:
+                    # An extra top-level field changes the content key, so the test is rendered afresh
+                    body = content[:-1] + f', "load_test_upload": "{user_id}-{n}"}}'.encode('ascii')
+                upload = api.upload(user_id, body)
+                try:
+                    await asyncio.wait_for(asyncio.shield(upload.done), 600)
+                except asyncio.TimeoutError:
+                    upload.outcome = "no reply"
+                if think:
+                    await asyncio.sleep(think)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(100000 + i, contents[i % len(contents)]) for i in range(users)))
+        elapsed = time.perf_counter() - start
+        results.put({"elapsed": elapsed, "uploads": [upload.as_dict() for upload in api.uploads], "calls": api.calls})
+        await asyncio.to_thread(bot_stopped.wait)
+        await runner.cleanup()
+
+    asyncio.run(run())
+
+def _rss_kib(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class TreeRss(threading.Thread):
+    """Samples the summed RSS of this process and its children (the render workers)"""
+
+    def __init__(self, exclude, interval=0.1):
+        super().__init__(daemon=True)
+        self.exclude = {str(pid) for pid in exclude}
+        self.interval = interval
+        self.peak_kib = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            children = []
+            for path in glob.glob(f'/proc/{os.getpid()}/task/*/children'):
+                with open(path) as f:
+                    children.extend(f.read().split())
+            total = _rss_kib(os.getpid()) + sum(_rss_kib(pid) for pid in children if pid not in self.exclude)
+            self.peak_kib = max(self.peak_kib, total)
+
+def peak_rss_mib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+async def run_bot(results, sampler):
+    from main import TelegramTestBot
+    bot = TelegramTestBot()
+
+    async def stop_when_done():
+        report = await asyncio.to_thread(results.get)
+        # The same graceful shutdown a deployment's SIGTERM triggers
+        os.kill(os.getpid(), signal.SIGTERM)
+        return report
+
+    watcher = asyncio.create_task(stop_when_done())
+    sampler.start()
+    await bot.start_bot()
+    sampler.stopped.set()
+    return await watcher, bot
+
+def summarize(args, report, bot, rss_tree_mib, input_bytes):
+    uploads = report["uploads"]
+    outcomes = {}
+    for upload in uploads:
+        outcome = upload["outcome"] if upload["outcome"] in ("document", "document (file_id)", "no reply") \
+            else upload["outcome"][:24]
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    replied = [upload["reply_ms"] for upload in uploads if upload["reply_ms"] is not None]
+    first = [upload["first_reply_ms"] for upload in uploads if upload["first_reply_ms"] is not None]
+    stages = {}
+    for stage in bot.metrics.stage_order():
+        p50, p99 = bot.metrics.stages[stage].percentiles(0.5, 0.99)
+        stages[stage] = {"p50_ms": p50 * 1000, "p99_ms": p99 * 1000}
+    return {
+        "users": args.users,
+        "uploads_per_user": args.uploads,
+        "questions": args.questions,
+        "api_latency_ms": args.api_latency,
+        "uploads": len(uploads),
+        "elapsed_s": report["elapsed"],
+        "throughput_per_s": len(uploads) / report["elapsed"],
+        "input_mib_per_s": input_bytes / 1024 / 1024 / report["elapsed"],
+        "outcomes": outcomes,
+        "reply_ms": {q: percentile(replied, float(q[1:]) / 100) for q in ("p50", "p95", "p99")},
+        "first_reply_ms": {q: percentile(first, float(q[1:]) / 100) for q in ("p50", "p95", "p99")},
+        "max_reply_ms": max(replied, default=0.0),
+        "bot_peak_rss_mib": peak_rss_mib(),
+        "tree_peak_rss_mib": rss_tree_mib,
+        "stages": stages,
+        "api_calls": report["calls"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--uploads", type=int, default=4, help="uploads per user, one at a time")
+    parser.add_argument("--questions", type=int, nargs="+", default=[200], help="file sizes, cycled over users")
+    parser.add_argument("--api-latency", type=float, default=0, help="ms added to every Bot API call")
+    parser.add_argument("--think", type=float, default=0, help="ms a user waits between uploads")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--same-file", action="store_true", help="users re-send one file instead of distinct tests")
+    parser.add_argument("--keep-limits", action="store_true", help="keep the per-user upload rate limits")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report_path = os.path.abspath(args.json) if args.json else None
+    os.chdir(tempfile.mkdtemp(prefix="load_test_"))
+    os.environ.update({
+        "BOT_API_URL": f"http://127.0.0.1:{args.port}",
+        "BOT_TOKEN": "123456:LOADTEST",
+        "METRICS_PORT": "0",
+        "RESULTS_URL": "",
+        # Every transfer goes through the fake API; bench_transport.py measures MTProto
+        "TRANSFER_MODE": "botapi",
+        "UPDATE_MODE": "polling",
+    })
+    if not args.keep_limits:
+        os.environ.update({"USER_UPLOADS_PER_MINUTE": "1000000", "USER_UPLOAD_BURST": "1000000"})
+
+    contents = [json.dumps(make_test_bank(size), ensure_ascii=False).encode('utf-8') for size in args.questions]
+    input_bytes = sum(len(contents[i % len(contents)]) for i in range(args.users)) * args.uploads
+
+    results = multiprocessing.Queue()
+    bot_stopped = multiprocessing.Event()
+    users = multiprocessing.Process(target=serve_and_drive, args=(
+        args.port, args.users, args.uploads, contents, args.same_file, args.think / 1000, args.api_latency / 1000,
+        results, bot_stopped
+    ))
+    users.start()
+    sampler = TreeRss(exclude=[users.pid])
+    try:
+        report, bot = asyncio.run(run_bot(results, sampler))
+    finally:
+        bot_stopped.set()
+        users.join()
+    summary = summarize(args, report, bot, sampler.peak_kib / 1024, input_bytes)
+
+    sizes = ", ".join(f"{q} questions ({len(c) / 1024:.0f} KiB)" for q, c in zip(args.questions, contents))
+    print(f"{args.users} users x {args.uploads} {'identical' if args.same_file else 'distinct'} uploads of {sizes}, "
+          f"API latency {args.api_latency:.0f} ms")
+    print(f"{summary['uploads']} uploads in {summary['elapsed_s']:.2f}s: {summary['throughput_per_s']:.1f} uploads/s, "
+          f"{summary['input_mib_per_s']:.1f} MiB/s in; outcomes {summary['outcomes']}")
+    print(f"reply ms     p50 {summary['reply_ms']['p50']:8.0f}  p95 {summary['reply_ms']['p95']:8.0f}  "
+          f"p99 {summary['reply_ms']['p99']:8.0f}  max {summary['max_reply_ms']:8.0f}")
+    print(f"first reply  p50 {summary['first_reply_ms']['p50']:8.0f}  p95 {summary['first_reply_ms']['p95']:8.0f}  "
+          f"p99 {summary['first_reply_ms']['p99']:8.0f}")
+    print(f"peak RSS: bot {summary['bot_peak_rss_mib']:.0f} MiB, bot + render workers {summary['tree_peak_rss_mib']:.0f} MiB")
+    print("stage p99 ms: " + ", ".join(f"{stage} {timing['p99_ms']:.0f}" for stage, timing in summary['stages'].items()))
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""POST recorded Telegram updates to a webhook endpoint and report ingestion latency
+
+    python benchmarks/replay_updates.py URL SECRET [updates.json ...] [--repeat N] [--concurrency C]
+
+Each file may hold one update, a list of updates, or a saved getUpdates response.
+Without files, synthetic /start updates are sent. update_id is rewritten per request
+so repeated replays are not dropped as duplicates.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def load_updates(paths):
+    updates = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'result' in data:
+            data = data['result']
+        updates.extend(data if isinstance(data, list) else [data])
+    return updates
+
+def start_update(user_id):
+    user = {"id": user_id, "is_bot": False, "first_name": f"Replay {user_id}"}
+    return {
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        }
+    }
+
+def post(url, secret, update):
+    request = urllib.request.Request(
+        url, data=json.dumps(update).encode('utf-8'), method='POST',
+        headers={"Content-Type": "application/json", SECRET_HEADER: secret}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("secret")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    updates = load_updates(args.files) if args.files else [start_update(100000 + i) for i in range(100)]
+    payloads = []
+    for _ in range(args.repeat):
+        for update in updates:
+            payloads.append(dict(update, update_id=len(payloads) + 1))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda update: post(args.url, args.secret, update), payloads))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(latency for _, latency in results)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    print(f"{len(payloads)} updates in {elapsed:.2f}s ({len(payloads) / elapsed:.0f}/s), statuses {statuses}")
+    print(f"latency p50 {pick(0.5):.1f} ms, p95 {pick(0.95):.1f} ms, p99 {pick(0.99):.1f} ms")
+
+if __name__ == "__main__":
+    main()
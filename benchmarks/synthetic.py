@@ -0,0 +1,29 @@
+"""Synthetic question banks for the benchmark scripts"""
+import os
+import sys
+
+# Benchmarks are run as scripts from any directory; make the bot modules importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def make_test_bank(num_questions, num_options=4, text_size=120, hindi=False, media_bytes=0):
+    """Build a test JSON document in the format documented in /start"""
+    word = "प्रश्न " if hindi else "question "
+    filler = (word * (text_size // len(word) + 1))[:text_size]
+    media = ""
+    if media_bytes:
+        media = '<img src="data:image/png;base64,' + "A" * media_bytes + '">'
+    keys = "abcdefgh"[:num_options]
+    data = []
+    for i in range(num_questions):
+        data.append({
+            "id": str(i + 1),
+            "question": f"Q{i + 1}. {filler}{media}",
+            "options": {key: f"Option {key.upper()} {filler[:40]}" for key in keys},
+            "answer": keys[i % num_options],
+            "solution": f"Explanation {i + 1}: {filler}",
+            "plus_marks": 4,
+            "minus_marks": 1
+        })
+    return {"data": data}
@@ -0,0 +1,31 @@
+"""Minify and hash the test page runtime for ASSET_MODE=external
+
+    python build_assets.py [output_dir]
+
+Upload the written files to ASSET_BASE_URL; generated tests link them by hash,
+so old and new bundles can be served side by side.
+"""
+import os
+import sys
+
+from template_engine import RUNTIME_CSS, RUNTIME_JS, runtime_bundle
+
+def build(output_dir="assets"):
+    os.makedirs(output_dir, exist_ok=True)
+    bundle = runtime_bundle()
+    for name, text in bundle.items():
+        with open(os.path.join(output_dir, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+    return bundle
+
+def main():
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else "assets"
+    bundle = build(output_dir)
+    source_size = len(RUNTIME_CSS.encode('utf-8')) + len(RUNTIME_JS.encode('utf-8'))
+    bundle_size = sum(len(text.encode('utf-8')) for text in bundle.values())
+    for name, text in bundle.items():
+        print(f"{os.path.join(output_dir, name)}  {len(text.encode('utf-8')) / 1024:.1f} KiB")
+    print(f"Runtime {source_size / 1024:.1f} KiB -> {bundle_size / 1024:.1f} KiB minified")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+
+def output_key(html_content):
+    """Hash of the exact bytes delivered to the user (bytes, or a path to them)"""
+    if isinstance(html_content, os.PathLike):
+        with open(html_content, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    return hashlib.sha256(html_content).hexdigest()
+
+class FileIdIndex:
+    """Persistent map from delivered output hash to the Telegram file_id it was uploaded as
+
+    Queries run in a thread so commits never stall the event loop. Past max_entries
+    the oldest entries are dropped: with personal pages most outputs are sent once.
+    """
+
+    def __init__(self, path="file_ids.sqlite3", max_entries=100000):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # As in ResultStore: WAL without an fsync per commit; a lost file_id only costs a re-upload
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS file_ids ("
+            "output_hash TEXT PRIMARY KEY, file_id TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+        self.db.commit()
+        self.max_entries = max_entries
+        self.entries = self.db.execute("SELECT COUNT(*) FROM file_ids").fetchone()[0]
+        self.reused = 0
+        self.reused_bytes = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self, output_hash):
+        row = await self._query("SELECT file_id FROM file_ids WHERE output_hash = ?", (output_hash,))
+        return row[0] if row else None
+
+    async def put(self, output_hash, file_id, size):
+        await self._query(
+            "INSERT OR REPLACE INTO file_ids (output_hash, file_id, size) VALUES (?, ?, ?)",
+            (output_hash, file_id, size)
+        )
+        # Counts replaced rows too, so pruning may come early; it recounts
+        self.entries += 1
+        if self.entries > self.max_entries:
+            async with self._lock:
+                self.entries = await asyncio.to_thread(self._prune)
+
+    async def forget(self, output_hash):
+        await self._query("DELETE FROM file_ids WHERE output_hash = ?", (output_hash,))
+
+    async def _query(self, sql, params):
+        # One statement at a time on the shared connection
+        async with self._lock:
+            return await asyncio.to_thread(self._execute, sql, params)
+
+    def _execute(self, sql, params):
+        with self.db:
+            return self.db.execute(sql, params).fetchone()
+
+    def _prune(self):
+        """Drop the oldest entries beyond max_entries; returns how many are left"""
+        with self.db:
+            # INSERT OR REPLACE gives a row a new rowid, so rowid order is the order of the last put
+            self.db.execute(
+                "DELETE FROM file_ids WHERE rowid IN (SELECT rowid FROM file_ids ORDER BY rowid DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            return self.db.execute("SELECT COUNT(*) FROM file_ids").fetchone()[0]
+
+    def close(self):
+        self.db.close()
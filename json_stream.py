@@ -0,0 +1,118 @@
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Characters that may still extend a number cut off at the end of the buffer, e.g. "2." or "1e"
+_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+
+class TestDataStream:
+    """Incremental reader for {"data": [...]} documents that yields the data items one at a time
+
+    Only one item (plus one read chunk) is held in memory at once. Other top-level
+    fields are collected into `extra` as they are passed.
+    """
+
+    def __init__(self, fp, chunk_size=1 << 16):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        # utf-8-sig drops a leading BOM the same way json.loads(bytes) does
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.extra = {}
+        self.has_data = False
+        self.count = 0
+
+    def _fill(self, min_chars=0):
+        """Append at least one more chunk to the buffer; False at end of input"""
+        if self.eof:
+            return False
+        # Drop consumed text so the buffer only holds the value being parsed
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        chunk = self.fp.read(max(self.chunk_size, min_chars))
+        if not chunk:
+            self.eof = True
+            self.buf += self.decoder.decode(b'', final=True)
+            return False
+        self.buf += self.decoder.decode(chunk)
+        return True
+
+    def _error(self, msg):
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def _peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise self._error("Unexpected end of data")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise self._error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number or literal cut off at the buffer edge may continue in the next chunk
+                truncated = end == len(self.buf) or (
+                    isinstance(value, (int, float)) and _NUMBER_TAIL.match(self.buf, end)
+                )
+                if not truncated or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so a value larger than one chunk is re-scanned O(log n) times
+            self._fill(len(self.buf) - self.pos)
+
+    def items(self):
+        """Yield each element of the top-level "data" array"""
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+        else:
+            while True:
+                key = self._value()
+                if not isinstance(key, str):
+                    raise self._error("Expecting property name")
+                self._expect(':')
+                if key == 'data' and self._peek() == '[':
+                    self.has_data = True
+                    self.pos += 1
+                    if self._peek() == ']':
+                        self.pos += 1
+                    else:
+                        while True:
+                            item = self._value()
+                            self.count += 1
+                            yield item
+                            separator = self._peek()
+                            self.pos += 1
+                            if separator == ']':
+                                break
+                            if separator != ',':
+                                raise self._error("Expecting ',' delimiter")
+                else:
+                    self.extra[key] = self._value()
+                separator = self._peek()
+                self.pos += 1
+                if separator == '}':
+                    break
+                if separator != ',':
+                    raise self._error("Expecting ',' delimiter")
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                raise self._error("Extra data")
+            if not self._fill():
+                break
@@ -0,0 +1,134 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+HUMAN_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from `extra=` and goes into the JSON
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "context"}
+
+# Request fields (request_id, user_id, stage timings) of the update being handled
+_context = contextvars.ContextVar("log_context", default=None)
+
+def bind(**fields):
+    """Attach fields to every record logged from the current task from now on
+
+    Tasks started afterwards inherit them; each update runs in its own task, so
+    binding at the start of handling scopes the fields to that update.
+    """
+    context = dict(_context.get() or {})
+    context.update(fields)
+    context["timings"] = dict(context.get("timings", {}))
+    _context.set(context)
+
+def add_timings(timings):
+    """Add stage durations in ms (e.g. measured in a render worker) to the current context"""
+    context = _context.get()
+    if context is not None:
+        for stage, ms in timings.items():
+            context["timings"][stage] = round(context["timings"].get(stage, 0) + ms, 1)
+
+def timings():
+    """Stage durations in ms bound so far for the current task"""
+    context = _context.get()
+    return dict(context["timings"]) if context else {}
+
+@contextmanager
+def timed(stage):
+    """Add how long the block took, in ms, to timings[stage] of the current context"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timings({stage: (time.perf_counter() - start) * 1000})
+
+class ContextFilter(logging.Filter):
+    """Copies the bound request fields onto records; runs where the record is logged, before queueing"""
+
+    def filter(self, record):
+        context = _context.get()
+        if context:
+            record.context = {**context, "timings": dict(context["timings"])}
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request fields and extras"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps message and traceback separate for the JSON formatter"""
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+def setup_logging(path="bot.log", level="INFO", max_bytes=10 * 1024 * 1024, backups=5):
+    """Route all logging through a queue to a listener thread
+
+    The calling thread only formats the message and enqueues it; the JSON log file
+    (rotated at max_bytes) and the console are written by the listener. Returns the
+    listener, which is stopped (and drained) at exit.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(HUMAN_FORMAT))
+
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, file_handler, console, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def worker_logging(level="INFO"):
+    """Replace handlers inherited by a forked worker process with direct console output
+
+    The parent's queue has no listener in the child, so records put there would pile
+    up unread. Does nothing in the main process (e.g. thread-mode workers).
+    """
+    if multiprocessing.parent_process() is None:
+        return
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(HUMAN_FORMAT))
+    root.addHandler(console)
+    root.setLevel(level)
@@ -2,25 +2,25 @@ import os
 import json
 import logging
 import asyncio
-import aiofiles
-from datetime import datetime
+import signal
+import tempfile
+import time
 from pathlib import Path
-from pyrogram import Client, filters
-from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters as tg_filters, CallbackQueryHandler, ContextTypes
-import nest_asyncio
-nest_asyncio.apply()  # Colab / Jupyter friendly
+from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters as tg_filters, ContextTypes
+from template_engine import TemplateEngine
+from render_pool import RenderPool, RenderQueueFull, InvalidTestFormat, LoopLagMonitor
+from render_cache import RenderCache, content_key, raw_key, disk_path
+from file_id_index import FileIdIndex, output_key
+from scheduler import FairScheduler, RateLimited, UserQueueFull
+from results_store import ResultStore
+from log_config import bind, setup_logging, timed, timings
+from metrics import Metrics
+from transport import BotApiTransport, FileTooLarge, MTProtoTransport, StaleFileId, Transports
+# aiohttp (the HTTP servers) and numpy (analytics) are imported where they are
+# used, so a bot that does not enable them does not pay for them at startup
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Logging is configured by main(); see log_config.setup_logging
 logger = logging.getLogger(__name__)
 
 class Config:
@@ -29,1019 +29,209 @@ class Config:
         self.API_ID = int(os.getenv('API_ID', '24250238'))
         self.API_HASH = os.getenv('API_HASH', 'cb3f118ce5553dc140127647edcf3720')
         self.BOT_TOKEN = os.getenv('BOT_TOKEN', '6047785902:AAE59KTfmhRvF8sUSYIzl9wcGnm4FLXiWDk')
+        # Bot API server, e.g. a self-hosted telegram-bot-api or benchmarks/fake_bot_api.py; empty = Telegram's
+        self.BOT_API_URL = os.getenv('BOT_API_URL', '').rstrip('/')
+        # File transfers: "auto" moves files over MTPROTO_THRESHOLD_MB through MTProto (Pyrogram, logged in
+        # as the same bot, up to 2000 MB) and the rest through the Bot API; "botapi" or "mtproto" force one.
+        # The Bot API limits are Telegram's; raise them for a self-hosted server in --local mode
+        self.TRANSFER_MODE = os.getenv('TRANSFER_MODE', 'auto')
+        self.MTPROTO_THRESHOLD_MB = int(os.getenv('MTPROTO_THRESHOLD_MB', '20'))
+        self.MTPROTO_TRANSMISSIONS = int(os.getenv('MTPROTO_TRANSMISSIONS', '4'))  # MTProto transfers at once
+        # Holds the Pyrogram session (the bot's MTProto auth key): keep it private and out of the repo
+        self.MTPROTO_SESSION_DIR = os.getenv('MTPROTO_SESSION_DIR', 'sessions')
+        self.BOT_API_DOWNLOAD_LIMIT_MB = int(os.getenv('BOT_API_DOWNLOAD_LIMIT_MB', '20'))
+        self.BOT_API_UPLOAD_LIMIT_MB = int(os.getenv('BOT_API_UPLOAD_LIMIT_MB', '50'))
         
-        # Create necessary directories
-        os.makedirs('uploads', exist_ok=True)
-        os.makedirs('output', exist_ok=True)
-
-class PremiumTestGenerator:
-    def __init__(self):
-        self.config = Config()
-    
-    def generate_premium_html_test(self, json_data, user_id, theme="dark", device="desktop"):
-        """Generate premium HTML test with mobile/desktop and dark/light mode"""
+        # Render stage: "process" or "thread" pool, 0 workers = one per CPU
+        self.RENDER_EXECUTOR = os.getenv('RENDER_EXECUTOR', 'process')
+        self.RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', '0'))
+        self.RENDER_QUEUE_SIZE = int(os.getenv('RENDER_QUEUE_SIZE', '32'))
+        self.RENDER_TIMEOUT = float(os.getenv('RENDER_TIMEOUT', '120'))
         
-        # Theme configurations
-        themes = {
-            "dark": {
-                "bg_primary": "#0f0f23",
-                "bg_secondary": "#1a1a2e",
-                "bg_card": "#16213e",
-                "text_primary": "#ffffff",
-                "text_secondary": "#b0b0b0",
-                "accent": "#ff6b6b",
-                "accent_hover": "#ff5252",
-                "success": "#2ecc71",
-                "danger": "#e74c3c",
-                "warning": "#f39c12",
-                "border": "#2d3748"
-            },
-            "light": {
-                "bg_primary": "#f8f9fa",
-                "bg_secondary": "#ffffff",
-                "bg_card": "#ffffff",
-                "text_primary": "#2d3748",
-                "text_secondary": "#718096",
-                "accent": "#667eea",
-                "accent_hover": "#5a67d8",
-                "success": "#48bb78",
-                "danger": "#f56565",
-                "warning": "#ed8936",
-                "border": "#e2e8f0"
-            }
-        }
+        # Render cache: memory LRU in front of a size-capped disk tier
+        self.CACHE_DIR = os.getenv('CACHE_DIR', 'cache')
+        self.CACHE_MEMORY_MB = int(os.getenv('CACHE_MEMORY_MB', '64'))
+        self.CACHE_DISK_MB = int(os.getenv('CACHE_DISK_MB', '1024'))
+        self.CACHE_TTL = int(os.getenv('CACHE_TTL', '86400'))
         
-        colors = themes[theme]
+        # Telegram file_ids of already delivered outputs, the oldest dropped past FILE_ID_MAX_ENTRIES
+        self.FILE_ID_DB = os.getenv('FILE_ID_DB', 'file_ids.sqlite3')
+        self.FILE_ID_MAX_ENTRIES = int(os.getenv('FILE_ID_MAX_ENTRIES', '100000'))
+        # Print the recipient's id and the date into each page; 0 sends every recipient the same
+        # page (dated in the browser), so popular tests are resent by file_id instead of uploaded
+        self.PERSONAL_PAGES = os.getenv('PERSONAL_PAGES', '1').lower() in ('1', 'true', 'yes')
         
-        # Dynamic values based on device
-        container_width = "100%" if device == "mobile" else "1400px"
-        container_padding = "10px" if device == "mobile" else "20px"
-        header_padding = "15px 10px" if device == "mobile" else "25px 20px"
-        logo_font_size = "20px" if device == "mobile" else "28px"
-        logo_icon_size = "24px" if device == "mobile" else "32px"
-        timer_font_size = "14px" if device == "mobile" else "16px"
-        control_grid = "1fr" if device == "mobile" else "repeat(auto-fit, minmax(200px, 1fr))"
-        info_grid = "repeat(2, 1fr)" if device == "mobile" else "repeat(4, 1fr)"
-        main_display = "block" if device == "mobile" else "flex"
-        questions_margin = "margin-bottom: 20px;" if device == "mobile" else ""
-        nav_order = "order: -1; margin-bottom: 20px;" if device == "mobile" else ""
-        nav_flex = "1" if device == "mobile" else "0 0 300px"
-        question_grid_cols = "repeat(5, 1fr)" if device == "mobile" else "repeat(6, 1fr)"
-        question_btn_size = "35px" if device == "mobile" else "40px"
-        info_value_size = "24px" if device == "mobile" else "32px"
-        actions_justify = "space-between" if device == "desktop" else "center"
-        btn_style = "flex: 1; min-width: 120px; justify-content: center;" if device == "mobile" else ""
-        results_grid = "1fr 1fr" if device == "mobile" else "repeat(4, 1fr)"
+        # Test data embedding: "full", "compact" or "compact-gzip" (solutions decoded lazily in-browser)
+        self.PAYLOAD_MODE = os.getenv('PAYLOAD_MODE', 'full')
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="hi">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>🚀 Premium Test Series</title>
-            <style>
-                * {{
-                    margin: 0;
-                    padding: 0;
-                    box-sizing: border-box;
-                    font-family: 'Segoe UI', system-ui, -apple-system, sans-serif;
-                }}
-                
-                :root {{
-                    --bg-primary: {colors['bg_primary']};
-                    --bg-secondary: {colors['bg_secondary']};
-                    --bg-card: {colors['bg_card']};
-                    --text-primary: {colors['text_primary']};
-                    --text-secondary: {colors['text_secondary']};
-                    --accent: {colors['accent']};
-                    --accent-hover: {colors['accent_hover']};
-                    --success: {colors['success']};
-                    --danger: {colors['danger']};
-                    --warning: {colors['warning']};
-                    --border: {colors['border']};
-                    --shadow: rgba(0, 0, 0, 0.1);
-                    --transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                }}
-                
-                body {{
-                    background: var(--bg-primary);
-                    color: var(--text-primary);
-                    line-height: 1.6;
-                    min-height: 100vh;
-                    transition: var(--transition);
-                }}
-                
-                .container {{
-                    max-width: {container_width};
-                    margin: 0 auto;
-                    padding: {container_padding};
-                }}
-                
-                /* Header Styles */
-                .header {{
-                    background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-                    padding: {header_padding};
-                    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-                    border-radius: 0 0 25px 25px;
-                    margin-bottom: 25px;
-                    backdrop-filter: blur(10px);
-                }}
-                
-                .header-content {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    flex-wrap: wrap;
-                    gap: 15px;
-                }}
-                
-                .logo {{
-                    font-size: {logo_font_size};
-                    font-weight: 800;
-                    display: flex;
-                    align-items: center;
-                    gap: 10px;
-                    color: white;
-                }}
-                
-                .logo-icon {{
-                    font-size: {logo_icon_size};
-                    animation: bounce 2s infinite;
-                }}
-                
-                @keyframes bounce {{
-                    0%, 20%, 50%, 80%, 100% {{ transform: translateY(0); }}
-                    40% {{ transform: translateY(-10px); }}
-                    60% {{ transform: translateY(-5px); }}
-                }}
-                
-                .user-info {{
-                    display: flex;
-                    align-items: center;
-                    gap: 15px;
-                    background: rgba(255, 255, 255, 0.1);
-                    padding: 8px 16px;
-                    border-radius: 20px;
-                    backdrop-filter: blur(10px);
-                    color: white;
-                    font-weight: 500;
-                }}
-                
-                .timer {{
-                    background: rgba(255, 255, 255, 0.2);
-                    color: white;
-                    padding: 8px 16px;
-                    border-radius: 20px;
-                    font-weight: 700;
-                    font-size: {timer_font_size};
-                    box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-                }}
-                
-                /* Control Panel */
-                .control-panel {{
-                    background: var(--bg-card);
-                    border-radius: 20px;
-                    padding: 20px;
-                    margin-bottom: 25px;
-                    box-shadow: 0 8px 32px var(--shadow);
-                    border: 1px solid var(--border);
-                }}
-                
-                .control-grid {{
-                    display: grid;
-                    grid-template-columns: {control_grid};
-                    gap: 15px;
-                    margin-bottom: 20px;
-                }}
-                
-                .control-group {{
-                    display: flex;
-                    flex-direction: column;
-                    gap: 10px;
-                }}
-                
-                .control-label {{
-                    font-weight: 600;
-                    color: var(--text-secondary);
-                    font-size: 14px;
-                }}
-                
-                .btn-group {{
-                    display: flex;
-                    gap: 8px;
-                    flex-wrap: wrap;
-                }}
-                
-                .mode-btn {{
-                    padding: 10px 16px;
-                    border: 2px solid var(--border);
-                    background: var(--bg-secondary);
-                    color: var(--text-primary);
-                    border-radius: 12px;
-                    cursor: pointer;
-                    transition: var(--transition);
-                    font-weight: 600;
-                    font-size: 14px;
-                    flex: 1;
-                    min-width: 80px;
-                }}
-                
-                .mode-btn.active {{
-                    background: var(--accent);
-                    color: white;
-                    border-color: var(--accent);
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-                }}
-                
-                .mode-btn:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px var(--shadow);
-                }}
-                
-                /* Test Info */
-                .test-info {{
-                    background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-                    padding: 25px;
-                    border-radius: 20px;
-                    margin-bottom: 25px;
-                    color: white;
-                    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.2);
-                }}
-                
-                .info-grid {{
-                    display: grid;
-                    grid-template-columns: {info_grid};
-                    gap: 15px;
-                }}
-                
-                .info-item {{
-                    background: rgba(255, 255, 255, 0.1);
-                    padding: 20px;
-                    border-radius: 15px;
-                    text-align: center;
-                    backdrop-filter: blur(10px);
-                    border: 1px solid rgba(255, 255, 255, 0.2);
-                }}
-                
-                .info-value {{
-                    font-size: {info_value_size};
-                    font-weight: 800;
-                    margin-bottom: 5px;
-                }}
-                
-                .info-label {{
-                    font-size: 12px;
-                    opacity: 0.9;
-                    font-weight: 500;
-                }}
-                
-                /* Main Content */
-                .main-content {{
-                    display: {main_display};
-                    gap: 25px;
-                }}
-                
-                .questions-section {{
-                    flex: 1;
-                    background: var(--bg-card);
-                    border-radius: 20px;
-                    padding: 25px;
-                    box-shadow: 0 8px 32px var(--shadow);
-                    border: 1px solid var(--border);
-                    {questions_margin}
-                }}
-                
-                .question-nav {{
-                    flex: {nav_flex};
-                    background: var(--bg-card);
-                    border-radius: 20px;
-                    padding: 20px;
-                    box-shadow: 0 8px 32px var(--shadow);
-                    border: 1px solid var(--border);
-                    {nav_order}
-                }}
-                
-                .question-nav h3 {{
-                    margin-bottom: 20px;
-                    padding-bottom: 15px;
-                    border-bottom: 2px solid var(--border);
-                    color: var(--text-primary);
-                    font-size: 18px;
-                    font-weight: 700;
-                }}
-                
-                .question-grid {{
-                    display: grid;
-                    grid-template-columns: {question_grid_cols};
-                    gap: 10px;
-                    margin-bottom: 20px;
-                }}
-                
-                .question-btn {{
-                    width: {question_btn_size};
-                    height: {question_btn_size};
-                    border: 2px solid var(--border);
-                    border-radius: 10px;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    cursor: pointer;
-                    transition: var(--transition);
-                    font-weight: 700;
-                    font-size: 14px;
-                    background: var(--bg-secondary);
-                    color: var(--text-primary);
-                }}
-                
-                .question-btn:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 5px 15px var(--shadow);
-                }}
-                
-                .question-btn.answered {{
-                    background: var(--success);
-                    color: white;
-                    border-color: var(--success);
-                }}
-                
-                .question-btn.current {{
-                    background: var(--accent);
-                    color: white;
-                    border-color: var(--accent);
-                    transform: scale(1.1);
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-                }}
-                
-                .question-btn.skipped {{
-                    background: var(--warning);
-                    color: white;
-                    border-color: var(--warning);
-                }}
-                
-                .question-btn.incorrect {{
-                    background: var(--danger);
-                    color: white;
-                    border-color: var(--danger);
-                }}
-                
-                /* Question Styles */
-                .question {{
-                    margin-bottom: 30px;
-                }}
-                
-                .question-number {{
-                    font-size: 18px;
-                    font-weight: 700;
-                    margin-bottom: 15px;
-                    color: var(--text-primary);
-                    display: flex;
-                    align-items: center;
-                    gap: 10px;
-                }}
-                
-                .question-number::before {{
-                    content: "🎯";
-                    font-size: 16px;
-                }}
-                
-                .question-text {{
-                    font-size: 16px;
-                    margin-bottom: 20px;
-                    line-height: 1.7;
-                    background: var(--bg-secondary);
-                    padding: 20px;
-                    border-radius: 15px;
-                    border-left: 4px solid var(--accent);
-                    box-shadow: 0 4px 15px var(--shadow);
-                }}
-                
-                .options {{
-                    display: flex;
-                    flex-direction: column;
-                    gap: 12px;
-                }}
-                
-                .option {{
-                    display: flex;
-                    align-items: flex-start;
-                    gap: 15px;
-                    padding: 18px;
-                    border: 2px solid var(--border);
-                    border-radius: 15px;
-                    cursor: pointer;
-                    transition: var(--transition);
-                    background: var(--bg-secondary);
-                }}
-                
-                .option:hover {{
-                    border-color: var(--accent);
-                    background: var(--bg-card);
-                    transform: translateX(5px);
-                    box-shadow: 0 5px 20px var(--shadow);
-                }}
-                
-                .option.selected {{
-                    background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-                    border-color: var(--accent);
-                    color: white;
-                    transform: translateX(5px);
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-                }}
-                
-                .option.correct {{
-                    background: linear-gradient(135deg, var(--success), #27ae60);
-                    border-color: var(--success);
-                    color: white;
-                    box-shadow: 0 8px 25px rgba(46, 204, 113, 0.3);
-                }}
-                
-                .option.incorrect {{
-                    background: linear-gradient(135deg, var(--danger), #c0392b);
-                    border-color: var(--danger);
-                    color: white;
-                    box-shadow: 0 8px 25px rgba(231, 76, 60, 0.3);
-                }}
-                
-                .option-label {{
-                    font-weight: 700;
-                    min-width: 35px;
-                    height: 35px;
-                    background: var(--border);
-                    color: var(--text-primary);
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    transition: var(--transition);
-                }}
-                
-                .option.selected .option-label {{
-                    background: white;
-                    color: var(--accent);
-                }}
-                
-                .option.correct .option-label {{
-                    background: white;
-                    color: var(--success);
-                }}
-                
-                .option.incorrect .option-label {{
-                    background: white;
-                    color: var(--danger);
-                }}
-                
-                /* Actions */
-                .actions {{
-                    display: flex;
-                    justify-content: {actions_justify};
-                    flex-wrap: wrap;
-                    gap: 10px;
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 2px solid var(--border);
-                }}
-                
-                .btn {{
-                    padding: 12px 24px;
-                    border: none;
-                    border-radius: 12px;
-                    cursor: pointer;
-                    font-weight: 700;
-                    transition: var(--transition);
-                    font-size: 14px;
-                    display: flex;
-                    align-items: center;
-                    gap: 8px;
-                    {btn_style}
-                }}
-                
-                .btn-primary {{
-                    background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-                    color: white;
-                }}
-                
-                .btn-primary:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
-                }}
-                
-                .btn-secondary {{
-                    background: var(--bg-secondary);
-                    color: var(--text-primary);
-                    border: 2px solid var(--border);
-                }}
-                
-                .btn-secondary:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px var(--shadow);
-                }}
-                
-                .btn-success {{
-                    background: linear-gradient(135deg, var(--success), #27ae60);
-                    color: white;
-                }}
-                
-                .btn-success:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(46, 204, 113, 0.4);
-                }}
-                
-                /* Solution */
-                .solution {{
-                    margin-top: 25px;
-                    padding: 25px;
-                    background: var(--bg-secondary);
-                    border-radius: 15px;
-                    border-left: 5px solid var(--accent);
-                    box-shadow: 0 4px 15px var(--shadow);
-                }}
-                
-                .solution h4 {{
-                    margin-bottom: 15px;
-                    color: var(--text-primary);
-                    display: flex;
-                    align-items: center;
-                    gap: 10px;
-                    font-size: 18px;
-                }}
-                
-                .solution h4::before {{
-                    content: "💡";
-                }}
-                
-                /* Results */
-                .results {{
-                    text-align: center;
-                    padding: 40px;
-                    background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-                    border-radius: 25px;
-                    color: white;
-                    box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-                }}
-                
-                .results h2 {{
-                    margin-bottom: 30px;
-                    font-size: 32px;
-                    font-weight: 800;
-                }}
-                
-                .results-grid {{
-                    display: grid;
-                    grid-template-columns: {results_grid};
-                    gap: 20px;
-                    margin: 30px 0;
-                }}
-                
-                .result-item {{
-                    background: rgba(255, 255, 255, 0.1);
-                    padding: 25px;
-                    border-radius: 20px;
-                    backdrop-filter: blur(10px);
-                    border: 1px solid rgba(255, 255, 255, 0.2);
-                }}
-                
-                .result-value {{
-                    font-size: 36px;
-                    font-weight: 800;
-                    margin-bottom: 10px;
-                }}
-                
-                .result-label {{
-                    font-size: 14px;
-                    opacity: 0.9;
-                    font-weight: 500;
-                }}
-                
-                /* Responsive */
-                @media (max-width: 768px) {{
-                    .container {{
-                        padding: 10px;
-                    }}
-                    
-                    .header-content {{
-                        flex-direction: column;
-                        text-align: center;
-                    }}
-                    
-                    .control-grid {{
-                        grid-template-columns: 1fr;
-                    }}
-                    
-                    .actions {{
-                        flex-direction: column;
-                    }}
-                    
-                    .btn {{
-                        width: 100%;
-                    }}
-                }}
-                
-                /* Custom Scrollbar */
-                ::-webkit-scrollbar {{
-                    width: 8px;
-                }}
-                
-                ::-webkit-scrollbar-track {{
-                    background: var(--bg-secondary);
-                    border-radius: 10px;
-                }}
-                
-                ::-webkit-scrollbar-thumb {{
-                    background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-                    border-radius: 10px;
-                }}
-                
-                ::-webkit-scrollbar-thumb:hover {{
-                    background: var(--accent-hover);
-                }}
-                
-                /* Animations */
-                @keyframes fadeIn {{
-                    from {{ opacity: 0; transform: translateY(20px); }}
-                    to {{ opacity: 1; transform: translateY(0); }}
-                }}
-                
-                .fade-in {{
-                    animation: fadeIn 0.6s ease-out;
-                }}
-                
-                .hidden {{
-                    display: none;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <div class="container">
-                    <div class="header-content">
-                        <div class="logo">
-                            <span class="logo-icon">🚀</span>
-                            Premium Test Series
-                        </div>
-                        <div class="user-info">
-                            <div class="timer" id="timer">03:00:00</div>
-                            <div>User: {user_id}</div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="container">
-                <!-- Control Panel -->
-                <div class="control-panel fade-in">
-                    <div class="control-grid">
-                        <div class="control-group">
-                            <div class="control-label">🎨 Theme Mode</div>
-                            <div class="btn-group">
-                                <button class="mode-btn {'active' if theme == 'dark' else ''}" onclick="switchTheme('dark')">
-                                    🌙 Dark
-                                </button>
-                                <button class="mode-btn {'active' if theme == 'light' else ''}" onclick="switchTheme('light')">
-                                    ☀️ Light
-                                </button>
-                            </div>
-                        </div>
-                        
-                        <div class="control-group">
-                            <div class="control-label">📱 Device View</div>
-                            <div class="btn-group">
-                                <button class="mode-btn {'active' if device == 'mobile' else ''}" onclick="switchDevice('mobile')">
-                                    📱 Mobile
-                                </button>
-                                <button class="mode-btn {'active' if device == 'desktop' else ''}" onclick="switchDevice('desktop')">
-                                    🖥️ Desktop
-                                </button>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-                
-                <!-- Test Info -->
-                <div class="test-info fade-in">
-                    <h3 style="margin-bottom: 20px; display: flex; align-items: center; gap: 10px;">
-                        <span>📊</span> Test Overview
-                    </h3>
-                    <div class="info-grid">
-                        <div class="info-item">
-                            <div class="info-value">{len(json_data['data'])}</div>
-                            <div class="info-label">Total Questions</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-value">180</div>
-                            <div class="info-label">Minutes</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-value">+4/-1</div>
-                            <div class="info-label">Marking</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-value">{datetime.now().strftime('%d/%m/%Y')}</div>
-                            <div class="info-label">Date</div>
-                        </div>
-                    </div>
-                </div>
-                
-                <!-- Main Content -->
-                <div class="main-content">
-                    <div class="question-nav fade-in">
-                        <h3>🧭 Navigation</h3>
-                        <div class="question-grid" id="questionGrid">
-                            <!-- Navigation buttons will be loaded here -->
-                        </div>
-                        
-                        <div class="solution" id="solutionContainer">
-                            <h4>Solution & Explanation</h4>
-                            <div id="solutionText">Select an option to view detailed solution</div>
-                        </div>
-                    </div>
-                    
-                    <div class="questions-section fade-in">
-                        <div class="question" id="questionContainer">
-                            <!-- Question content will be loaded here -->
-                        </div>
-                        
-                        <div class="actions">
-                            <button class="btn btn-secondary" id="prevBtn">
-                                <span>⬅️</span> Previous
-                            </button>
-                            <button class="btn btn-secondary" id="skipBtn">
-                                <span>⏭️</span> Skip
-                            </button>
-                            <button class="btn btn-primary" id="nextBtn">
-                                Next <span>➡️</span>
-                            </button>
-                            <button class="btn btn-success" id="submitBtn">
-                                <span>🚀</span> Submit Test
-                            </button>
-                        </div>
-                    </div>
-                </div>
-            </div>
-
-            <script>
-                // Test data
-                const testData = {json.dumps(json_data, ensure_ascii=False)};
-                
-                // Application state
-                let currentQuestionIndex = 0;
-                let userAnswers = {{}};
-                let currentTheme = '{theme}';
-                let currentDevice = '{device}';
-                let timerInterval;
-                let timeRemaining = 10800; // 3 hours
-                let testSubmitted = false;
-
-                // Initialize test
-                function initializeTest() {{
-                    createQuestionNavigation();
-                    loadQuestion(currentQuestionIndex);
-                    startTimer();
-                    setupEventListeners();
-                }}
-
-                function createQuestionNavigation() {{
-                    const grid = document.getElementById('questionGrid');
-                    grid.innerHTML = '';
-                    
-                    testData.data.forEach((question, index) => {{
-                        const button = document.createElement('div');
-                        button.className = 'question-btn';
-                        button.textContent = index + 1;
-                        button.onclick = () => loadQuestion(index);
-                        grid.appendChild(button);
-                    }});
-                    updateNavigationButtons();
-                }}
-
-                function loadQuestion(index) {{
-                    if (testSubmitted) return;
-                    
-                    currentQuestionIndex = index;
-                    const question = testData.data[index];
-                    
-                    let optionsHtml = '';
-                    const userAnswer = userAnswers[question.id];
-                    const correctAnswer = question.answer;
-                    
-                    // Generate options with correct/incorrect highlighting after submission
-                    Object.entries(question.options).forEach(([key, value]) => {{
-                        if (!value) return;
-                        
-                        let optionClass = 'option';
-                        if (userAnswer === `option${{key}}`) {{
-                            optionClass += ' selected';
-                        }}
-                        if (testSubmitted) {{
-                            if (key === correctAnswer) {{
-                                optionClass += ' correct';
-                            }} else if (userAnswer === `option${{key}}` && key !== correctAnswer) {{
-                                optionClass += ' incorrect';
-                            }}
-                        }}
-                        
-                        optionsHtml += `
-                            <div class="${{optionClass}}" data-option="option${{key}}">
-                                <div class="option-label">${{key.toUpperCase()}}</div>
-                                <div class="option-text">${{value}}</div>
-                            </div>
-                        `;
-                    }});
-                    
-                    document.getElementById('questionContainer').innerHTML = `
-                        <div class="question-number">Question ${{index + 1}} of ${{testData.data.length}}</div>
-                        <div class="question-text">${{question.question}}</div>
-                        <div class="options">${{optionsHtml}}</div>
-                    `;
-                    
-                    // Add event listeners to options
-                    document.querySelectorAll('.option').forEach(option => {{
-                        option.onclick = () => selectOption(question, option);
-                    }});
-                    
-                    updateNavigationButtons();
-                    updateSolution(question);
-                }}
-
-                function selectOption(question, optionElement) {{
-                    if (testSubmitted) return;
-                    
-                    // Remove selection from all options
-                    document.querySelectorAll('.option').forEach(opt => {{
-                        opt.classList.remove('selected');
-                    }});
-                    
-                    // Add selection to clicked option
-                    optionElement.classList.add('selected');
-                    
-                    // Save answer
-                    userAnswers[question.id] = optionElement.dataset.option;
-                    
-                    // Update navigation
-                    updateQuestionStatus(question.id, 'answered');
-                    
-                    // Show solution
-                    updateSolution(question);
-                }}
-
-                function updateSolution(question) {{
-                    const solutionText = document.getElementById('solutionText');
-                    if (userAnswers[question.id] && question.solution) {{
-                        solutionText.innerHTML = `
-                            <strong>✅ Correct Answer:</strong> Option ${{question.answer.toUpperCase()}}<br><br>
-                            <strong>💡 Explanation:</strong><br>
-                            ${{question.solution}}
-                        `;
-                    }} else {{
-                        solutionText.textContent = 'Select an option to view detailed solution';
-                    }}
-                }}
-
-                function updateNavigationButtons() {{
-                    const buttons = document.querySelectorAll('.question-btn');
-                    buttons.forEach((button, index) => {{
-                        button.classList.remove('current', 'answered', 'skipped', 'incorrect');
-                        
-                        if (index === currentQuestionIndex) {{
-                            button.classList.add('current');
-                        }}
-                        
-                        const questionId = testData.data[index].id;
-                        if (userAnswers[questionId]) {{
-                            if (testSubmitted) {{
-                                const isCorrect = userAnswers[questionId] === `option${{testData.data[index].answer}}`;
-                                button.classList.add(isCorrect ? 'answered' : 'incorrect');
-                            }} else {{
-                                button.classList.add('answered');
-                            }}
-                        }}
-                    }});
-                    
-                    // Update button states
-                    document.getElementById('prevBtn').disabled = currentQuestionIndex === 0;
-                    document.getElementById('nextBtn').disabled = currentQuestionIndex === testData.data.length - 1;
-                }}
-
-                function updateQuestionStatus(questionId, status) {{
-                    const index = testData.data.findIndex(q => q.id === questionId);
-                    const button = document.querySelectorAll('.question-btn')[index];
-                    button.classList.add(status);
-                }}
-
-                function switchTheme(theme) {{
-                    currentTheme = theme;
-                    // In a real implementation, you would reload the page with new theme
-                    alert(`Theme switched to ${{theme}} mode!`);
-                }}
-
-                function switchDevice(device) {{
-                    currentDevice = device;
-                    // In a real implementation, you would reload the page with new device view
-                    alert(`View switched to ${{device}} mode!`);
-                }}
-
-                function startTimer() {{
-                    timerInterval = setInterval(() => {{
-                        timeRemaining--;
-                        updateTimerDisplay();
-                        if (timeRemaining <= 0) submitTest();
-                    }}, 1000);
-                }}
-
-                function updateTimerDisplay() {{
-                    const hours = Math.floor(timeRemaining / 3600);
-                    const minutes = Math.floor((timeRemaining % 3600) / 60);
-                    const seconds = timeRemaining % 60;
-                    document.getElementById('timer').textContent = 
-                        `${{hours.toString().padStart(2, '0')}}:${{minutes.toString().padStart(2, '0')}}:${{seconds.toString().padStart(2, '0')}}`;
-                }}
-
-                function submitTest() {{
-                    clearInterval(timerInterval);
-                    testSubmitted = true;
-                    
-                    // Calculate results
-                    let score = 0;
-                    let correct = 0;
-                    let incorrect = 0;
-                    let skipped = 0;
-                    
-                    testData.data.forEach(question => {{
-                        if (userAnswers[question.id] === `option${{question.answer}}`) {{
-                            score += question.plus_marks || 4;
-                            correct++;
-                        }} else if (userAnswers[question.id] && userAnswers[question.id] !== 'skipped') {{
-                            score -= question.minus_marks || 1;
-                            incorrect++;
-                        }} else {{
-                            skipped++;
-                        }}
-                    }});
-                    
-                    // Show results
-                    document.getElementById('questionContainer').innerHTML = `
-                        <div class="results">
-                            <h2>🎉 Test Completed! 🎉</h2>
-                            <div class="results-grid">
-                                <div class="result-item">
-                                    <div class="result-value">${{score.toFixed(2)}}</div>
-                                    <div class="result-label">Total Score</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-value">${{correct}}</div>
-                                    <div class="result-label">Correct</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-value">${{incorrect}}</div>
-                                    <div class="result-label">Incorrect</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-value">${{skipped}}</div>
-                                    <div class="result-label">Skipped</div>
-                                </div>
-                            </div>
-                            <p style="font-size: 18px; opacity: 0.9;">Time Taken: ${{document.getElementById('timer').textContent}}</p>
-                        </div>
-                    `;
-                    
-                    document.querySelector('.actions').style.display = 'none';
-                    
-                    // Reload current question to show correct/incorrect highlights
-                    loadQuestion(currentQuestionIndex);
-                }}
+        # Page runtime: "inline", "minified" or "external" (hashed bundle from build_assets.py at ASSET_BASE_URL)
+        self.ASSET_MODE = os.getenv('ASSET_MODE', 'inline')
+        self.ASSET_BASE_URL = os.getenv('ASSET_BASE_URL', '')
+        
+        # Images in question markup: off, dedupe (each distinct image stored once) or optimize
+        # (also downscaled and re-encoded); remote images are only inlined if fetching is enabled.
+        # Optimized images are cached in IMAGE_CACHE_DIR, least recently used first out past IMAGE_CACHE_MB
+        self.IMAGE_MODE = os.getenv('IMAGE_MODE', 'off')
+        self.IMAGE_MAX_SIDE = int(os.getenv('IMAGE_MAX_SIDE', '1280'))
+        self.IMAGE_FETCH_REMOTE = os.getenv('IMAGE_FETCH_REMOTE', '0').lower() in ('1', 'true', 'yes')
+        self.IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'media_cache')
+        self.IMAGE_CACHE_MB = int(os.getenv('IMAGE_CACHE_MB', '256'))
+        
+        # Uploads above this size (bytes) are spilled to uploads/ and streamed instead of held in memory
+        self.SPILL_THRESHOLD = int(os.getenv('SPILL_THRESHOLD', str(4 * 1024 * 1024)))
+        
+        # Document handling: global concurrency limit, per-user token bucket (uploads per minute, burst)
+        # and per-user cap on queued + running uploads
+        self.MAX_CONCURRENT_JOBS = int(os.getenv('MAX_CONCURRENT_JOBS', '4'))
+        self.USER_UPLOADS_PER_MINUTE = float(os.getenv('USER_UPLOADS_PER_MINUTE', '6'))
+        self.USER_UPLOAD_BURST = int(os.getenv('USER_UPLOAD_BURST', '3'))
+        self.USER_MAX_PENDING = int(os.getenv('USER_MAX_PENDING', '3'))
+        
+        # Update delivery: "polling" or "webhook" (embedded HTTP server behind a TLS-terminating proxy)
+        self.UPDATE_MODE = os.getenv('UPDATE_MODE', 'polling')
+        self.UPDATE_WORKERS = int(os.getenv('UPDATE_WORKERS', '256'))  # updates handled concurrently
+        self.WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+        self.WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+        self.WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+        # Public URL registered with Telegram on startup; leave empty when another instance registers it
+        self.WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+        self.WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+        self.WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+        # Result collection: RESULTS_URL is the public address pages report to; empty disables it
+        self.RESULTS_URL = os.getenv('RESULTS_URL', '')
+        self.RESULTS_LISTEN = os.getenv('RESULTS_LISTEN', '0.0.0.0')
+        self.RESULTS_PORT = int(os.getenv('RESULTS_PORT', '8081'))
+        self.RESULTS_PATH = os.getenv('RESULTS_PATH', '/results')
+        self.RESULTS_DB = os.getenv('RESULTS_DB', 'results.sqlite3')
+        self.RESULTS_BATCH_SIZE = int(os.getenv('RESULTS_BATCH_SIZE', '500'))
+        self.RESULTS_FLUSH_INTERVAL = float(os.getenv('RESULTS_FLUSH_INTERVAL', '1.0'))
+        
+        # JSON log file, rotated at LOG_MAX_MB and written off the event loop
+        self.LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+        self.LOG_MAX_MB = int(os.getenv('LOG_MAX_MB', '10'))
+        self.LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', '5'))
+        
+        # Prometheus-style metrics on http://METRICS_LISTEN:METRICS_PORT/metrics, e.g. port 9464; 0 (the default)
+        # disables it. 9100 would collide with node_exporter on most monitored hosts
+        self.METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+        self.METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+        # Telegram user ids allowed to use /perf
+        self.ADMIN_IDS = [int(x) for x in os.getenv('ADMIN_IDS', '').split(',') if x]
+        
+        # Seconds to let in-flight tests finish on SIGTERM/SIGINT
+        self.SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', '30'))
+    
+    def engine_options(self):
+        """TemplateEngine arguments, shared by the bot process and render workers"""
+        return {
+            "assets": self.ASSET_MODE,
+            "asset_base_url": self.ASSET_BASE_URL,
+            "results_url": self.RESULTS_URL,
+            "images": self.IMAGE_MODE,
+            "image_max_side": self.IMAGE_MAX_SIDE,
+            "fetch_remote_images": self.IMAGE_FETCH_REMOTE,
+            "image_cache_dir": self.IMAGE_CACHE_DIR,
+            "image_cache_bytes": self.IMAGE_CACHE_MB * 1024 * 1024,
+        }
 
-                function setupEventListeners() {{
-                    document.getElementById('prevBtn').onclick = () => {{
-                        if (currentQuestionIndex > 0) loadQuestion(currentQuestionIndex - 1);
-                    }};
-                    
-                    document.getElementById('nextBtn').onclick = () => {{
-                        if (currentQuestionIndex < testData.data.length - 1) loadQuestion(currentQuestionIndex + 1);
-                    }};
-                    
-                    document.getElementById('skipBtn').onclick = () => {{
-                        userAnswers[testData.data[currentQuestionIndex].id] = 'skipped';
-                        updateQuestionStatus(testData.data[currentQuestionIndex].id, 'skipped');
-                        if (currentQuestionIndex < testData.data.length - 1) loadQuestion(currentQuestionIndex + 1);
-                    }};
-                    
-                    document.getElementById('submitBtn').onclick = submitTest;
-                }}
+class PremiumTestGenerator:
+    def __init__(self, config=None):
+        self.config = config or Config()
+        # Compile every theme/device shell once at startup
+        self.engine = TemplateEngine(**self.config.engine_options())
+    
+    def render_premium_html_test(self, json_data, user_id, theme="dark", device="desktop", payload=None):
+        """Render premium HTML test as UTF-8 bytes from the precompiled shells
 
-                // Initialize when page loads
-                document.addEventListener('DOMContentLoaded', initializeTest);
-            </script>
-        </body>
-        </html>
+        Results are reported under the same content key the bot would give the page.
         """
-        
-        return html_content
+        payload = payload or self.config.PAYLOAD_MODE
+        key = content_key(json_data, theme, device, payload, self.engine.fingerprint)
+        return self.engine.render(json_data, user_id, theme=theme, device=device, payload=payload, test_key=key)
+    
+    def generate_premium_html_test(self, json_data, user_id, theme="dark", device="desktop"):
+        """Generate premium HTML test with mobile/desktop and dark/light mode"""
+        return self.render_premium_html_test(json_data, user_id, theme, device).decode('utf-8')
+
+TEST_CAPTION = (
+    "🎉 **Your Premium Test is Ready!**\n\n"
+    "**Instructions:**\n"
+    "1. Download this HTML file\n"
+    "2. Open in any browser\n"
+    "3. Start your test!\n\n"
+    "✨ Features: Dark/Light Mode • Mobile/Desktop • Timer • Scoring"
+)
 
 class TelegramTestBot:
-    def __init__(self):
-        self.config = Config()
-        self.test_generator = PremiumTestGenerator()
+    def __init__(self, config=None):
+        self.config = config or Config()
+        os.makedirs('uploads', exist_ok=True)
+        self.test_generator = PremiumTestGenerator(self.config)
+        self.render_pool = RenderPool(
+            executor=self.config.RENDER_EXECUTOR,
+            workers=self.config.RENDER_WORKERS,
+            queue_size=self.config.RENDER_QUEUE_SIZE,
+            timeout=self.config.RENDER_TIMEOUT,
+            engine_options=self.config.engine_options()
+        )
+        self.lag_monitor = LoopLagMonitor()
+        self.render_cache = RenderCache(
+            cache_dir=self.config.CACHE_DIR,
+            memory_bytes=self.config.CACHE_MEMORY_MB * 1024 * 1024,
+            disk_bytes=self.config.CACHE_DISK_MB * 1024 * 1024,
+            ttl=self.config.CACHE_TTL
+        )
+        self.file_ids = FileIdIndex(self.config.FILE_ID_DB, self.config.FILE_ID_MAX_ENTRIES)
+        self.scheduler = FairScheduler(
+            max_concurrent=self.config.MAX_CONCURRENT_JOBS,
+            user_rate=self.config.USER_UPLOADS_PER_MINUTE / 60,
+            user_burst=self.config.USER_UPLOAD_BURST,
+            user_max_pending=self.config.USER_MAX_PENDING
+        )
+        self.results = None
+        if self.config.RESULTS_URL:
+            self.results = ResultStore(
+                self.config.RESULTS_DB,
+                batch_size=self.config.RESULTS_BATCH_SIZE,
+                flush_interval=self.config.RESULTS_FLUSH_INTERVAL
+            )
+        self.transports = self.make_transports()
+        self.metrics = Metrics()
+        self.register_collectors()
+    
+    def register_collectors(self):
+        """Export the counts the cache, file_id index, scheduler and render pool already keep"""
+        self.metrics.collect("cache_requests_total", "counter", "Render cache lookups and file_id reuses, by result", lambda: [
+            ({"cache": "render", "result": "hit"}, self.render_cache.hits),
+            ({"cache": "render", "result": "miss"}, self.render_cache.misses),
+            ({"cache": "file_id", "result": "hit"}, self.file_ids.reused),
+        ])
+        self.metrics.collect("bytes_reused_total", "counter", "Bytes not uploaded thanks to file_id reuse",
+                             lambda: self.file_ids.reused_bytes)
+        self.metrics.collect("queue_depth", "gauge", "Uploads waiting for a scheduler slot",
+                             lambda: self.scheduler.queue_depth())
+        self.metrics.collect("jobs_running", "gauge", "Uploads being processed", lambda: self.scheduler.running)
+        self.metrics.collect("render_pending", "gauge", "Render jobs submitted to the pool and not finished",
+                             lambda: self.render_pool.pending)
+        self.metrics.collect("loop_lag_p99_seconds", "gauge", "p99 event loop lag over recent samples",
+                             lambda: self.lag_monitor.summary()["p99_ms"] / 1000)
+    
+    def make_transports(self):
+        """Bot API transport, plus MTProto unless TRANSFER_MODE is botapi"""
+        config = self.config
+        bot_api = BotApiTransport(
+            download_limit=config.BOT_API_DOWNLOAD_LIMIT_MB * 1024 * 1024,
+            upload_limit=config.BOT_API_UPLOAD_LIMIT_MB * 1024 * 1024
+        )
+        mtproto = None
+        if config.TRANSFER_MODE != 'botapi':
+            mtproto = MTProtoTransport(
+                config.API_ID, config.API_HASH, config.BOT_TOKEN,
+                workdir=config.MTPROTO_SESSION_DIR,
+                transmissions=config.MTPROTO_TRANSMISSIONS
+            )
+        return Transports(bot_api, mtproto, config.TRANSFER_MODE, config.MTPROTO_THRESHOLD_MB * 1024 * 1024)
         
     async def start_bot(self):
         """Start both Pyrogram and python-telegram-bot"""
@@ -1049,7 +239,17 @@ class TelegramTestBot:
     
     async def start_telegram_bot(self):
         """Start python-telegram-bot"""
-        application = Application.builder().token(self.config.BOT_TOKEN).build()
+        webhook = self.config.UPDATE_MODE == 'webhook'
+        if webhook and not self.config.WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+        
+        # Updates are handled concurrently; the scheduler bounds the heavy document work
+        builder = Application.builder().token(self.config.BOT_TOKEN).concurrent_updates(self.config.UPDATE_WORKERS)
+        if webhook:
+            builder = builder.updater(None)
+        if self.config.BOT_API_URL:
+            builder = builder.base_url(f"{self.config.BOT_API_URL}/bot").base_file_url(f"{self.config.BOT_API_URL}/file/bot")
+        application = builder.build()
         
         async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             user = update.effective_user
@@ -1097,82 +297,423 @@ class TelegramTestBot:
             """
             await update.message.reply_text(welcome_text, parse_mode='Markdown')
         
-        async def handle_json_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            try:
-                if not update.message.document:
-                    await update.message.reply_text("📁 Please send a JSON file")
-                    return
-                
-                file = await update.message.document.get_file()
-                file_path = f"uploads/{update.effective_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                
-                await file.download_to_drive(file_path)
-                
-                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                
-                json_data = json.loads(content)
-                
-                if 'data' not in json_data:
-                    await update.message.reply_text("❌ Invalid JSON format. Must contain 'data' array")
-                    return
-                
-                await update.message.reply_text("🔄 Generating premium test...")
-                
-                # Generate HTML test
-                html_content = self.test_generator.generate_premium_html_test(
-                    json_data, 
-                    update.effective_user.id,
-                    theme="dark",
-                    device="desktop"
-                )
-                
-                # Save HTML file
-                output_file = f"output/test_{update.effective_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-                async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
-                    await f.write(html_content)
-                
-                # Send HTML file
-                await update.message.reply_document(
-                    document=output_file,
-                    caption="🎉 **Your Premium Test is Ready!**\n\n"
-                           "**Instructions:**\n"
-                           "1. Download this HTML file\n"
-                           "2. Open in any browser\n"
-                           "3. Start your test!\n\n"
-                           "✨ Features: Dark/Light Mode • Mobile/Desktop • Timer • Scoring",
-                    parse_mode='Markdown'
-                )
-                
-                # Cleanup
-                os.remove(file_path)
-                os.remove(output_file)
-                
-            except json.JSONDecodeError:
-                await update.message.reply_text("❌ Invalid JSON file")
-            except Exception as e:
-                logger.error(f"Error processing file: {e}")
-                await update.message.reply_text("❌ Error processing file")
-        
-        # Add handlers
+        # Add handlers; group -1 runs first for every update
+        application.add_handler(TypeHandler(Update, self.bind_update), group=-1)
         application.add_handler(CommandHandler("start", start))
-        application.add_handler(MessageHandler(tg_filters.Document.ALL, handle_json_file))
+        application.add_handler(CommandHandler("queue", self.queue_status))
+        application.add_handler(MessageHandler(tg_filters.Document.ALL, self.handle_json_file))
+        if self.results:
+            application.add_handler(CommandHandler("stats", self.stats_command))
+        if self.config.ADMIN_IDS:
+            application.add_handler(CommandHandler(
+                "perf", self.perf_command, filters=tg_filters.User(user_id=self.config.ADMIN_IDS)
+            ))
         
         # Start bot
+        self.lag_monitor.start()
         await application.initialize()
         await application.start()
-        await application.updater.start_polling()
+        server = None
+        results_server = None
+        metrics_server = None
+        if self.config.METRICS_PORT:
+            from metrics_server import MetricsServer
+            metrics_server = MetricsServer(self.metrics)
+            await metrics_server.start(self.config.METRICS_LISTEN, self.config.METRICS_PORT)
+        if self.results:
+            from results_server import ResultsServer
+            self.results.start()
+            results_server = ResultsServer(self.results, path=self.config.RESULTS_PATH)
+            await results_server.start(self.config.RESULTS_LISTEN, self.config.RESULTS_PORT)
+        if webhook:
+            from webhook_server import WebhookServer
+            server = WebhookServer(application, path=self.config.WEBHOOK_PATH, secret_token=self.config.WEBHOOK_SECRET)
+            await server.start(self.config.WEBHOOK_LISTEN, self.config.WEBHOOK_PORT)
+            if self.config.WEBHOOK_URL:
+                await application.bot.set_webhook(
+                    url=self.config.WEBHOOK_URL,
+                    secret_token=self.config.WEBHOOK_SECRET,
+                    max_connections=self.config.WEBHOOK_MAX_CONNECTIONS,
+                    allowed_updates=Update.ALL_TYPES
+                )
+        else:
+            await application.updater.start_polling()
+        
+        logger.info(f"🤖 Bot started successfully! ({self.config.UPDATE_MODE})")
+        
+        # Keep running until SIGINT/SIGTERM, then drain in-flight work
+        try:
+            await self.wait_for_shutdown()
+        finally:
+            logger.info("Shutting down...")
+            if server:
+                await server.stop()
+            elif application.updater.running:
+                await application.updater.stop()
+            await self.scheduler.drain(self.config.SHUTDOWN_TIMEOUT)
+            await application.stop()
+            await application.shutdown()
+            await self.transports.close()
+            if results_server:
+                await results_server.stop()
+            if metrics_server:
+                await metrics_server.stop()
+            if self.results:
+                await self.results.close()
+            await self.lag_monitor.stop()
+            self.render_pool.shutdown()
+            self.file_ids.close()
+
+    async def wait_for_shutdown(self):
+        """Wait for SIGINT or SIGTERM"""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows and notebook kernels; KeyboardInterrupt still unwinds through the finally
+                pass
+        await stop.wait()
+
+    async def spill_upload(self, update, transport):
+        """Download a large upload to a uniquely named file and return its path"""
+        fd, file_path = tempfile.mkstemp(dir='uploads', prefix=f"{update.effective_user.id}_", suffix='.json')
+        os.close(fd)
+        try:
+            await transport.download(update.message.document, file_path)
+        except Exception:
+            os.remove(file_path)
+            raise
+        return Path(file_path)
+
+    async def notify_render(self, update):
+        """Tell the user their test is being generated, or where it sits in the queue"""
+        position = self.render_pool.queue_position()
+        if position:
+            await update.message.reply_text(f"⏳ Queued at position {position}, your test will be generated shortly...")
+        else:
+            await update.message.reply_text("🔄 Generating premium test...")
+
+    async def render_test(self, update, content, theme="dark", device="desktop"):
+        """Personalized page for an upload, served from the render cache when possible
+
+        Returns (content key, page); spilled uploads (a Path) are streamed and return
+        a Path to the personalized page.
+        """
+        if isinstance(content, Path):
+            return await self.render_test_stream(update, content, theme, device)
+        
+        payload = self.config.PAYLOAD_MODE
+        with timed("read"):
+            upload_key = raw_key(content, theme, device, payload)
+            key = self.render_cache.resolve(upload_key)
+            shared = await self.render_cache.get(key) if key else None
         
-        logger.info("🤖 Bot started successfully!")
+        if shared is None:
+            await self.notify_render(update)
+            
+            # Parse and generate HTML test in the render pool
+            key, shared, answers = await self.render_pool.render(
+                content, theme, device, cache_dir=self.render_cache.cache_dir, payload=payload,
+                answer_key=self.results is not None
+            )
+            rendered = shared is not None
+            if not rendered:
+                # Same test uploaded before with different formatting
+                with timed("read"):
+                    shared = await self.render_cache.get(key)
+            self.render_cache.record(hit=shared is not None and not rendered)
+            if shared is None:
+                # Expired between the worker's check and ours
+                key, shared, _ = await self.render_pool.render(content, theme, device, payload=payload)
+                rendered = True
+            # A page read back from the cache is already stored; writing it again would restart its TTL
+            if rendered:
+                with timed("write"):
+                    await self.render_cache.put(key, shared)
+            self.render_cache.add_alias(upload_key, key)
+            await self.register_answer_key(answers)
+        else:
+            self.render_cache.record(hit=True)
+        
+        with timed("write"):
+            return key, self.test_generator.engine.personalize(shared, self.recipient(update), key)
+
+    async def render_test_stream(self, update, path, theme="dark", device="desktop"):
+        """render_test for spilled uploads; the page never has to fit in memory"""
+        payload = self.config.PAYLOAD_MODE
+        with timed("read"):
+            upload_key = await asyncio.to_thread(raw_key, path, theme, device, payload)
+            key = self.render_cache.resolve(upload_key)
+            shared_path = self.render_cache.path_for(key) if key else None
+        
+        if shared_path is None:
+            await self.notify_render(update)
+            
+            # The worker streams the page straight into the cache's disk tier
+            key, written, answers = await self.render_pool.render(
+                path, theme, device, cache_dir=self.render_cache.cache_dir, payload=payload,
+                answer_key=self.results is not None
+            )
+            # Not written means the same test was cached from differently formatted JSON
+            self.render_cache.record(hit=written is None)
+            self.render_cache.add_alias(upload_key, key)
+            with timed("write"):
+                output_path = await asyncio.to_thread(
+                    self.personalize_file, disk_path(self.render_cache.cache_dir, key), self.recipient(update), key
+                )
+            # Account for the new page only after reading it, in case it is evicted right away
+            if written:
+                await self.render_cache.adopt(key)
+            await self.register_answer_key(answers)
+            return key, output_path
         
-        # Keep running
-        while True:
-            await asyncio.sleep(3600)
+        self.render_cache.record(hit=True)
+        with timed("write"):
+            return key, await asyncio.to_thread(self.personalize_file, shared_path, self.recipient(update), key)
+
+    def recipient(self, update):
+        """User id printed into the page, or None when pages are shared between recipients"""
+        return update.effective_user.id if self.config.PERSONAL_PAGES else None
+
+    def personalize_file(self, shared_path, user_id, test_key):
+        """Write a personalized copy of a shared page under uploads/ and return its path"""
+        fd, output_path = tempfile.mkstemp(dir='uploads', prefix=f"{user_id or 'shared'}_", suffix='.html')
+        with open(shared_path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+            self.test_generator.engine.personalize_stream(src, dst, user_id, test_key)
+        return Path(output_path)
+
+    async def send_test(self, update, html_content, caption=TEST_CAPTION):
+        """Send a rendered test, reusing the Telegram file_id when these exact bytes were sent before
+
+        html_content is the page bytes, or a Path for pages spilled to disk.
+        """
+        if isinstance(html_content, Path):
+            output_hash = await asyncio.to_thread(output_key, html_content)
+            size = html_content.stat().st_size
+        else:
+            output_hash = output_key(html_content)
+            size = len(html_content)
+        filename = f"test_{update.effective_user.id}.html"
+        file_id = await self.file_ids.get(output_hash)
+        if file_id:
+            try:
+                # Nothing is uploaded, so any transport will do
+                await self.transports.for_upload(0).send_document(update.message, file_id, filename, caption)
+                self.file_ids.reused += 1
+                self.file_ids.reused_bytes += size
+                return
+            except StaleFileId as e:
+                logger.warning(f"Stale file_id for {output_hash[:12]}, re-uploading: {e}")
+                await self.file_ids.forget(output_hash)
+        
+        transport = self.transports.for_upload(size)
+        file_id = await transport.send_document(update.message, html_content, filename, caption)
+        self.metrics.inc("bytes_out_total", size)
+        self.metrics.inc("transfers_total", transport=transport.name, direction="upload")
+        await self.file_ids.put(output_hash, file_id, size)
+
+    async def bind_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Tag every record logged while handling this update with its id and user"""
+        user = update.effective_user
+        bind(request_id=update.update_id, user_id=user.id if user else None)
+
+    async def queue_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Report the user's place in the queue and overall load"""
+        stats = self.scheduler.stats()
+        logger.info(f"Scheduler stats: {stats}")
+        position = self.scheduler.user_position(update.effective_user.id)
+        status = f"⏳ Your next file is at position {position}" if position else "✅ You have no files waiting"
+        await update.message.reply_text(
+            f"{status}\n\n"
+            f"Queue depth: {stats['queue_depth']} • Generating: {stats['running']}\n"
+            f"Typical wait: {stats['wait_p50_s']:.0f}s (p95 {stats['wait_p95_s']:.0f}s)"
+        )
+
+    async def perf_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Per-stage latency percentiles and counters, for admins"""
+        metrics = self.metrics
+        lines = ["⏱️ Stage latency over recent uploads (ms)"]
+        for stage in metrics.stage_order():
+            histogram = metrics.stages[stage]
+            p50, p95, p99, worst = (value * 1000 for value in histogram.percentiles(0.5, 0.95, 0.99, 1.0))
+            lines.append(f"{stage}: p50 {p50:.0f} • p95 {p95:.0f} • p99 {p99:.0f} • max {worst:.0f} "
+                         f"(n={len(histogram.recent)})")
+        if len(lines) == 1:
+            lines.append("No uploads processed yet")
+        counters = {name: value for (name, labels), value in metrics.counters.items() if not labels}
+        lines.append(
+            f"📦 In {counters.get('bytes_in_total', 0) / 1024 / 1024:.1f} MiB • "
+            f"Out {counters.get('bytes_out_total', 0) / 1024 / 1024:.1f} MiB • "
+            f"Cache hits {self.render_cache.hit_rate():.0%} • file_id reuses {self.file_ids.reused}"
+        )
+        errors = {dict(labels)["type"]: value for (name, labels), value in metrics.counters.items() if name == "errors_total"}
+        if errors:
+            lines.append("❗ Errors: " + ", ".join(f"{kind} {count}" for kind, count in sorted(errors.items())))
+        lag = self.lag_monitor.summary()
+        lines.append(f"🔄 Loop lag p99 {lag['p99_ms']:.0f} ms • Queue depth {self.scheduler.queue_depth()}")
+        await update.message.reply_text("\n".join(lines))
+    
+    async def register_answer_key(self, answers):
+        """Keep the answer key the render job built for /stats, under the page's content key"""
+        if answers is None:
+            return
+        try:
+            await self.results.register_test(answers)
+        except Exception as e:
+            # The test can still be delivered; only its analytics are missing
+            logger.warning(f"Could not register answer key: {e}")
+
+    async def test_caption(self, key):
+        """Caption for a sent test, pointing at /stats when its results are collected"""
+        if not (self.results and await self.results.has_test(key)):
+            return TEST_CAPTION
+        return f"{TEST_CAPTION}\n\n📊 See how everyone did: /stats {key}"
+
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Summarize every collected result of one test"""
+        import numpy as np
+        from analytics import test_stats
+        if not context.args:
+            await update.message.reply_text("Usage: /stats <test id>")
+            return
+        started = time.perf_counter()
+        await self.results.flush()
+        stats = await asyncio.to_thread(test_stats, self.config.RESULTS_DB, context.args[0])
+        if stats is None:
+            await update.message.reply_text("❌ Unknown test id")
+            return
+        if not stats['attempts']:
+            await update.message.reply_text("📭 No results collected for this test yet")
+            return
+        
+        scores = stats['scores']
+        lines = [
+            f"📊 {context.args[0]}: {stats['attempts']} attempts, {stats['questions']} questions",
+            f"Score: mean {scores.mean():.1f} • median {np.median(scores):.1f} • "
+            f"p90 {np.percentile(scores, 90):.1f} • best {scores.max():.1f}",
+        ]
+        user_id = str(update.effective_user.id)
+        if user_id in stats['users']:
+            # Latest attempt by this user
+            row = len(stats['users']) - 1 - stats['users'][::-1].index(user_id)
+            lines.append(f"You: {scores[row]:.1f}, ahead of {stats['percentiles'][row]:.0f}% of attempts")
+        
+        hardest = np.argsort(stats['difficulty'], kind='stable')[:5]
+        lines.append("Hardest: " + ", ".join(f"Q{i + 1} ({stats['difficulty'][i]:.0%})" for i in hardest))
+        weakest = np.argsort(stats['discrimination'], kind='stable')[:5]
+        lines.append("Least discriminating: " + ", ".join(
+            f"Q{i + 1} ({stats['discrimination'][i]:+.2f})" for i in weakest))
+        misleading = np.flatnonzero(stats['misleading'])
+        if len(misleading):
+            shown = ", ".join(f"Q{i + 1}" for i in misleading[:10])
+            more = f" and {len(misleading) - 10} more" if len(misleading) > 10 else ""
+            lines.append(f"Distractors favoured by top scorers: {shown}{more}")
+        lines.append(f"⏱️ {(time.perf_counter() - started) * 1000:.0f} ms")
+        await update.message.reply_text("\n".join(lines))
+    
+    async def handle_json_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not update.message.document:
+            await update.message.reply_text("📁 Please send a JSON file")
+            return
+        
+        async def on_queued(position):
+            await update.message.reply_text(f"⏳ Queued at position {position}, your test will be generated shortly...")
+        
+        queued_at = time.perf_counter()
+        
+        async def job():
+            bind(timings={"queue": round((time.perf_counter() - queued_at) * 1000, 1)})
+            await self.process_json_file(update)
+        
+        # Nothing is downloaded until the scheduler admits the job
+        try:
+            await self.scheduler.run(update.effective_user.id, job, on_queued)
+        except RateLimited as e:
+            self.metrics.inc("errors_total", type="RateLimited")
+            await update.message.reply_text(f"🚦 Too many files at once. Please try again in {e.retry_after:.0f}s.")
+        except UserQueueFull:
+            self.metrics.inc("errors_total", type="UserQueueFull")
+            await update.message.reply_text("🚦 You already have files being generated. Please wait for them to finish.")
+
+    async def process_json_file(self, update):
+        """Download, render and send one uploaded test"""
+        try:
+            # Keep the upload in memory unless it is large enough to spill to disk
+            document = update.message.document
+            transport = self.transports.for_download(document.file_size or 0)
+            spill_path = None
+            with timed("download"):
+                if document.file_size and document.file_size > self.config.SPILL_THRESHOLD:
+                    spill_path = await self.spill_upload(update, transport)
+                    content = spill_path
+                else:
+                    content = await transport.download(document)
+            self.metrics.inc("bytes_in_total", spill_path.stat().st_size if spill_path else len(content))
+            self.metrics.inc("transfers_total", transport=transport.name, direction="download")
+            
+            html_content = None
+            try:
+                # Read, parse, validate, render and write are timed inside render_test
+                key, html_content = await self.render_test(update, content, theme="dark", device="desktop")
+                caption = await self.test_caption(key)
+                
+                # Send HTML file
+                with timed("upload"):
+                    await self.send_test(update, html_content, caption)
+                logger.info("Test sent", extra={
+                    "input_bytes": document.file_size, "spilled": bool(spill_path), "transport": transport.name
+                })
+            finally:
+                with timed("cleanup"):
+                    if spill_path:
+                        os.remove(spill_path)
+                    if isinstance(html_content, Path):
+                        os.remove(html_content)
+            
+        except json.JSONDecodeError as e:
+            self.metrics.inc("errors_total", type=type(e).__name__)
+            await update.message.reply_text("❌ Invalid JSON file")
+        except InvalidTestFormat as e:
+            self.metrics.inc("errors_total", type=type(e).__name__)
+            # Point at the offending questions rather than just rejecting the file
+            details = "".join(f"\n• {error}" for error in e.errors)
+            await update.message.reply_text(f"❌ Invalid test format: {e}{details}")
+        except FileTooLarge as e:
+            self.metrics.inc("errors_total", type=type(e).__name__)
+            await update.message.reply_text(f"❌ File too large to transfer: {e}")
+        except RenderQueueFull as e:
+            self.metrics.inc("errors_total", type=type(e).__name__)
+            await update.message.reply_text("🚦 Bot is busy right now. Please send your file again in a minute.")
+        except asyncio.TimeoutError as e:
+            self.metrics.inc("errors_total", type=type(e).__name__)
+            logger.error(f"Render timed out for user {update.effective_user.id}")
+            await update.message.reply_text("⌛ Your test is too large to generate in time. Try splitting it into smaller files.")
+        except Exception as e:
+            self.metrics.inc("errors_total", type=type(e).__name__)
+            logger.exception(f"Error processing file: {e}")
+            await update.message.reply_text("❌ Error processing file")
+        finally:
+            self.metrics.observe_stages(timings())
 
 async def main():
     """Main function to start the bot"""
-    bot = TelegramTestBot()
+    config = Config()
+    setup_logging(config.LOG_FILE, config.LOG_LEVEL, config.LOG_MAX_MB * 1024 * 1024, config.LOG_BACKUPS)
+    bot = TelegramTestBot(config)
     await bot.start_bot()
 
-if __name__ == "__main__":
+def run():
+    """Run main(), also from a notebook (Colab / Jupyter) whose event loop is already running"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(main())
+        return
+    import nest_asyncio
+    nest_asyncio.apply()
     asyncio.run(main())
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,293 @@
+import base64
+import binascii
+import hashlib
+import http.client
+import io
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# "off" leaves question markup alone, "dedupe" stores each distinct image once,
+# "optimize" also downscales and re-encodes them
+IMAGE_MODES = ("off", "dedupe", "optimize")
+
+# Fields whose text is injected as HTML by the page runtime
+MEDIA_FIELDS = ("question", "solution")
+
+_IMG_SRC = re.compile(r'''(<img\b[^>]*?\s)src\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.I)
+_DATA_URI = re.compile(r'data:(image/[\w.+-]+);base64,(.*)', re.I | re.S)
+
+# Images below this size are cheaper to keep than to re-encode
+MIN_OPTIMIZE_BYTES = 2048
+# Remote images larger than this are left as links
+MAX_REMOTE_BYTES = 5 * 1024 * 1024
+FETCH_TIMEOUT = 10
+
+# Bytes in each optimized-image cache directory as this process last counted them; other
+# workers share the directory, so the count is only trusted until it says the cap is passed
+_cache_used = {}
+_cache_lock = threading.Lock()
+
+def optimize_image(data, mime, max_side=1280):
+    """Downscale and re-encode one image; returns (mime, data), the original if nothing is smaller
+
+    Candidates are lossless WebP, plus lossy WebP for photos (more than 256 colours),
+    where lossless would keep noise nobody can see. Animated and vector images are kept.
+    """
+    if len(data) < MIN_OPTIMIZE_BYTES or mime == "image/svg+xml":
+        return mime, data
+    try:
+        from PIL import Image
+        image = Image.open(io.BytesIO(data))
+        if getattr(image, "is_animated", False):
+            return mime, data
+        image.load()
+    except Exception as e:
+        # Pillow missing or the bytes are not an image it can read: keep them as they are
+        logger.debug(f"Keeping image as is: {e}")
+        return mime, data
+
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    best_mime, best = mime, data
+    candidates = [{"lossless": True, "method": 4}]
+    if image.getcolors(256) is None:
+        candidates.append({"quality": 80, "method": 4})
+    for options in candidates:
+        out = io.BytesIO()
+        image.save(out, "WEBP", **options)
+        if out.tell() < len(best):
+            best_mime, best = "image/webp", out.getvalue()
+    return best_mime, best
+
+def _connect_public(host, port, timeout):
+    """Socket connected to host, refusing hosts with any address that is not publicly routable
+
+    The addresses checked are the ones connected to, so a second DNS answer cannot swap in
+    a private address between the check and the connection.
+    """
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if not all(ipaddress.ip_address(info[4][0]).is_global for info in infos):
+        raise OSError(f"{host} resolves to a non-public address")
+    error = OSError(f"{host} did not resolve")
+    for family, kind, proto, _, address in infos:
+        sock = socket.socket(family, kind, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        self.sock = _connect_public(self.host, self.port, self.timeout)
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        sock = _connect_public(self.host, self.port, self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+class _HttpRedirects(urllib.request.HTTPRedirectHandler):
+    """Follow redirects only to http(s); the connection itself refuses private hosts"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urllib.parse.urlsplit(newurl).scheme not in ("http", "https"):
+            return None
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+# No proxies: a proxy would make the connection, and the address checks with it
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _HttpRedirects
+)
+
+def fetch_image(url):
+    """Download a remote image for inlining; (mime, data) or None
+
+    Only http(s) URLs resolving to public addresses are fetched, since the URLs come from uploads.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    try:
+        with _opener.open(url, timeout=FETCH_TIMEOUT) as response:
+            mime = response.headers.get_content_type()
+            data = response.read(MAX_REMOTE_BYTES + 1)
+    except (OSError, ValueError) as e:
+        logger.info(f"Not inlining {url}: {e}")
+        return None
+    if not mime.startswith("image/") or len(data) > MAX_REMOTE_BYTES:
+        return None
+    return mime, data
+
+def _evict_oldest(cache_dir, max_bytes):
+    """Remove the least recently used cached images until cache_dir fits max_bytes; returns the bytes left"""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        # Another worker's write in progress
+        if entry.name.endswith('.tmp'):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+    used = sum(size for _, size, _ in entries)
+    entries.sort()
+    for _, size, path in entries:
+        if used <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        used -= size
+    return used
+
+class MediaStage:
+    """Moves images out of question markup into one block per page, each distinct image once
+
+    rewrite_items() passes items through with every <img src> it handles replaced by a
+    data-media reference; chunks() then emits the #mediaData block the runtime resolves
+    them from. Works on streamed items, so only the images themselves are held in memory.
+    Optimized images are cached on disk by content hash, so shared images are encoded once.
+    """
+
+    def __init__(self, mode="dedupe", max_side=1280, fetch_remote=False, cache_dir=None, cache_bytes=256 * 1024 * 1024):
+        self.mode = mode
+        self.max_side = max_side
+        self.fetch_remote = fetch_remote
+        self.cache_dir = cache_dir
+        self.cache_bytes = cache_bytes
+        self.images = {}       # content hash -> data URI
+        self.by_source = {}    # (length, hash) of src as written -> content hash, or None if left alone
+        self.references = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _load(self, src):
+        match = _DATA_URI.match(src)
+        if match:
+            try:
+                return match.group(1).lower(), base64.b64decode(match.group(2), validate=False)
+            except (binascii.Error, ValueError):
+                return None
+        if self.fetch_remote and src.startswith(("http://", "https://")):
+            return fetch_image(src)
+        return None
+
+    def _optimize(self, digest, mime, data):
+        if self.mode != "optimize":
+            return mime, data
+        path = os.path.join(self.cache_dir, f"{digest}-{self.max_side}") if self.cache_dir else None
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    cached_mime, _, cached = f.read().partition(b"\n")
+                # Eviction goes by mtime, so a hit keeps the image
+                os.utime(path)
+                return cached_mime.decode('ascii'), cached
+            except FileNotFoundError:
+                pass
+        mime, data = optimize_image(data, mime, self.max_side)
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Unique per call: render threads optimizing the same image must not share a temp file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(mime.encode('ascii') + b"\n" + data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._account(len(mime) + 1 + len(data))
+        return mime, data
+
+    def _account(self, added):
+        """Count a newly cached image and evict the oldest ones once the directory is over cache_bytes"""
+        with _cache_lock:
+            used = _cache_used.get(self.cache_dir)
+            if used is not None:
+                used += added
+            if used is None or used > self.cache_bytes:
+                used = _evict_oldest(self.cache_dir, self.cache_bytes)
+            _cache_used[self.cache_dir] = used
+
+    def reference(self, src):
+        """Media id for an image source, adding the image on first sight; None to leave src alone"""
+        # Keyed by (length, str hash) so inline images are not kept alive after their item is
+        # written; str hashes are randomly keyed per process, so collisions cannot be crafted
+        source = (len(src), hash(src))
+        if source in self.by_source:
+            return self.by_source[source]
+        loaded = self._load(src)
+        digest = None
+        if loaded:
+            mime, data = loaded
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            if digest not in self.images:
+                self.bytes_in += len(data)
+                mime, data = self._optimize(digest, mime, data)
+                self.bytes_out += len(data)
+                self.images[digest] = f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+        self.by_source[source] = digest
+        return digest
+
+    def rewrite(self, html):
+        if not isinstance(html, str) or "<" not in html:
+            return html
+
+        def replace(match):
+            digest = self.reference(match.group(2) if match.group(2) is not None else match.group(3))
+            if digest is None:
+                return match.group(0)
+            self.references += 1
+            return f'{match.group(1)}data-media="{digest}"'
+
+        return _IMG_SRC.sub(replace, html)
+
+    def rewrite_items(self, items):
+        for item in items:
+            if isinstance(item, dict):
+                item = dict(item)
+                for field in MEDIA_FIELDS:
+                    if field in item:
+                        item[field] = self.rewrite(item[field])
+                if isinstance(item.get("options"), dict):
+                    item["options"] = {key: self.rewrite(text) for key, text in item["options"].items()}
+            yield item
+
+    def chunks(self):
+        """The #mediaData block; only valid once rewrite_items() has been consumed"""
+        if not self.images:
+            return
+        yield b'<script type="application/json" id="mediaData">'
+        yield json.dumps(self.images).encode('ascii')
+        yield b'</script>'
+        if self.bytes_in:
+            logger.info(f"{self.references} image references -> {len(self.images)} images, "
+                        f"{self.bytes_in // 1024} KiB -> {self.bytes_out // 1024} KiB")
@@ -0,0 +1,128 @@
+import bisect
+import math
+from collections import deque
+
+# Stages of handling one upload, in the order they run
+STAGES = ("queue", "download", "read", "parse", "validate", "render", "write", "upload", "cleanup")
+
+# Upper bounds in seconds; stages range from sub-millisecond cache reads to minutes-long renders
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    "stage_seconds": "Time spent in each stage of handling an uploaded test",
+    "bytes_in_total": "Bytes of uploaded test files",
+    "bytes_out_total": "Bytes of generated pages uploaded to Telegram",
+    "errors_total": "Failed or rejected uploads, by error type",
+    "transfers_total": "Files downloaded from or uploaded to Telegram, by transport and direction",
+}
+
+def _number(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+class Histogram:
+    """Cumulative buckets for /metrics plus a window of recent samples for exact percentiles"""
+
+    def __init__(self, buckets=STAGE_BUCKETS, window=1000):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentiles(self, *quantiles):
+        """Percentiles of the recent window, in the same order as quantiles"""
+        if not self.recent:
+            return [0.0] * len(quantiles)
+        ordered = sorted(self.recent)
+        return [ordered[min(len(ordered) - 1, int(len(ordered) * q))] for q in quantiles]
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+class Metrics:
+    """In-process counters and per-stage latency histograms, rendered in the Prometheus text format
+
+    Counts that other components already keep (cache hits, queue depth) are read
+    through collectors at scrape time rather than duplicated here.
+    """
+
+    def __init__(self, prefix="testbot"):
+        self.prefix = prefix
+        self.stages = {}     # stage -> Histogram, in seconds
+        self.counters = {}   # (name, sorted label pairs) -> value
+        self.collectors = []  # (name, type, help, fn returning a value or [(labels dict, value)])
+
+    def observe_stages(self, timings):
+        """Record one upload's stage timings, given in milliseconds as bound for logging"""
+        for stage, ms in timings.items():
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(ms / 1000)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def collect(self, name, kind, help, fn):
+        """Export a value owned elsewhere; fn is called on every scrape"""
+        self.collectors.append((name, kind, help, fn))
+
+    def stage_order(self):
+        return sorted(self.stages, key=lambda stage: (STAGES.index(stage) if stage in STAGES else len(STAGES), stage))
+
+    def render(self):
+        """The exposition text served on /metrics"""
+        lines = []
+
+        def header(name, kind, help):
+            lines.append(f"# HELP {self.prefix}_{name} {help}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        if self.stages:
+            name = f"{self.prefix}_stage_seconds"
+            header("stage_seconds", "histogram", HELP["stage_seconds"])
+            for stage in self.stage_order():
+                histogram = self.stages[stage]
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{_number(bound)}"}} {count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {_number(histogram.sum)}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        by_name = {}
+        for (name, labels), value in self.counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            header(name, "counter", HELP.get(name, name))
+            for labels, value in sorted(by_name[name]):
+                lines.append(f"{self.prefix}_{name}{_labels(labels)} {_number(value)}")
+
+        for name, kind, help, fn in self.collectors:
+            value = fn()
+            header(name, kind, help)
+            if isinstance(value, list):
+                for labels, sample in value:
+                    lines.append(f"{self.prefix}_{name}{_labels(sorted(labels.items()))} {_number(sample)}")
+            else:
+                lines.append(f"{self.prefix}_{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,35 @@
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class MetricsServer:
+    """Local HTTP endpoint serving Metrics in the Prometheus text format
+
+    Meant for a scraper on the same host or network; it listens on 127.0.0.1 by
+    default and has no authentication.
+    """
+
+    def __init__(self, metrics, path="/metrics"):
+        self.metrics = metrics
+        self.path = path
+        self.app = web.Application()
+        self.app.router.add_get(path, self.handle_metrics)
+        self.runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(body=self.metrics.render().encode('utf-8'), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self, host="127.0.0.1", port=9464):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        logger.info(f"Metrics endpoint listening on {host}:{port}{self.path}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
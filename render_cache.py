@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+# Temp files this old were left by a writer that died (e.g. a killed render worker)
+STALE_TMP_AGE = 3600
+
+def _normalize(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class ContentKey:
+    """Incremental hash of normalized test data, fed one question at a time"""
+
+    def __init__(self, theme, device, payload="full", template=""):
+        self.variant = f"|{theme}|{device}|{payload}|{template}".encode('utf-8')
+        self.digest = hashlib.sha256()
+
+    def add_item(self, item):
+        self.digest.update(_normalize(item))
+        self.digest.update(b"\n")
+
+    def finish(self, extra):
+        """Fold in the other top-level fields and the variant, and return the key"""
+        self.digest.update(_normalize(extra))
+        self.digest.update(self.variant)
+        return self.digest.hexdigest()
+
+def content_key(json_data, theme, device, payload="full", template=""):
+    """Hash of the normalized test data plus the variant and template it is rendered with"""
+    key = ContentKey(theme, device, payload, template)
+    for item in json_data['data']:
+        key.add_item(item)
+    return key.finish({name: value for name, value in json_data.items() if name != 'data'})
+
+def raw_key(content, theme, device, payload="full"):
+    """Hash of the upload exactly as received; lets byte-identical re-uploads skip parsing"""
+    if isinstance(content, os.PathLike):
+        with open(content, 'rb') as f:
+            digest = hashlib.file_digest(f, 'sha256')
+    else:
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        digest = hashlib.sha256(content)
+    digest.update(f"|{theme}|{device}|{payload}".encode('utf-8'))
+    return digest.hexdigest()
+
+def disk_path(cache_dir, key):
+    return os.path.join(cache_dir, f"{key}.html")
+
+class RenderCache:
+    """Two-tier cache of shared (not yet personalized) pages with TTL eviction"""
+
+    def __init__(self, cache_dir="cache", memory_bytes=64 * 1024 * 1024, disk_bytes=1024 * 1024 * 1024,
+                 ttl=24 * 3600, max_aliases=4096):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self.max_aliases = max_aliases
+        self.memory = OrderedDict()  # key -> (stored_at, page bytes)
+        self.memory_used = 0
+        self.aliases = OrderedDict()  # raw_key -> content_key
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.disk_used = self._disk_usage()
+        self._evicting = False
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        logger.info(f"Render cache {'hit' if hit else 'miss'}, hit rate {self.hit_rate():.1%} "
+                    f"({self.hits}/{self.hits + self.misses})")
+
+    def resolve(self, raw):
+        """Content key previously seen for a raw upload key, if any"""
+        key = self.aliases.get(raw)
+        if key is not None:
+            self.aliases.move_to_end(raw)
+        return key
+
+    def add_alias(self, raw, key):
+        self.aliases[raw] = key
+        self.aliases.move_to_end(raw)
+        while len(self.aliases) > self.max_aliases:
+            self.aliases.popitem(last=False)
+
+    async def get(self, key):
+        """Page bytes for key from memory, then disk; None if missing or expired"""
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            stored_at, data = entry
+            if now - stored_at <= self.ttl:
+                self.memory.move_to_end(key)
+                return data
+            self._drop_memory(key)
+
+        path = disk_path(self.cache_dir, key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if now - stored_at > self.ttl:
+                self._drop_disk(path)
+                return None
+            async with aiofiles.open(path, 'rb') as f:
+                data = await f.read()
+        except FileNotFoundError:
+            return None
+        self._put_memory(key, data, stored_at)
+        return data
+
+    def path_for(self, key):
+        """Disk tier path for key, or None if missing or expired; used for pages too large to hold in memory"""
+        path = disk_path(self.cache_dir, key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self._drop_disk(path)
+                return None
+        except FileNotFoundError:
+            return None
+        return path
+
+    async def adopt(self, key):
+        """Account for a page a render worker wrote straight into the disk tier"""
+        self.disk_used += os.path.getsize(disk_path(self.cache_dir, key))
+        await self.evict_disk()
+
+    def _disk_usage(self):
+        """Bytes of cached pages; stale temp files are removed, live ones are not counted"""
+        used = 0
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if entry.name.endswith('.html'):
+                    used += entry.stat().st_size
+                elif entry.name.endswith('.tmp') and now - entry.stat().st_mtime > STALE_TMP_AGE:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        return used
+
+    async def put(self, key, data):
+        """Store page bytes in both tiers"""
+        self._put_memory(key, data, time.time())
+        if len(data) > self.disk_bytes:
+            return
+        path = disk_path(self.cache_dir, key)
+        # Unique per call: concurrent puts of the same page must not share a temp file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(data)
+        if os.path.exists(path):
+            self.disk_used -= os.path.getsize(path)
+        os.replace(tmp_path, path)
+        self.disk_used += len(data)
+        await self.evict_disk()
+
+    def _put_memory(self, key, data, stored_at):
+        if len(data) > self.memory_bytes:
+            return
+        if key in self.memory:
+            self._drop_memory(key)
+        self.memory[key] = (stored_at, data)
+        self.memory_used += len(data)
+        while self.memory_used > self.memory_bytes:
+            _, (_, evicted) = self.memory.popitem(last=False)
+            self.memory_used -= len(evicted)
+
+    def _drop_memory(self, key):
+        _, data = self.memory.pop(key)
+        self.memory_used -= len(data)
+
+    def _drop_disk(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self.disk_used -= size
+        except FileNotFoundError:
+            pass
+
+    async def evict_disk(self):
+        """Bring the disk tier back under its size cap, scanning it in a thread"""
+        if self.disk_used <= self.disk_bytes or self._evicting:
+            return
+        self._evicting = True
+        try:
+            self.disk_used -= await asyncio.to_thread(self._evict_files, self.disk_used - self.disk_bytes)
+        finally:
+            self._evicting = False
+
+    def _evict_files(self, excess):
+        """Remove expired files, then the oldest ones until excess bytes are gone; returns the bytes removed"""
+        now = time.time()
+        removed = 0
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.html'):
+                # Not counted in disk_used, but a dead writer's temp file still takes space
+                if entry.name.endswith('.tmp'):
+                    try:
+                        if now - entry.stat().st_mtime > STALE_TMP_AGE:
+                            os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            try:
+                stat = entry.stat()
+                if now - stat.st_mtime > self.ttl:
+                    os.remove(entry.path)
+                    removed += stat.st_size
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        for _, size, path in entries:
+            if removed >= excess:
+                break
+            try:
+                os.remove(path)
+                removed += size
+            except FileNotFoundError:
+                pass
+        return removed
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from json_stream import TestDataStream
+from render_cache import ContentKey, content_key, disk_path
+from log_config import add_timings, worker_logging
+from schema import InvalidTestFormat, TestValidator, validate_test
+from template_engine import TemplateEngine
+
+logger = logging.getLogger(__name__)
+
+class RenderQueueFull(Exception):
+    """Every worker is busy and the waiting queue is at capacity"""
+
+# Engine compiled once per worker process (or per thread in thread mode)
+_engine = None
+
+def _init_worker(engine_options):
+    global _engine
+    worker_logging()
+    _engine = TemplateEngine(**engine_options)
+
+def _lap(timings, stage, start):
+    """Store the ms since start under timings[stage] and return the new start"""
+    now = time.perf_counter()
+    timings[stage] = round((now - start) * 1000, 1)
+    return now
+
+def _answer_key_builder():
+    # numpy (through analytics) is only imported by workers of bots that collect results
+    from analytics import AnswerKeyBuilder
+    return AnswerKeyBuilder()
+
+def render_job(content, theme="dark", device="desktop", cache_dir=None, payload="full", answer_key=False):
+    """Parse uploaded JSON and render its shared page; runs inside the executor
+
+    Returns (content key, page bytes, stage timings in ms, analytics.AnswerKey or
+    None). The page is None when cache_dir already holds it; the answer key is only
+    built when answer_key is set.
+    """
+    global _engine
+    if _engine is None:
+        _engine = TemplateEngine()
+    timings = {}
+    start = time.perf_counter()
+    json_data = json.loads(content)
+    start = _lap(timings, "parse", start)
+    validate_test(json_data)
+    start = _lap(timings, "validate", start)
+    key = content_key(json_data, theme, device, payload, _engine.fingerprint)
+    answers = None
+    if answer_key:
+        answers = _answer_key_builder()
+        for item in json_data['data']:
+            answers.add(item)
+        answers = answers.finish(key)
+    if cache_dir and os.path.exists(disk_path(cache_dir, key)):
+        return key, None, timings, answers
+    page = _engine.render_shared(json_data, theme=theme, device=device, payload=payload)
+    _lap(timings, "render", start)
+    return key, page, timings, answers
+
+def render_stream_job(path, theme="dark", device="desktop", cache_dir="cache", payload="full", answer_key=False):
+    """Stream a spilled upload straight into the cache's disk tier; runs inside the executor
+
+    Questions are parsed, hashed and written one at a time, so memory stays flat
+    however large the file is. Returns (content key, path of the new page, stage timings
+    in ms, AnswerKey or None) like render_job; the path is None when the cache already
+    held the page. Parsing and validation are interleaved with rendering and timed as part of it.
+    """
+    global _engine
+    if _engine is None:
+        _engine = TemplateEngine()
+    start = time.perf_counter()
+    key = ContentKey(theme, device, payload, _engine.fingerprint)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with open(path, 'rb') as src, os.fdopen(fd, 'wb') as out:
+            stream = TestDataStream(src)
+            validator = TestValidator()
+            answers = _answer_key_builder() if answer_key else None
+
+            def items():
+                for item in validator.check(stream.items()):
+                    key.add_item(item)
+                    # Once an item is invalid the upload is rejected and its key never used
+                    if answers and not validator.errors:
+                        answers.add(item)
+                    yield item
+
+            _engine.render_shared_stream(
+                items(), out, theme=theme, device=device, trailer=lambda: stream.extra, payload=payload
+            )
+        if not stream.has_data:
+            raise InvalidTestFormat("Must contain 'data' array")
+        validator.finish()
+        digest = key.finish(stream.extra)
+        page_path = disk_path(cache_dir, digest)
+        try:
+            # Rendered before from differently formatted JSON: keep that copy and restart its TTL
+            os.utime(page_path)
+            os.remove(tmp_path)
+            page_path = None
+        except FileNotFoundError:
+            os.replace(tmp_path, page_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    timings = {"render": round((time.perf_counter() - start) * 1000, 1)}
+    return digest, page_path, timings, answers.finish(digest) if answers else None
+
+class RenderPool:
+    """Bounded render stage that keeps JSON parsing and HTML generation off the event loop"""
+
+    def __init__(self, executor="process", workers=None, queue_size=32, timeout=120, engine_options=None):
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unknown render executor: {executor}")
+        self.kind = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.engine_options = engine_options or {}
+        self.executor = self._make_executor()
+        # Jobs submitted and not finished by their worker, whether or not anyone still waits for them
+        self.pending = 0
+
+    def _make_executor(self):
+        initargs = (self.engine_options,)
+        if self.kind == "process":
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=initargs)
+        return ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="render", initializer=_init_worker, initargs=initargs
+        )
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    def queue_position(self):
+        """Number of jobs that would be waiting ahead of a new submission"""
+        return max(0, self.pending - self.workers + 1)
+
+    async def render(self, content, theme="dark", device="desktop", cache_dir=None, payload="full", answer_key=False):
+        """Run render_job in the pool, rejecting work beyond capacity and enforcing the timeout
+
+        Returns (content key, page, answer key) as render_job or render_stream_job
+        does; the worker's stage timings are added to the caller's log context.
+        """
+        if self.pending >= self.capacity:
+            raise RenderQueueFull()
+        # Spilled uploads arrive as paths and are streamed rather than loaded whole
+        job = render_stream_job if isinstance(content, os.PathLike) else render_job
+        args = (content, theme, device, cache_dir, payload, answer_key)
+        try:
+            key, page, timings, answers = await self._run(job, args)
+        except BrokenProcessPool:
+            # Every job in flight when a worker died fails with it; each gets one more try on the new pool
+            logger.warning("Retrying render job on the new pool")
+            key, page, timings, answers = await self._run(job, args)
+        add_timings(timings)
+        return key, page, answers
+
+    async def _run(self, job, args):
+        executor = self.executor
+        try:
+            future = executor.submit(job, *args)
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        # The slot is held until the worker is done, not until the caller stops waiting:
+        # a timed-out job keeps its worker busy and still counts against capacity
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+
+    def _release(self, loop):
+        # Runs on the executor's thread
+        try:
+            loop.call_soon_threadsafe(self._finished)
+        except RuntimeError:
+            # The loop is closed; nothing counts slots any more
+            pass
+
+    def _finished(self):
+        self.pending -= 1
+
+    def _replace(self, executor):
+        """Swap a broken process pool for a new one, once however many jobs saw it break"""
+        if self.executor is executor:
+            logger.error("A render worker died and broke the pool, starting a new one")
+            self.executor = self._make_executor()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class LoopLagMonitor:
+    """Measures event-loop lag as the oversleep of a periodic timer"""
+
+    def __init__(self, interval=0.05, warn_after=0.5):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - start - self.interval
+            self.samples.append(lag)
+            if len(self.samples) > 10000:
+                del self.samples[:5000]
+            if lag > self.warn_after:
+                logger.warning(f"Event loop lagged {lag * 1000:.0f} ms")
+
+    def summary(self):
+        """Max, p50 and p99 lag in milliseconds"""
+        if not self.samples:
+            return {"max_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+        ordered = sorted(self.samples)
+        return {
+            "max_ms": ordered[-1] * 1000,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        }
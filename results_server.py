@@ -0,0 +1,66 @@
+import logging
+
+from aiohttp import web
+
+from results_store import InvalidResult, ResultBufferFull, parse_result
+
+logger = logging.getLogger(__name__)
+
+# Result records are a few hundred bytes plus one character per question
+MAX_RESULT_BYTES = 256 * 1024
+
+# Pages are opened from file:// (origin "null") or wherever users saved them
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+class ResultsServer:
+    """HTTP endpoint that accepts result records POSTed by submitted test pages
+
+    The page sends the record as text/plain (navigator.sendBeacon), which is a CORS
+    simple request, so no preflight round trip is needed. Records are only queued
+    here; ResultStore writes them in batches.
+    """
+
+    def __init__(self, store, path="/results"):
+        self.store = store
+        self.path = path
+        self.app = web.Application(client_max_size=MAX_RESULT_BYTES)
+        self.app.router.add_post(path, self.handle_result)
+        self.app.router.add_route("OPTIONS", path, self.preflight)
+        self.runner = None
+        self.accepted = 0
+        self.rejected = 0
+
+    async def handle_result(self, request):
+        try:
+            row = parse_result(await request.read())
+            self.store.add(row, source="http")
+        except InvalidResult as e:
+            self.rejected += 1
+            logger.warning(f"Rejected result from {request.remote}: {e}")
+            return web.Response(status=400, headers=CORS_HEADERS)
+        except ResultBufferFull:
+            self.rejected += 1
+            return web.Response(status=503, headers=CORS_HEADERS)
+        except web.HTTPRequestEntityTooLarge:
+            self.rejected += 1
+            return web.Response(status=413, headers=CORS_HEADERS)
+        self.accepted += 1
+        return web.Response(status=204, headers=CORS_HEADERS)
+
+    async def preflight(self, request):
+        return web.Response(status=204, headers=CORS_HEADERS)
+
+    async def start(self, host="0.0.0.0", port=8081):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        logger.info(f"Results endpoint listening on {host}:{port}{self.path}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
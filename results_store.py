@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class InvalidResult(Exception):
+    """Submitted result record is malformed"""
+
+class ResultBufferFull(Exception):
+    """Too many records are waiting to be written"""
+
+# Field -> (type, limit); strings are capped by length, numbers by magnitude
+RESULT_FIELDS = {
+    "test": (str, 64),
+    "user": (str, 64),
+    "score": ((int, float), 1e7),
+    "correct": (int, 1e6),
+    "incorrect": (int, 1e6),
+    "skipped": (int, 1e6),
+    "time": (int, 1e7),
+    "answers": (str, 200000),
+}
+
+def parse_result(payload):
+    """Validate a result record from the page (JSON text or bytes) and return it as a row tuple"""
+    try:
+        record = json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise InvalidResult(f"Not JSON: {e}")
+    if not isinstance(record, dict) or record.get("v") != 1:
+        raise InvalidResult("Unknown record version")
+    row = []
+    for name, (kind, limit) in RESULT_FIELDS.items():
+        value = record.get(name, "" if kind is str else 0)
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise InvalidResult(f"Bad field {name!r}")
+        size = len(value) if kind is str else abs(value)
+        if size > limit:
+            raise InvalidResult(f"Field {name!r} out of range")
+        row.append(value)
+    return tuple(row)
+
+class ResultStore:
+    """Buffers submitted results in memory and batch-inserts them into SQLite (WAL mode)
+
+    add() never touches the database; a background task flushes every flush_interval
+    seconds, or sooner once batch_size records are waiting, with the insert running
+    in a thread so the event loop keeps serving requests.
+    """
+
+    def __init__(self, path="results.sqlite3", batch_size=500, flush_interval=1.0, max_pending=50000):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps commits durable against crashes of the process; NORMAL skips an fsync per commit
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id INTEGER PRIMARY KEY, test_key TEXT NOT NULL, user_id TEXT NOT NULL, "
+            "score REAL NOT NULL, correct INTEGER NOT NULL, incorrect INTEGER NOT NULL, "
+            "skipped INTEGER NOT NULL, time_taken INTEGER NOT NULL, answers TEXT NOT NULL, "
+            "source TEXT NOT NULL, received_at REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_test_key ON results (test_key)")
+        # Answer keys of rendered tests, so results can be scored and analyzed server-side
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS tests ("
+            "test_key TEXT PRIMARY KEY, answers TEXT NOT NULL, plus_marks TEXT NOT NULL, "
+            "minus_marks TEXT NOT NULL, registered_at REAL NOT NULL)"
+        )
+        self.db.commit()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = []
+        self.written = 0
+        self.batches = 0
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+        # Recently registered or looked up test keys, so repeat uploads skip the database
+        self.known_tests = OrderedDict()
+        self.max_known_tests = 4096
+
+    def add(self, row, source="http"):
+        """Queue a parse_result row for the next batch"""
+        if len(self.pending) >= self.max_pending:
+            raise ResultBufferFull()
+        self.pending.append(row + (source, time.time()))
+        if len(self.pending) >= self.batch_size:
+            self._wake.set()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Writing results failed, will retry: {e}")
+
+    async def flush(self):
+        """Write every queued record in one transaction"""
+        async with self._lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, []
+            try:
+                await asyncio.to_thread(self._insert, batch)
+            except BaseException:
+                # Keep the records for the next attempt
+                self.pending[:0] = batch
+                raise
+            self.written += len(batch)
+            self.batches += 1
+
+    async def register_test(self, key):
+        """Store an analytics.AnswerKey, once per test key
+
+        Test keys are render cache content keys, so a key always names the same answers.
+        """
+        if key.test_key in self.known_tests:
+            self.known_tests.move_to_end(key.test_key)
+            return
+        row = (key.test_key, key.answers, json.dumps(key.plus.tolist()), json.dumps(key.minus.tolist()), time.time())
+        async with self._lock:
+            await asyncio.to_thread(self._register, row)
+        self._remember(key.test_key)
+
+    async def has_test(self, test_key):
+        """Whether an answer key is registered under test_key"""
+        if test_key not in self.known_tests:
+            async with self._lock:
+                if not await asyncio.to_thread(self._lookup, test_key):
+                    return False
+        self._remember(test_key)
+        return True
+
+    def _remember(self, test_key):
+        self.known_tests[test_key] = None
+        self.known_tests.move_to_end(test_key)
+        if len(self.known_tests) > self.max_known_tests:
+            self.known_tests.popitem(last=False)
+
+    def _register(self, row):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO tests VALUES (?, ?, ?, ?, ?)", row)
+
+    def _lookup(self, test_key):
+        return self.db.execute("SELECT 1 FROM tests WHERE test_key = ?", (test_key,)).fetchone() is not None
+
+    def _insert(self, batch):
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO results (test_key, user_id, score, correct, incorrect, skipped, time_taken, "
+                "answers, source, received_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+
+    async def close(self):
+        """Stop the flusher, write what is left and close the database"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self.db.close()
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+class RateLimited(Exception):
+    """The user's token bucket is empty"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class UserQueueFull(Exception):
+    """The user already has the maximum number of jobs queued or running"""
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Consume a token; returns 0, or the seconds until one is available"""
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class FairScheduler:
+    """Global concurrency limit with per-user token buckets and round-robin dispatch across users"""
+
+    def __init__(self, max_concurrent=4, user_rate=0.1, user_burst=3, user_max_pending=3, max_buckets=10000):
+        self.max_concurrent = max_concurrent
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.user_max_pending = user_max_pending
+        self.max_buckets = max_buckets
+        self.running = 0
+        # user_id -> waiting futures; dict order is the round-robin rotation
+        self.queues = OrderedDict()
+        self.buckets = {}
+        self.pending = {}
+        self.wait_times = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected = 0
+
+    def _bucket(self, user_id):
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            if len(self.buckets) >= self.max_buckets:
+                # Full buckets carry no state worth keeping
+                for other in list(self.buckets):
+                    self.buckets[other].refill()
+                    if self.buckets[other].tokens >= self.user_burst:
+                        del self.buckets[other]
+            bucket = self.buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def position(self, user_id, waiter):
+        """1-based dispatch order of a waiting job under round-robin"""
+        index = self.queues[user_id].index(waiter)
+        ahead = 0
+        before = True
+        for other, waiters in self.queues.items():
+            if other == user_id:
+                before = False
+            ahead += min(len(waiters), index)
+            if before and len(waiters) > index:
+                ahead += 1
+        return ahead + 1
+
+    def user_position(self, user_id):
+        """Position of the user's next waiting job, or None if nothing is waiting"""
+        waiters = self.queues.get(user_id)
+        return self.position(user_id, waiters[0]) if waiters else None
+
+    async def run(self, user_id, job, on_queued=None):
+        """Run the coroutine function job under the limits; on_queued(position) is awaited if it must wait"""
+        if self.pending.get(user_id, 0) >= self.user_max_pending:
+            self.rejected += 1
+            raise UserQueueFull()
+        retry_after = self._bucket(user_id).take()
+        if retry_after:
+            self.rejected += 1
+            raise RateLimited(retry_after)
+
+        self.pending[user_id] = self.pending.get(user_id, 0) + 1
+        enqueued = time.monotonic()
+        try:
+            if self.running < self.max_concurrent and not self.queues:
+                self.running += 1
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self.queues.setdefault(user_id, deque()).append(waiter)
+                try:
+                    if on_queued:
+                        await on_queued(self.position(user_id, waiter))
+                    # _release hands the slot over by resolving the future
+                    await waiter
+                except BaseException:
+                    if waiter.done() and not waiter.cancelled():
+                        self._release()
+                    else:
+                        waiter.cancel()
+                        self._discard(user_id, waiter)
+                    raise
+                logger.info(f"User {user_id} waited {time.monotonic() - enqueued:.1f}s, "
+                            f"queue depth {self.queue_depth()}, running {self.running}")
+            self.wait_times.append(time.monotonic() - enqueued)
+            try:
+                return await job()
+            finally:
+                self.completed += 1
+                self._release()
+        finally:
+            self.pending[user_id] -= 1
+            if not self.pending[user_id]:
+                del self.pending[user_id]
+
+    def _discard(self, user_id, waiter):
+        waiters = self.queues.get(user_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self.queues[user_id]
+
+    def _release(self):
+        self.running -= 1
+        while self.queues and self.running < self.max_concurrent:
+            user_id, waiters = next(iter(self.queues.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self.queues.move_to_end(user_id)
+            else:
+                del self.queues[user_id]
+            if waiter.cancelled():
+                continue
+            self.running += 1
+            waiter.set_result(None)
+
+    async def drain(self, timeout):
+        """Wait up to timeout seconds for queued and running jobs to finish"""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.pending:
+            logger.warning(f"Shutdown with {self.running} running and {self.queue_depth()} queued jobs unfinished")
+
+    def queue_depth(self):
+        return sum(len(waiters) for waiters in self.queues.values())
+
+    def stats(self):
+        """Queue depth and wait-time summary for monitoring"""
+        waits = sorted(self.wait_times)
+        percentile = lambda q: waits[min(len(waits) - 1, int(len(waits) * q))] if waits else 0.0
+        return {
+            "queue_depth": self.queue_depth(),
+            "waiting_users": len(self.queues),
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_p50_s": percentile(0.5),
+            "wait_p95_s": percentile(0.95),
+        }
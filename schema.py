@@ -0,0 +1,169 @@
+from collections import namedtuple
+
+class InvalidTestFormat(Exception):
+    """Uploaded JSON parsed but is not a test document
+
+    errors lists the ItemErrors found, when the problem is in individual questions.
+    """
+
+    def __init__(self, message, errors=()):
+        super().__init__(message, list(errors))
+        self.message = message
+        self.errors = list(errors)
+
+    def __str__(self):
+        return self.message
+
+class ItemError(namedtuple("ItemError", "index question_id message")):
+    """One problem with one question; index is 0-based, question_id None when unknown"""
+
+    def __str__(self):
+        label = f"Question {self.index + 1}"
+        if self.question_id is not None:
+            label += f" (id {self.question_id!r})"
+        return f"{label}: {self.message}"
+
+# The question format documented in /start: (field, required, allowed types)
+FIELDS = (
+    ("id", True, (str, int)),
+    ("question", True, (str,)),
+    ("options", True, (dict,)),
+    ("answer", True, (str,)),
+    ("solution", False, (str,)),
+    ("plus_marks", False, (int, float)),
+    ("minus_marks", False, (int, float)),
+)
+
+# Numeric ids must survive the page's JavaScript numbers exactly, or ids that round
+# to the same number would share one recorded answer
+MAX_SAFE_ID = 2 ** 53 - 1
+
+TYPE_NAMES = {str: "a string", int: "a number", float: "a number", dict: "an object"}
+
+def _compile_fast_check(fields):
+    """Generate a function that returns an item's id as a string if the item is valid, else None
+
+    Each field becomes inline exact-type tests (`type(v) is str` also rejects bools for
+    the numeric fields), so a valid item costs a handful of dict lookups and no loops
+    beyond its options. Invalid items are re-checked by item_errors for the messages.
+    """
+    lines = ["def fast_check(item):", "    if type(item) is not dict: return None"]
+    for field, required, types in fields:
+        test = " and ".join(f"t is not {kind.__name__}" for kind in types)
+        lines.append(f"    v = item.get({field!r})")
+        lines.append("    t = type(v)")
+        if required:
+            lines.append(f"    if {test}: return None")
+        else:
+            lines.append(f"    if v is not None and {test}: return None")
+        if field == "id":
+            lines.append(f"    if t is int and not -{MAX_SAFE_ID} <= v <= {MAX_SAFE_ID}: return None")
+            lines.append("    question_id = v if t is str else str(v)")
+        elif field == "options":
+            lines.append("    if not v: return None")
+            lines.append("    for text in v.values():")
+            lines.append("        if type(text) is not str: return None")
+            lines.append("    options = v")
+        elif field == "question":
+            lines.append("    if not v.strip(): return None")
+        elif field == "answer":
+            lines.append("    if v not in options: return None")
+        elif field.endswith("_marks"):
+            lines.append("    if v is not None and v < 0: return None")
+    lines.append("    return question_id")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["fast_check"]
+
+_fast_check = _compile_fast_check(FIELDS)
+
+def item_errors(item):
+    """Every problem with one item, as messages; the slow path behind the compiled check"""
+    if not isinstance(item, dict):
+        return ["must be an object"]
+    errors = []
+    for field, required, types in FIELDS:
+        value = item.get(field)
+        if value is None:
+            if required:
+                errors.append(f"'{field}' is missing")
+            continue
+        if type(value) not in types:
+            errors.append(f"'{field}' must be {TYPE_NAMES[types[0]]}, got {type(value).__name__}")
+        elif field == "id" and type(value) is int and abs(value) > MAX_SAFE_ID:
+            errors.append("numeric 'id' must be within ±(2^53 - 1); use a string for larger ids")
+        elif field == "question" and not value.strip():
+            errors.append("'question' is empty")
+        elif field == "options":
+            if not value:
+                errors.append("'options' is empty")
+            bad = [key for key, text in value.items() if type(text) is not str]
+            if bad:
+                errors.append(f"option {bad[0]!r} must be a string")
+        elif field == "answer" and type(item.get("options")) is dict and value not in item["options"]:
+            errors.append(f"'answer' {value!r} is not one of the options {sorted(item['options'])}")
+        elif field.endswith("_marks") and value < 0:
+            errors.append(f"'{field}' must not be negative")
+    return errors
+
+def _display_id(item):
+    question_id = item.get("id") if isinstance(item, dict) else None
+    return question_id if type(question_id) in (str, int) else None
+
+class TestValidator:
+    """One-pass validator for the items of a test, usable on a stream of items
+
+    feed() checks one item and passes it through, so validation can wrap the
+    TestDataStream iterator while the page renders. Errors are collected up to
+    max_errors; beyond that InvalidTestFormat is raised at once.
+    """
+
+    def __init__(self, max_errors=10):
+        self.max_errors = max_errors
+        self.errors = []
+        self.count = 0
+        self.seen_ids = set()
+
+    def feed(self, item):
+        index = self.count
+        self.count += 1
+        question_id = _fast_check(item)
+        if question_id is None:
+            for message in item_errors(item):
+                self._add(ItemError(index, _display_id(item), message))
+            question_id = _display_id(item)
+            if question_id is None:
+                return item
+            question_id = str(question_id)
+        if question_id in self.seen_ids:
+            self._add(ItemError(index, _display_id(item), "duplicate 'id'"))
+        else:
+            self.seen_ids.add(question_id)
+        return item
+
+    def _add(self, error):
+        self.errors.append(error)
+        if len(self.errors) >= self.max_errors:
+            raise InvalidTestFormat(f"Stopped checking after {len(self.errors)} problems", self.errors)
+
+    def check(self, items):
+        """Validate items lazily, yielding each one after it is checked"""
+        for item in items:
+            yield self.feed(item)
+
+    def finish(self):
+        """Raise InvalidTestFormat if any item was invalid or there were no items"""
+        if self.errors:
+            raise InvalidTestFormat(f"{len(self.errors)} problem(s) found", self.errors)
+        if not self.count:
+            raise InvalidTestFormat("'data' array is empty")
+
+def validate_test(json_data, max_errors=10):
+    """Check a parsed test document; raises InvalidTestFormat with item-level errors"""
+    if not isinstance(json_data, dict) or not isinstance(json_data.get('data'), list):
+        raise InvalidTestFormat("Must contain 'data' array")
+    validator = TestValidator(max_errors)
+    feed = validator.feed
+    for item in json_data['data']:
+        feed(item)
+    validator.finish()
@@ -0,0 +1,548 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+from datetime import datetime
+
+from media import IMAGE_MODES, MediaStage
+
+# Theme configurations
+THEMES = {
+    "dark": {
+        "bg_primary": "#0f0f23",
+        "bg_secondary": "#1a1a2e",
+        "bg_card": "#16213e",
+        "text_primary": "#ffffff",
+        "text_secondary": "#b0b0b0",
+        "accent": "#ff6b6b",
+        "accent_hover": "#ff5252",
+        "success": "#2ecc71",
+        "danger": "#e74c3c",
+        "warning": "#f39c12",
+        "border": "#2d3748"
+    },
+    "light": {
+        "bg_primary": "#f8f9fa",
+        "bg_secondary": "#ffffff",
+        "bg_card": "#ffffff",
+        "text_primary": "#2d3748",
+        "text_secondary": "#718096",
+        "accent": "#667eea",
+        "accent_hover": "#5a67d8",
+        "success": "#48bb78",
+        "danger": "#f56565",
+        "warning": "#ed8936",
+        "border": "#e2e8f0"
+    }
+}
+
+DEVICES = ("mobile", "desktop")
+
+# Per-request values; everything else in the page is fixed per (theme, device)
+SLOTS = ("user_id", "question_count", "test_date", "test_data", "solution_block", "media_block", "test_key")
+_SLOT_PATTERN = re.compile("\x00([a-z_]+)\x00")
+
+# Slots filled when a page is sent; left as markers in shared (cacheable) pages.
+# test_key is the page's render cache key, known to streamed renders only at the end
+PERSONAL_SLOTS = ("user_id", "test_date", "test_key")
+_PERSONAL_PATTERN = re.compile(b"\x00(user_id|test_date|test_key)\x00")
+
+# Streamed pages learn the question count only at the end; it is patched into padding
+COUNT_WIDTH = 10
+
+# Page runtime shared by every test and variant
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime')
+with open(os.path.join(RUNTIME_DIR, 'test_page.css'), encoding='utf-8') as f:
+    RUNTIME_CSS = f.read()
+with open(os.path.join(RUNTIME_DIR, 'test_page.js'), encoding='utf-8') as f:
+    RUNTIME_JS = f.read()
+
+# "inline" embeds the runtime as written, "minified" embeds it minified, and
+# "external" links a hashed bundle written by build_assets.py
+ASSET_MODES = ("inline", "minified", "external")
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    """Drop indentation, blank lines and whole-line comments; line contents are left alone"""
+    lines = (line.strip() for line in js.split('\n'))
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+def runtime_bundle():
+    """Minified runtime and its content-hashed file names"""
+    css = minify_css(RUNTIME_CSS)
+    js = minify_js(RUNTIME_JS)
+    return {
+        f"test_page.{hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]}.css": css,
+        f"test_page.{hashlib.sha256(js.encode('utf-8')).hexdigest()[:12]}.js": js,
+    }
+
+def runtime_blocks(assets="inline", asset_base_url=""):
+    """HTML for the runtime CSS and JS in the given asset mode"""
+    if assets == "inline":
+        return f"<style>\n{RUNTIME_CSS}</style>", f"<script>\n{RUNTIME_JS}</script>"
+    if assets == "minified":
+        return f"<style>{minify_css(RUNTIME_CSS)}</style>", f"<script>{minify_js(RUNTIME_JS)}</script>"
+    if assets == "external":
+        # Pages are opened from disk, so a relative link would point at nothing
+        if not asset_base_url:
+            raise ValueError("ASSET_BASE_URL is required when ASSET_MODE is external")
+        css_name, js_name = runtime_bundle()
+        base = asset_base_url.rstrip('/')
+        return (f'<link rel="stylesheet" href="{base}/{css_name}">',
+                f'<script src="{base}/{js_name}"></script>')
+    raise ValueError(f"Unknown asset mode: {assets}")
+
+# "full" embeds the upload as-is; the compact modes keep only what the page reads
+# and move solutions into a block decoded on first use (optionally gzip + base64)
+PAYLOAD_MODES = ("full", "compact", "compact-gzip")
+COMPACT_FIELDS = ("id", "question", "options", "answer", "plus_marks", "minus_marks")
+
+def script_json(value):
+    """JSON for inline <script> data: "<\\/" keeps a "</script>" in a string from closing the element"""
+    return json.dumps(value, ensure_ascii=False).replace('</', '<\\/')
+
+def compact_item(item):
+    if not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in COMPACT_FIELDS if field in item}
+
+class SolutionSpool:
+    """Collects solutions while questions stream past, then emits the lazy solution block"""
+
+    def __init__(self, gzip=False, chunk_size=1 << 16):
+        self.gzip = gzip
+        self.chunk_size = chunk_size
+        self.file = tempfile.SpooledTemporaryFile(max_size=8 << 20)
+        self.count = 0
+
+    def compact(self, items):
+        """Pass items through as compact items, keeping their solutions aside"""
+        for item in items:
+            solution = item.get('solution') if isinstance(item, dict) else None
+            self.file.write(b"," if self.count else b"[")
+            self.file.write(script_json(solution).encode('utf-8'))
+            self.count += 1
+            yield compact_item(item)
+
+    def _read_chunks(self):
+        return iter(lambda: self.file.read(self.chunk_size), b"")
+
+    def chunks(self):
+        """Encode the block; only valid once compact() has been consumed"""
+        self.file.write(b"]" if self.count else b"[]")
+        self.file.seek(0)
+        if self.gzip:
+            yield b'<script type="text/plain" id="solutionData" data-encoding="gzip">'
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+            pending = b""
+            for chunk in self._read_chunks():
+                pending += compressor.compress(chunk)
+                # Encode whole 3-byte groups so the base64 pieces concatenate cleanly
+                cut = len(pending) - len(pending) % 3
+                yield base64.b64encode(pending[:cut])
+                pending = pending[cut:]
+            yield base64.b64encode(pending + compressor.flush())
+        else:
+            yield b'<script type="application/json" id="solutionData">'
+            yield from self._read_chunks()
+        yield b'</script>'
+        self.file.close()
+
+def _stream_test_data(items, trailer=None):
+    """Encode {"data": [...], ...} item by item, matching json.dumps separators"""
+    yield b'{"data": ['
+    for index, item in enumerate(items):
+        if index:
+            yield b', '
+        yield script_json(item).encode('utf-8')
+    yield b']'
+    for name, value in (trailer() if trailer else {}).items():
+        yield f", {script_json(name)}: {script_json(value)}".encode('utf-8')
+    yield b'}'
+
+def device_layout(device):
+    """Device-dependent CSS variable values"""
+    mobile = device == "mobile"
+    return {
+        "container_width": "100%" if mobile else "1400px",
+        "container_padding": "10px" if mobile else "20px",
+        "header_padding": "15px 10px" if mobile else "25px 20px",
+        "logo_font_size": "20px" if mobile else "28px",
+        "logo_icon_size": "24px" if mobile else "32px",
+        "timer_font_size": "14px" if mobile else "16px",
+        "control_grid": "1fr" if mobile else "repeat(auto-fit, minmax(200px, 1fr))",
+        "info_grid": "repeat(2, 1fr)" if mobile else "repeat(4, 1fr)",
+        "main_display": "block" if mobile else "flex",
+        "questions_margin_bottom": "20px" if mobile else "0",
+        "nav_order": "-1" if mobile else "0",
+        "nav_margin_bottom": "20px" if mobile else "0",
+        "nav_flex": "1" if mobile else "0 0 300px",
+        "question_grid_cols": "repeat(5, 1fr)" if mobile else "repeat(6, 1fr)",
+        "question_btn_size": "35px" if mobile else "40px",
+        "info_value_size": "24px" if mobile else "32px",
+        "actions_justify": "space-between" if device == "desktop" else "center",
+        "btn_flex": "1" if mobile else "initial",
+        "btn_min_width": "120px" if mobile else "auto",
+        "btn_justify": "center" if mobile else "normal",
+        "results_grid": "1fr 1fr" if mobile else "repeat(4, 1fr)",
+    }
+
+def _css_block(selector, values):
+    lines = "".join(f"                    --{name.replace('_', '-')}: {value};\n" for name, value in values.items())
+    return f"                {selector} {{\n{lines}                }}\n"
+
+def variant_css():
+    """CSS variables for every theme and device, selected by the data attributes on <html>
+
+    Colors depend only on the theme and layout only on the device, so two blocks
+    of each cover every combination and switching is a single attribute change.
+    """
+    blocks = [_css_block(f':root[data-theme="{theme}"]', colors) for theme, colors in THEMES.items()]
+    blocks += [_css_block(f':root[data-device="{device}"]', device_layout(device)) for device in DEVICES]
+    return "".join(blocks)
+
+def build_page(theme, device, user_id, question_count, test_date, test_data, solution_block="",
+               runtime_css="", runtime_js="", results_url="", media_block="", test_key=""):
+    """Full page f-string; source of the compiled shells and the uncompiled reference path
+
+    theme and device only select the initial view; every variant is in the page.
+    results_url, if set, is where the page reports its result on submit, under test_key.
+    """
+    return f"""
+        <!DOCTYPE html>
+        <html lang="hi" data-theme="{theme}" data-device="{device}">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>🚀 Premium Test Series</title>
+            <style>
+{variant_css()}            </style>
+            {runtime_css}
+        </head>
+        <body>
+            <div class="header">
+                <div class="container">
+                    <div class="header-content">
+                        <div class="logo">
+                            <span class="logo-icon">🚀</span>
+                            Premium Test Series
+                        </div>
+                        <div class="user-info" data-user-id="{user_id}">
+                            <div class="timer" id="timer">03:00:00</div>
+                            <div class="user-label">User: {user_id}</div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+            
+            <div class="container">
+                <!-- Control Panel -->
+                <div class="control-panel fade-in">
+                    <div class="control-grid">
+                        <div class="control-group">
+                            <div class="control-label">🎨 Theme Mode</div>
+                            <div class="btn-group">
+                                <button class="mode-btn {'active' if theme == 'dark' else ''}" data-theme="dark" onclick="switchTheme('dark')">
+                                    🌙 Dark
+                                </button>
+                                <button class="mode-btn {'active' if theme == 'light' else ''}" data-theme="light" onclick="switchTheme('light')">
+                                    ☀️ Light
+                                </button>
+                            </div>
+                        </div>
+                        
+                        <div class="control-group">
+                            <div class="control-label">📱 Device View</div>
+                            <div class="btn-group">
+                                <button class="mode-btn {'active' if device == 'mobile' else ''}" data-device="mobile" onclick="switchDevice('mobile')">
+                                    📱 Mobile
+                                </button>
+                                <button class="mode-btn {'active' if device == 'desktop' else ''}" data-device="desktop" onclick="switchDevice('desktop')">
+                                    🖥️ Desktop
+                                </button>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+                
+                <!-- Test Info -->
+                <div class="test-info fade-in">
+                    <h3 style="margin-bottom: 20px; display: flex; align-items: center; gap: 10px;">
+                        <span>📊</span> Test Overview
+                    </h3>
+                    <div class="info-grid">
+                        <div class="info-item">
+                            <div class="info-value">{question_count}</div>
+                            <div class="info-label">Total Questions</div>
+                        </div>
+                        <div class="info-item">
+                            <div class="info-value">180</div>
+                            <div class="info-label">Minutes</div>
+                        </div>
+                        <div class="info-item">
+                            <div class="info-value">+4/-1</div>
+                            <div class="info-label">Marking</div>
+                        </div>
+                        <div class="info-item">
+                            <div class="info-value" id="testDate">{test_date}</div>
+                            <div class="info-label">Date</div>
+                        </div>
+                    </div>
+                </div>
+                
+                <!-- Main Content -->
+                <div class="main-content">
+                    <div class="question-nav fade-in">
+                        <h3>🧭 Navigation</h3>
+                        <div class="question-grid" id="questionGrid">
+                            <!-- Navigation buttons will be loaded here -->
+                        </div>
+                        
+                        <div class="solution" id="solutionContainer">
+                            <h4>Solution & Explanation</h4>
+                            <div id="solutionText">Select an option to view detailed solution</div>
+                        </div>
+                    </div>
+                    
+                    <div class="questions-section fade-in">
+                        <div class="question" id="questionContainer">
+                            <!-- Question content will be loaded here -->
+                        </div>
+                        
+                        <div class="actions">
+                            <button class="btn btn-secondary" id="prevBtn">
+                                <span>⬅️</span> Previous
+                            </button>
+                            <button class="btn btn-secondary" id="skipBtn">
+                                <span>⏭️</span> Skip
+                            </button>
+                            <button class="btn btn-primary" id="nextBtn">
+                                Next <span>➡️</span>
+                            </button>
+                            <button class="btn btn-success" id="submitBtn">
+                                <span>🚀</span> Submit Test
+                            </button>
+                        </div>
+                    </div>
+                </div>
+            </div>
+
+            <script>
+                // Test data
+                const testData = {test_data};
+                const resultsEndpoint = {script_json(results_url or None)};
+                const testKey = "{test_key}";
+            </script>
+            {runtime_js}
+            {solution_block}
+            {media_block}
+        </body>
+        </html>
+        """
+
+def render_uncompiled(json_data, user_id, theme="dark", device="desktop"):
+    """Render a page the old way: rebuild every value and the whole f-string per call"""
+    return build_page(
+        theme,
+        device,
+        user_id,
+        len(json_data['data']),
+        datetime.now().strftime('%d/%m/%Y'),
+        script_json(json_data),
+        "",
+        *runtime_blocks()
+    ).encode('utf-8')
+
+class CompiledTemplate:
+    """Page shell for one (theme, device) pair, split into static byte chunks and slots"""
+
+    def __init__(self, theme, device, runtime_css="", runtime_js="", results_url=""):
+        self.theme = theme
+        self.device = device
+        shell = build_page(
+            theme,
+            device,
+            runtime_css=runtime_css,
+            runtime_js=runtime_js,
+            results_url=results_url,
+            **{slot: f"\x00{slot}\x00" for slot in SLOTS}
+        )
+        parts = _SLOT_PATTERN.split(shell)
+        # re.split alternates static text and captured slot names
+        self.chunks = [part.encode('utf-8') for part in parts[0::2]]
+        self.slots = parts[1::2]
+
+    def write(self, values, out):
+        """Stream the page to out; a slot value may be bytes or an iterable of byte chunks"""
+        out.write(self.chunks[0])
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            value = values[slot]
+            if isinstance(value, bytes):
+                out.write(value)
+            else:
+                for part in value:
+                    out.write(part)
+            out.write(chunk)
+
+    def render(self, values):
+        """Join the prebuilt chunks with encoded slot values"""
+        out = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            out.append(values[slot])
+            out.append(chunk)
+        return b"".join(out)
+
+class TemplateEngine:
+    """Compiles every theme/device shell once and renders pages from them"""
+
+    def __init__(self, assets="inline", asset_base_url="", results_url="", images="off", image_max_side=1280,
+                 fetch_remote_images=False, image_cache_dir=None, image_cache_bytes=256 * 1024 * 1024):
+        runtime_css, runtime_js = runtime_blocks(assets, asset_base_url)
+        if images not in IMAGE_MODES:
+            raise ValueError(f"Unknown image mode: {images}")
+        self.images = images
+        self.image_max_side = image_max_side
+        self.fetch_remote_images = fetch_remote_images
+        self.image_cache_dir = image_cache_dir
+        self.image_cache_bytes = image_cache_bytes
+        self.templates = {
+            (theme, device): CompiledTemplate(theme, device, runtime_css, runtime_js, results_url)
+            for theme in THEMES
+            for device in DEVICES
+        }
+        # Changes whenever the compiled output would; part of every render cache key
+        digest = hashlib.sha256()
+        for key in sorted(self.templates):
+            for chunk in self.templates[key].chunks:
+                digest.update(chunk)
+        # Image handling changes the embedded data, not the shells
+        digest.update(f"|{images}|{image_max_side}|{fetch_remote_images}".encode('utf-8'))
+        self.fingerprint = digest.hexdigest()[:16]
+
+    def media_stage(self):
+        """Per-page MediaStage, or None when images are left in the markup"""
+        if self.images == "off":
+            return None
+        return MediaStage(
+            self.images, self.image_max_side, self.fetch_remote_images, self.image_cache_dir, self.image_cache_bytes
+        )
+
+    def data_values(self, json_data, payload="full"):
+        """Encode the values that depend only on the test data"""
+        values = {"question_count": str(len(json_data['data'])).encode('utf-8')}
+        media = self.media_stage()
+        if media:
+            json_data = {**json_data, 'data': list(media.rewrite_items(json_data['data']))}
+        if payload == "full":
+            values["test_data"] = script_json(json_data).encode('utf-8')
+            values["solution_block"] = b""
+        else:
+            spool = SolutionSpool(gzip=payload == "compact-gzip")
+            values["test_data"] = b"".join(_stream_test_data(spool.compact(json_data['data'])))
+            values["solution_block"] = b"".join(spool.chunks())
+        values["media_block"] = b"".join(media.chunks()) if media else b""
+        return values
+
+    def personal_values(self, user_id, test_key=""):
+        """Encode the values that differ per recipient, and the key results are reported under
+
+        user_id None leaves the user and date blank, so every recipient gets the same
+        bytes; the page then shows no user and the date it is opened on. An empty
+        test_key (a hex content key otherwise) turns result reporting off.
+        """
+        if user_id is None:
+            values = {"user_id": b"", "test_date": b""}
+        else:
+            values = {
+                "user_id": str(user_id).encode('utf-8'),
+                "test_date": datetime.now().strftime('%d/%m/%Y').encode('utf-8'),
+            }
+        values["test_key"] = test_key.encode('ascii')
+        return values
+
+    def render(self, json_data, user_id, theme="dark", device="desktop", payload="full", test_key=""):
+        """Render a test page as UTF-8 bytes"""
+        values = self.data_values(json_data, payload)
+        values.update(self.personal_values(user_id, test_key))
+        return self.templates[(theme, device)].render(values)
+
+    def render_shared(self, json_data, theme="dark", device="desktop", payload="full"):
+        """Render a page with the personal slots left as markers, identical for every recipient"""
+        values = self.data_values(json_data, payload)
+        values.update((slot, b"\x00" + slot.encode('utf-8') + b"\x00") for slot in PERSONAL_SLOTS)
+        return self.templates[(theme, device)].render(values)
+
+    def render_shared_stream(self, items, out, theme="dark", device="desktop", trailer=None, payload="full"):
+        """Stream a shared page to the seekable binary file out while consuming items
+
+        trailer, if given, returns the other top-level fields once items are exhausted.
+        Returns the number of questions written.
+        """
+        count = 0
+
+        def counted():
+            nonlocal count
+            for item in items:
+                count += 1
+                yield item
+
+        count_at = []
+
+        def count_slot():
+            # Runs when the slot is reached; remember where to patch the real count
+            count_at.append(out.tell())
+            yield b" " * COUNT_WIDTH
+
+        values = {"question_count": count_slot()}
+        media = self.media_stage()
+        page_items = media.rewrite_items(counted()) if media else counted()
+        if payload == "full":
+            values["test_data"] = _stream_test_data(page_items, trailer)
+            values["solution_block"] = b""
+        else:
+            spool = SolutionSpool(gzip=payload == "compact-gzip")
+            values["test_data"] = _stream_test_data(spool.compact(page_items))
+            values["solution_block"] = spool.chunks()
+        values["media_block"] = media.chunks() if media else b""
+        values.update((slot, b"\x00" + slot.encode('utf-8') + b"\x00") for slot in PERSONAL_SLOTS)
+        self.templates[(theme, device)].write(values, out)
+        end = out.tell()
+        for offset in count_at:
+            out.seek(offset)
+            out.write(str(count).ljust(COUNT_WIDTH).encode('utf-8'))
+        out.seek(end)
+        return count
+
+    def personalize(self, shared, user_id, test_key=""):
+        """Fill the personal slots of a render_shared page"""
+        values = self.personal_values(user_id, test_key)
+        # json.dumps escapes control characters, so NUL only ever appears in markers
+        return _PERSONAL_PATTERN.sub(lambda match: values[match.group(1).decode('utf-8')], shared)
+
+    def personalize_stream(self, src, dst, user_id, test_key="", chunk_size=1 << 20):
+        """personalize() for pages streamed between binary files"""
+        values = self.personal_values(user_id, test_key)
+        replace = lambda match: values[match.group(1).decode('utf-8')]
+        carry = b""
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            data = carry + chunk
+            # Markers are NUL-delimited pairs; an odd count means one is cut off at the end
+            if data.count(b"\x00") % 2:
+                cut = data.rfind(b"\x00")
+                data, carry = data[:cut], data[cut:]
+            else:
+                carry = b""
+            dst.write(_PERSONAL_PATTERN.sub(replace, data))
+        dst.write(carry)
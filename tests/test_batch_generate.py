@@ -0,0 +1,84 @@
+import os
+import stat
+
+import batch_generate
+from batch_generate import file_hash, find_inputs, load_manifest, plan, save_manifest, write_atomic
+
+SETTINGS = "fingerprint|full|offline"
+VARIANT = "dark/desktop"
+
+def make_inputs(root):
+    (root / "in" / "sub").mkdir(parents=True)
+    paths = []
+    for name in ("a.json", "sub/b.json"):
+        path = root / "in" / name
+        path.write_text('{"data": []}')
+        paths.append(str(path))
+    (root / "in" / "notes.txt").write_text("not a test")
+    return paths
+
+def rendered(root, inputs):
+    """Manifest as main() records it after rendering every input"""
+    output_dir = str(root / "out")
+    manifest = {}
+    for path, st, digest, outputs in plan(inputs, output_dir, {}, SETTINGS, VARIANT):
+        for output_path in outputs.values():
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            write_atomic(output_path, b"<html>")
+        manifest[path] = {"settings": SETTINGS, "variants": outputs, "mtime_ns": st.st_mtime_ns,
+                          "size": st.st_size, "sha256": digest or file_hash(path)}
+    return output_dir, manifest
+
+def test_find_inputs_expands_directories_and_globs(tmp_path):
+    inputs = make_inputs(tmp_path)
+    assert find_inputs([str(tmp_path / "in")]) == sorted(inputs)
+    assert find_inputs([str(tmp_path / "in" / "*.json"), inputs[0]]) == [inputs[0]]
+
+def test_outputs_mirror_the_input_tree(tmp_path):
+    inputs = make_inputs(tmp_path)
+    jobs = plan(inputs, str(tmp_path / "out"), {}, SETTINGS, VARIANT)
+    assert [outputs for _, _, _, outputs in jobs] == [
+        {VARIANT: str(tmp_path / "out" / "a.html")},
+        {VARIANT: str(tmp_path / "out" / "sub" / "b.html")},
+    ]
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    inputs = make_inputs(tmp_path)
+    output_dir, manifest = rendered(tmp_path, inputs)
+    assert plan(inputs, output_dir, manifest, SETTINGS, VARIANT) == []
+
+def test_touched_but_unedited_inputs_are_skipped_and_recorded(tmp_path):
+    inputs = make_inputs(tmp_path)
+    output_dir, manifest = rendered(tmp_path, inputs)
+    os.utime(inputs[0], ns=(1, 1))
+    assert plan(inputs, output_dir, manifest, SETTINGS, VARIANT) == []
+    assert manifest[inputs[0]]["mtime_ns"] == 1
+
+def test_edited_inputs_and_missing_outputs_are_rendered_again(tmp_path):
+    inputs = make_inputs(tmp_path)
+    output_dir, manifest = rendered(tmp_path, inputs)
+    with open(inputs[0], 'a') as f:
+        f.write(" ")
+    os.remove(os.path.join(output_dir, "sub", "b.html"))
+    assert [path for path, _, _, _ in plan(inputs, output_dir, manifest, SETTINGS, VARIANT)] == inputs
+
+def test_new_settings_variant_or_force_render_everything(tmp_path):
+    inputs = make_inputs(tmp_path)
+    output_dir, manifest = rendered(tmp_path, inputs)
+    for settings, variant, force in ((SETTINGS + "x", VARIANT, False), (SETTINGS, "light/mobile", False),
+                                     (SETTINGS, VARIANT, True)):
+        assert len(plan(inputs, output_dir, manifest, settings, variant, force)) == 2
+
+def test_manifest_round_trip_and_corrupt_manifest(tmp_path):
+    save_manifest(str(tmp_path), {"a": {"size": 1}})
+    assert load_manifest(str(tmp_path)) == {"a": {"size": 1}}
+    (tmp_path / batch_generate.MANIFEST_NAME).write_text("{truncated")
+    assert load_manifest(str(tmp_path)) == {}
+
+def test_write_atomic_leaves_no_temp_files_and_a_normal_mode(tmp_path):
+    path = tmp_path / "page.html"
+    write_atomic(str(path), b"first")
+    write_atomic(str(path), b"second")
+    assert path.read_bytes() == b"second"
+    assert os.listdir(tmp_path) == ["page.html"]
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~batch_generate._UMASK
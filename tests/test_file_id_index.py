@@ -0,0 +1,39 @@
+import asyncio
+
+from file_id_index import FileIdIndex, output_key
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_file_ids_are_found_by_output_hash_across_restarts(tmp_path):
+    path = str(tmp_path / "file_ids.sqlite3")
+    index = FileIdIndex(path)
+    page = b"<html>page</html>"
+    assert run(index.get(output_key(page))) is None
+    run(index.put(output_key(page), "FILE-1", len(page)))
+    index.close()
+
+    index = FileIdIndex(path)
+    assert run(index.get(output_key(page))) == "FILE-1"
+    assert run(index.get(output_key(page + b" "))) is None
+    run(index.forget(output_key(page)))
+    assert run(index.get(output_key(page))) is None
+    index.close()
+
+def test_output_key_hashes_files_like_bytes(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_bytes(b"same bytes")
+    assert output_key(page) == output_key(b"same bytes")
+
+def test_oldest_entries_are_dropped_past_the_cap(tmp_path):
+    index = FileIdIndex(str(tmp_path / "file_ids.sqlite3"), max_entries=3)
+    for i in range(5):
+        run(index.put(f"hash{i}", f"FILE-{i}", 1))
+    # Re-sending refreshes an entry
+    run(index.put("hash2", "FILE-2b", 1))
+    run(index.put("hash5", "FILE-5", 1))
+    found = {key: run(index.get(key)) for key in (f"hash{i}" for i in range(6))}
+    assert found == {"hash0": None, "hash1": None, "hash2": "FILE-2b", "hash3": None, "hash4": "FILE-4",
+                     "hash5": "FILE-5"}
+    assert index.entries == 3
+    index.close()
@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+
+import json_stream
+
+DOCUMENTS = [
+    {"data": []},
+    {"data": [{"id": 1, "question": "2 + 2?", "options": {"a": "4", "b": "5"}, "answer": "a"}]},
+    {"title": "Mixed", "data": [1, -2.5e-3, 1e10, True, None, "text", [1, [2]], {"nested": {"x": ""}}], "tail": 7},
+    {"data": [{"question": "Unicode: पाठ   😀 \\\"quoted\\\"", "id": "qé"}] * 20},
+    {"before": {"data": [1]}, "data": [{"id": i, "value": 12345.678 * i} for i in range(200)], "after": [None]},
+]
+
+def read_all(raw, chunk_size):
+    stream = json_stream.TestDataStream(io.BytesIO(raw), chunk_size=chunk_size)
+    return list(stream.items()), stream.extra, stream.has_data
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_matches_json_loads_at_every_chunk_boundary(document, chunk_size, indent):
+    raw = json.dumps(document, ensure_ascii=False, indent=indent).encode('utf-8')
+    items, extra, has_data = read_all(raw, chunk_size)
+    expected = json.loads(raw)
+    assert items == expected.pop("data")
+    assert extra == expected
+    assert has_data
+
+def test_numbers_split_across_chunks_are_not_truncated():
+    raw = b'{"data": [123456789, 1.25e-7, -0.5]}'
+    for chunk_size in range(1, len(raw) + 1):
+        assert read_all(raw, chunk_size)[0] == [123456789, 1.25e-7, -0.5]
+
+def test_byte_order_mark_is_skipped():
+    raw = '\ufeff{"data": [1]}'.encode('utf-8')
+    assert read_all(raw, 1)[0] == json.loads(raw)["data"]
+
+def test_missing_data_array():
+    items, extra, has_data = read_all(b'{"title": "x"}', 4)
+    assert items == [] and extra == {"title": "x"} and not has_data
+
+@pytest.mark.parametrize("raw", [
+    b'',
+    b'{"data": [1]',
+    b'{"data": [1, 2}',
+    b'{"data": [1 2]}',
+    b'{"data": [1]} extra',
+    b'{"data": [1],}',
+    b'{"data": [tru]}',
+    b'{1: 2}',
+])
+def test_malformed_documents_raise_like_json_loads(raw):
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(raw)
+    for chunk_size in (1, 5, 1 << 16):
+        with pytest.raises(json.JSONDecodeError):
+            read_all(raw, chunk_size)
@@ -0,0 +1,142 @@
+import base64
+import http.server
+import ipaddress
+import os
+import socket
+import threading
+import types
+
+import pytest
+
+import media
+from media import MediaStage, fetch_image
+
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+def no_connections(*args, **kwargs):
+    raise AssertionError("fetch_image opened a socket")
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://example.com/a.png",
+    "http:///a.png",
+    "http://127.0.0.1/a.png",
+    "http://localhost/a.png",
+    "http://10.0.0.8/a.png",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/a.png",
+    "http://[::ffff:127.0.0.1]/a.png",
+    "https://192.168.1.1/a.png",
+])
+def test_non_public_urls_are_refused_without_connecting(url, monkeypatch):
+    monkeypatch.setattr(media.socket, "socket", no_connections)
+    assert fetch_image(url) is None
+
+def resolve(table):
+    """getaddrinfo stand-in answering from {host: [address, ...]}"""
+    def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port)) for address in table[host]
+        ]
+    return getaddrinfo
+
+def test_hosts_with_any_private_address_are_refused(monkeypatch):
+    monkeypatch.setattr(media.socket, "getaddrinfo", resolve({"mixed.test": ["93.184.216.34", "10.0.0.1"]}))
+    monkeypatch.setattr(media.socket, "socket", no_connections)
+    assert fetch_image("http://mixed.test/a.png") is None
+
+def test_the_checked_address_is_the_one_connected_to(monkeypatch):
+    answers = iter([["93.184.216.34"], ["127.0.0.1"]])
+    connected = []
+
+    class Socket:
+        def __init__(self, *args):
+            pass
+
+        def settimeout(self, timeout):
+            pass
+
+        def connect(self, address):
+            connected.append(address)
+            raise ConnectionRefusedError()
+
+        def close(self):
+            pass
+
+    # A rebinding resolver: public for the first lookup, private for any later one
+    monkeypatch.setattr(media.socket, "getaddrinfo", lambda host, port, **kwargs: resolve(
+        {host: next(answers)})(host, port))
+    monkeypatch.setattr(media.socket, "socket", Socket)
+    assert fetch_image("http://rebind.test/a.png") is None
+    assert connected == [("93.184.216.34", 80)]
+
+class ImageServer(http.server.BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path.startswith("/redirect/"):
+            self.send_response(302)
+            self.send_header("Location", self.path[len("/redirect/"):].replace(":/", "://", 1))
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png" if self.path.endswith(".png") else "text/html")
+        self.end_headers()
+        self.wfile.write(PNG)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def image_server(monkeypatch):
+    server = http.server.HTTPServer(("127.0.0.1", 0), ImageServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ImageServer.requests = []
+    # images.test is a "public" host served locally; internal.test is private
+    monkeypatch.setattr(media.socket, "getaddrinfo", resolve({"images.test": ["127.0.0.1"], "internal.test": ["10.0.0.1"]}))
+    real = ipaddress.ip_address
+    monkeypatch.setattr(media.ipaddress, "ip_address", lambda address: types.SimpleNamespace(is_global=True)
+                        if address == "127.0.0.1" else real(address))
+    yield f"http://images.test:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_public_images_are_fetched(image_server):
+    assert fetch_image(f"{image_server}/a.png") == ("image/png", PNG)
+    assert fetch_image(f"{image_server}/page.html") is None
+
+def test_redirects_to_private_hosts_or_other_schemes_are_refused(image_server):
+    port = image_server.rsplit(":", 1)[1]
+    assert fetch_image(f"{image_server}/redirect/http:/internal.test:{port}/a.png") is None
+    assert fetch_image(f"{image_server}/redirect/file:/etc/passwd") is None
+    assert fetch_image(f"{image_server}/redirect/{image_server.replace('://', ':/')}/b.png") == ("image/png", PNG)
+    assert ImageServer.requests == ["/redirect/http:/internal.test:%s/a.png" % port, "/redirect/file:/etc/passwd",
+                                    f"/redirect/{image_server.replace('://', ':/')}/b.png", "/b.png"]
+
+def test_each_distinct_image_is_stored_once():
+    uri = "data:image/png;base64," + base64.b64encode(PNG).decode()
+    stage = MediaStage("dedupe")
+    items = [{"question": f'<img src="{uri}"> one', "solution": f"<img src='{uri}'>"}, {"question": "no image"}]
+    rewritten = list(stage.rewrite_items(items))
+    assert uri not in rewritten[0]["question"] and "data-media" in rewritten[0]["question"]
+    assert rewritten[1] == {"question": "no image"}
+    assert len(stage.images) == 1 and stage.references == 2
+
+def test_remote_images_are_left_alone_unless_fetching_is_enabled(monkeypatch):
+    monkeypatch.setattr(media.socket, "socket", no_connections)
+    stage = MediaStage("dedupe")
+    item = {"question": '<img src="http://127.0.0.1/a.png">'}
+    assert list(stage.rewrite_items([item])) == [item]
+
+def test_image_cache_evicts_the_least_recently_used_past_its_cap(tmp_path):
+    cache_dir = str(tmp_path)
+    for i in range(4):
+        with open(os.path.join(cache_dir, f"image{i}-1280"), 'wb') as f:
+            f.write(b"x" * 100)
+        os.utime(os.path.join(cache_dir, f"image{i}-1280"), (1000 + i, 1000 + i))
+    (tmp_path / "writing.tmp").write_bytes(b"y" * 1000)
+    assert media._evict_oldest(cache_dir, 250) == 200
+    assert sorted(os.listdir(cache_dir)) == ["image2-1280", "image3-1280", "writing.tmp"]
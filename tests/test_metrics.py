@@ -0,0 +1,37 @@
+from metrics import Histogram, Metrics
+
+def test_histogram_buckets_are_cumulative_and_end_with_inf():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(0.1, 2), (1, 3), (float('inf'), 4)]
+    assert histogram.count == 4 and histogram.sum == 3.65
+    assert histogram.percentiles(0.5, 1.0) == [0.5, 3]
+
+def test_exposition_format():
+    metrics = Metrics(prefix="bot")
+    metrics.observe_stages({"render": 20.0, "queue": 2.0})
+    metrics.inc("bytes_in_total", 100)
+    metrics.inc("errors_total", type='Bad"Name')
+    metrics.collect("queue_depth", "gauge", "Jobs waiting", lambda: 3)
+    metrics.collect("cache_requests_total", "counter", "Cache lookups", lambda: [({"result": "hit"}, 2.5)])
+    lines = metrics.render().splitlines()
+
+    # Stages are exported in pipeline order, not insertion order
+    assert lines[:2] == ["# HELP bot_stage_seconds Time spent in each stage of handling an uploaded test",
+                         "# TYPE bot_stage_seconds histogram"]
+    assert lines.index('bot_stage_seconds_count{stage="queue"} 1') < lines.index(
+        'bot_stage_seconds_count{stage="render"} 1')
+    assert 'bot_stage_seconds_bucket{stage="render",le="0.025"} 1' in lines
+    assert 'bot_stage_seconds_bucket{stage="render",le="0.01"} 0' in lines
+    assert 'bot_stage_seconds_bucket{stage="render",le="+Inf"} 1' in lines
+    assert 'bot_stage_seconds_sum{stage="render"} 0.02' in lines
+    assert "# TYPE bot_bytes_in_total counter" in lines
+    assert "bot_bytes_in_total 100" in lines
+    assert 'bot_errors_total{type="Bad\\"Name"} 1' in lines
+    assert lines[-6:] == [
+        "# HELP bot_queue_depth Jobs waiting", "# TYPE bot_queue_depth gauge", "bot_queue_depth 3",
+        "# HELP bot_cache_requests_total Cache lookups", "# TYPE bot_cache_requests_total counter",
+        'bot_cache_requests_total{result="hit"} 2.5',
+    ]
+    assert metrics.render().endswith("\n")
@@ -0,0 +1,75 @@
+"""The page's submitTest and analytics.analyze must score the same attempt the same way"""
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from analytics import AnswerKey, analyze
+from results_store import parse_result
+from template_engine import RUNTIME_JS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loads the runtime under benchmarks/fake_dom.js, answers each case, submits and prints the reported records
+DRIVER = """
+const {FakeStorage, loadPage} = require(process.argv[1]);
+const {runtime, cases} = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const records = cases.map(({testData, testKey, picks}) => {
+    const sent = [];
+    const navigator = {sendBeacon: (url, body) => sent.push(JSON.parse(body))};
+    const {context, ready} = loadPage(runtime, testData, new FakeStorage(),
+                                      {resultsEndpoint: 'https://example.com/results', testKey, navigator});
+    ready();
+    context.picks = picks;
+    require('vm').runInContext(`
+        picks.forEach((pick, index) => {
+            if (pick !== null) userAnswers[testData.data[index].id] = pick === '-' ? 'skipped' : 'option' + pick;
+        });
+        submitTest();
+    `, context);
+    return sent;
+});
+console.log(JSON.stringify(records));
+"""
+
+def question(index, answer="a", **marks):
+    return {"id": str(index), "question": f"Q{index}", "options": {"a": "1", "b": "2", "c": "3"},
+            "answer": answer, **marks}
+
+CASES = [
+    # Default, zero (falls back like `|| 4`), fractional and negative marks
+    ([question(1), question(2, plus_marks=0, minus_marks=0), question(3, "b", plus_marks=2.5, minus_marks=0.5),
+      question(4, "c", plus_marks=3, minus_marks=-1)],
+     ["a", "b", "a", "a"]),
+    # Skipped and unanswered questions score nothing
+    ([question(1), question(2), question(3, "b"), question(4, "c")],
+     ["-", None, "b", "-"]),
+    # No answer in the data: every pick is wrong
+    ([{k: v for k, v in question(1).items() if k != "answer"}, question(2, "c", minus_marks=2)],
+     ["a", "c"]),
+    ([question(1, plus_marks=1), question(2, minus_marks=3)],
+     [None, None]),
+]
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_page_and_analytics_score_attempts_alike():
+    cases = [{"testData": {"data": items}, "testKey": f"key{i}", "picks": picks}
+             for i, (items, picks) in enumerate(CASES)]
+    result = subprocess.run(
+        ["node", "-e", DRIVER, os.path.join(ROOT, "benchmarks", "fake_dom.js")],
+        input=json.dumps({"runtime": RUNTIME_JS, "cases": cases}), capture_output=True, text=True, check=True,
+    )
+    for case, sent in zip(cases, json.loads(result.stdout)):
+        assert len(sent) == 1
+        test_key, _, score, correct, incorrect, skipped, _, answers = parse_result(json.dumps(sent[0]))
+        assert test_key == case["testKey"]
+        assert answers == "".join("." if pick is None else pick for pick in case["picks"])
+
+        key = AnswerKey.from_items(test_key, case["testData"]["data"])
+        matrix = np.frombuffer(answers.encode('ascii'), dtype=np.uint8).reshape(1, -1)
+        stats = analyze(key, matrix)
+        assert stats["scores"][0] == pytest.approx(score)
+        assert (stats["correct"][0], stats["incorrect"][0], stats["skipped"][0]) == (correct, incorrect, skipped)
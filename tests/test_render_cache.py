@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+import time
+
+import render_cache
+from render_cache import RenderCache, content_key, disk_path, raw_key
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_pages_expire_from_both_tiers_after_the_ttl(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path), ttl=60)
+    run(cache.put("page", b"<html>"))
+    assert run(cache.get("page")) == b"<html>"
+    assert cache.path_for("page") == disk_path(str(tmp_path), "page")
+
+    later = time.time() + 61
+    monkeypatch.setattr(render_cache.time, "time", lambda: later)
+    assert run(cache.get("page")) is None
+    assert cache.path_for("page") is None
+    assert not os.path.exists(disk_path(str(tmp_path), "page"))
+    assert cache.disk_used == 0
+
+def test_disk_hits_refill_the_memory_tier(tmp_path):
+    writer = RenderCache(str(tmp_path))
+    run(writer.put("page", b"abc"))
+    reader = RenderCache(str(tmp_path))
+    assert reader.disk_used == 3
+    assert run(reader.get("page")) == b"abc"
+    assert "page" in reader.memory
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), memory_bytes=10)
+    for key in ("a", "b"):
+        run(cache.put(key, b"12345"))
+    run(cache.get("a"))
+    run(cache.put("c", b"12345"))
+    assert list(cache.memory) == ["a", "c"]
+    assert cache.memory_used == 10
+
+def test_disk_tier_evicts_oldest_pages_past_its_cap(tmp_path):
+    cache = RenderCache(str(tmp_path), memory_bytes=0, disk_bytes=25)
+    for i in range(5):
+        run(cache.put(f"page{i}", b"x" * 10))
+        # Distinct mtimes, oldest first
+        stamp = time.time() - 100 + i
+        os.utime(disk_path(str(tmp_path), f"page{i}"), (stamp, stamp))
+    on_disk = sorted(name for name in os.listdir(tmp_path) if name.endswith('.html'))
+    assert on_disk == ["page3.html", "page4.html"]
+    assert cache.disk_used == 20 == sum(os.path.getsize(tmp_path / name) for name in on_disk)
+
+def test_pages_over_the_disk_cap_are_not_stored(tmp_path):
+    cache = RenderCache(str(tmp_path), disk_bytes=4)
+    run(cache.put("page", b"too large"))
+    assert cache.path_for("page") is None
+    assert cache.disk_used == 0
+
+def test_adopt_counts_pages_written_by_workers(tmp_path):
+    cache = RenderCache(str(tmp_path), disk_bytes=15)
+    for i in range(2):
+        with open(disk_path(str(tmp_path), f"page{i}"), 'wb') as f:
+            f.write(b"x" * 10)
+        run(cache.adopt(f"page{i}"))
+    assert cache.disk_used == 10
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_content_key_ignores_formatting_but_raw_key_does_not():
+    compact = b'{"data":[{"id":1,"answer":"a"}]}'
+    spaced = b'{"data": [ {"id": 1, "answer": "a"} ]}'
+    assert raw_key(compact, "dark", "desktop") != raw_key(spaced, "dark", "desktop")
+    assert content_key(json.loads(compact), "dark", "desktop") == content_key(json.loads(spaced), "dark", "desktop")
+    assert content_key(json.loads(compact), "dark", "desktop") != content_key(json.loads(compact), "light", "desktop")
+
+def test_temp_files_are_not_counted_and_stale_ones_are_swept(tmp_path):
+    with open(disk_path(str(tmp_path), "page"), 'wb') as f:
+        f.write(b"x" * 10)
+    live = tmp_path / "live.tmp"
+    live.write_bytes(b"y" * 100)
+    stale = tmp_path / "stale.tmp"
+    stale.write_bytes(b"z" * 100)
+    stamp = time.time() - render_cache.STALE_TMP_AGE - 1
+    os.utime(stale, (stamp, stamp))
+
+    cache = RenderCache(str(tmp_path))
+    assert cache.disk_used == 10
+    assert live.exists() and not stale.exists()
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from results_server import MAX_RESULT_BYTES, ResultsServer
+from results_store import InvalidResult, ResultBufferFull, parse_result
+
+RECORD = {"v": 1, "test": "30:ei8boq", "user": "7", "score": 12.5, "correct": 4, "incorrect": 1, "skipped": 0,
+          "time": 300, "answers": "abca-"}
+
+def test_parse_result_returns_the_row_in_field_order():
+    assert parse_result(json.dumps(RECORD)) == ("30:ei8boq", "7", 12.5, 4, 1, 0, 300, "abca-")
+    assert parse_result(json.dumps({"v": 1}).encode()) == ("", "", 0, 0, 0, 0, 0, "")
+
+@pytest.mark.parametrize("payload", [
+    b"not json",
+    b"\xff",
+    json.dumps([RECORD]),
+    json.dumps(dict(RECORD, v=2)),
+    json.dumps(dict(RECORD, score="12")),
+    json.dumps(dict(RECORD, correct=True)),
+    json.dumps(dict(RECORD, correct=1.5)),
+    json.dumps(dict(RECORD, score=1e8)),
+    json.dumps(dict(RECORD, skipped=-2_000_000)),
+    json.dumps(dict(RECORD, test="x" * 65)),
+    json.dumps(dict(RECORD, answers=None)),
+])
+def test_parse_result_rejects_malformed_records(payload):
+    with pytest.raises(InvalidResult):
+        parse_result(payload)
+
+class Store:
+    def __init__(self, capacity=10):
+        self.rows = []
+        self.capacity = capacity
+
+    def add(self, row, source="http"):
+        if len(self.rows) >= self.capacity:
+            raise ResultBufferFull()
+        self.rows.append(row)
+
+def post_all(server, payloads):
+    async def scenario():
+        async with TestClient(TestServer(server.app)) as client:
+            statuses = []
+            for payload in payloads:
+                response = await client.post(server.path, data=payload, headers={"Content-Type": "text/plain"})
+                assert response.headers["Access-Control-Allow-Origin"] == "*"
+                statuses.append(response.status)
+            return statuses
+
+    return asyncio.run(scenario())
+
+def test_results_endpoint_queues_valid_records_and_rejects_the_rest():
+    store = Store(capacity=1)
+    server = ResultsServer(store)
+    payloads = [json.dumps(RECORD), "{}", "x" * (MAX_RESULT_BYTES + 1), json.dumps(RECORD)]
+    assert post_all(server, payloads) == [204, 400, 413, 503]
+    assert len(store.rows) == 1
+    assert server.accepted == 1 and server.rejected == 3
@@ -0,0 +1,57 @@
+import asyncio
+import io
+import json
+
+from analytics import load_answer_key
+from render_cache import content_key
+from render_pool import render_job, render_stream_job
+from results_store import ResultStore
+from template_engine import TemplateEngine
+
+def make_test(plus_marks):
+    return {"data": [
+        {"id": str(i), "question": f"Q{i}", "options": {"a": "1", "b": "2"}, "answer": "a", "plus_marks": plus_marks}
+        for i in range(1, 4)
+    ]}
+
+def test_tests_sharing_ids_and_answers_keep_their_own_answer_keys(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    rendered = [render_job(json.dumps(make_test(marks)), answer_key=True) for marks in (4, 2)]
+    (first, _, _, first_key), (second, _, _, second_key) = rendered
+    assert first != second
+    assert (first_key.test_key, second_key.test_key) == (first, second)
+
+    async def register():
+        store = ResultStore(path)
+        for _, _, _, answers in rendered:
+            await store.register_test(answers)
+        known = await store.has_test(first), await store.has_test("missing")
+        await store.close()
+        return known
+
+    assert asyncio.run(register()) == (True, False)
+    assert load_answer_key(path, first).plus.tolist() == [4.0] * 3
+    assert load_answer_key(path, second).plus.tolist() == [2.0] * 3
+
+def test_streamed_and_in_memory_renders_agree_on_the_key(tmp_path):
+    upload = tmp_path / "upload.json"
+    upload.write_text(json.dumps(make_test(4)))
+    key, _, _, answers = render_job(upload.read_bytes(), answer_key=True)
+    streamed, _, _, streamed_answers = render_stream_job(upload, cache_dir=str(tmp_path), answer_key=True)
+    assert streamed == key
+    assert streamed_answers.test_key == answers.test_key == key
+
+def test_pages_carry_the_key_they_report_under():
+    engine = TemplateEngine(results_url="https://example.com/results")
+    json_data = make_test(4)
+    key = content_key(json_data, "dark", "desktop", "full", engine.fingerprint)
+    shared = engine.render_shared(json_data)
+    assert engine.personalize(shared, None, key) == engine.render(json_data, None, test_key=key)
+
+    page = engine.personalize(shared, 7, key)
+    assert f'const testKey = "{key}";'.encode() in page
+    out = io.BytesIO()
+    engine.personalize_stream(io.BytesIO(shared), out, 7, key, chunk_size=64)
+    assert out.getvalue() == page
+    # No key, no reporting
+    assert b'const testKey = "";' in engine.personalize(shared, 7)
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from scheduler import FairScheduler, RateLimited, TokenBucket, UserQueueFull
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+class Jobs:
+    """Jobs that block until released, recording the order they started in"""
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    def job(self, name):
+        gate = self.gates[name] = asyncio.Event()
+
+        async def job():
+            self.started.append(name)
+            await gate.wait()
+            return name
+        return job
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_one_user_cannot_take_every_slot():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1, user_burst=10, user_max_pending=10)
+        jobs = Jobs()
+        heavy = [asyncio.create_task(scheduler.run("heavy", jobs.job(f"heavy{i}"))) for i in range(4)]
+        await settle()
+        light = asyncio.create_task(scheduler.run("light", jobs.job("light")))
+        await settle()
+        for name in ("heavy0", "heavy1", "light", "heavy2", "heavy3"):
+            assert jobs.started[-1] == name
+            jobs.gates[name].set()
+            await settle()
+        await asyncio.gather(*heavy, light)
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.running == 0 and not scheduler.queues and not scheduler.pending
+
+def test_queued_jobs_report_their_round_robin_position():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1, user_burst=10, user_max_pending=10)
+        jobs = Jobs()
+        positions = []
+
+        async def on_queued(position):
+            positions.append(position)
+
+        tasks = [asyncio.create_task(scheduler.run("a", jobs.job("a0")))]
+        await settle()
+        for user, name in (("a", "a1"), ("a", "a2"), ("b", "b0")):
+            tasks.append(asyncio.create_task(scheduler.run(user, jobs.job(name), on_queued)))
+            await settle()
+        assert scheduler.user_position("b") == 2
+        for gate in jobs.gates.values():
+            gate.set()
+        await asyncio.gather(*tasks)
+        return positions
+
+    assert run(scenario()) == [1, 2, 2]
+
+def test_a_cancelled_waiter_gives_its_slot_back():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1, user_burst=10, user_max_pending=10)
+        jobs = Jobs()
+        first = asyncio.create_task(scheduler.run("a", jobs.job("first")))
+        await settle()
+        waiting = asyncio.create_task(scheduler.run("b", jobs.job("cancelled")))
+        after = asyncio.create_task(scheduler.run("c", jobs.job("after")))
+        await settle()
+        waiting.cancel()
+        await settle()
+        assert scheduler.queue_depth() == 1
+        jobs.gates["first"].set()
+        await settle()
+        assert jobs.started == ["first", "after"]
+        jobs.gates["after"].set()
+        await asyncio.gather(first, after)
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.running == 0 and not scheduler.pending
+
+def test_a_waiter_cancelled_as_its_slot_arrives_passes_it_on():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1, user_burst=10, user_max_pending=10)
+        jobs = Jobs()
+        first = asyncio.create_task(scheduler.run("a", jobs.job("first")))
+        await settle()
+        waiting = asyncio.create_task(scheduler.run("b", jobs.job("cancelled")))
+        after = asyncio.create_task(scheduler.run("c", jobs.job("after")))
+        await settle()
+        # The slot is handed to the waiter, which is cancelled before it can start its job
+        jobs.gates["first"].set()
+        while scheduler.queue_depth() == 2:
+            await asyncio.sleep(0)
+        waiting.cancel()
+        await settle()
+        assert jobs.started == ["first", "after"]
+        jobs.gates["after"].set()
+        await asyncio.gather(first, after)
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.running == 0 and not scheduler.queues
+
+def test_a_failing_job_releases_its_slot():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1)
+
+        async def fail():
+            raise ValueError("render failed")
+
+        with pytest.raises(ValueError):
+            await scheduler.run("a", fail)
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.running == 0 and scheduler.completed == 1
+
+def test_per_user_limits():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1, user_rate=0.01, user_burst=2, user_max_pending=1)
+        jobs = Jobs()
+        task = asyncio.create_task(scheduler.run("a", jobs.job("a0")))
+        await settle()
+        with pytest.raises(UserQueueFull):
+            await scheduler.run("a", jobs.job("a1"))
+        jobs.gates["a0"].set()
+        await task
+        done = asyncio.Event()
+        done.set()
+        await scheduler.run("a", done.wait)
+        with pytest.raises(RateLimited) as raised:
+            await scheduler.run("a", done.wait)
+        assert 0 < raised.value.retry_after <= 100
+        # Other users have buckets of their own
+        await scheduler.run("b", done.wait)
+        return scheduler
+
+    assert run(scenario()).rejected == 2
+
+def test_token_bucket_refills_at_its_rate(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("scheduler.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=0.5, burst=2)
+    assert bucket.take() == 0 and bucket.take() == 0
+    assert bucket.take() == pytest.approx(2.0)
+    now[0] += 2
+    assert bucket.take() == 0
+    now[0] += 100
+    bucket.refill()
+    assert bucket.tokens == 2
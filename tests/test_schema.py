@@ -0,0 +1,73 @@
+import copy
+
+import pytest
+
+import schema
+from schema import InvalidTestFormat, item_errors, validate_test
+
+VALID = {
+    "id": 7,
+    "question": "Which is prime?",
+    "options": {"a": "4", "b": "7"},
+    "answer": "b",
+    "solution": "7 has no divisors but 1 and itself",
+    "plus_marks": 4,
+    "minus_marks": 1.5,
+}
+
+def variants():
+    """The valid item plus one mutation per field and kind of mistake"""
+    yield VALID
+    for field in ("id", "question", "options", "answer"):
+        item = dict(VALID)
+        del item[field]
+        yield item
+    for field in ("solution", "plus_marks", "minus_marks"):
+        item = dict(VALID)
+        del item[field]
+        yield item
+    for field in VALID:
+        for value in (None, True, 1, 2.5, "", "  ", "x", [], {}, {"a": 1}, -1, 2 ** 53, -(2 ** 53) + 1):
+            item = dict(VALID)
+            item[field] = value
+            yield item
+    item = copy.deepcopy(VALID)
+    item["options"]["c"] = None
+    yield item
+    yield "not an object"
+    yield ["a", "list"]
+
+@pytest.mark.parametrize("item", list(variants()))
+def test_compiled_check_agrees_with_item_errors(item):
+    question_id = schema._fast_check(item)
+    errors = item_errors(item)
+    assert (question_id is not None) == (not errors), errors
+    if question_id is not None:
+        assert question_id == str(item["id"])
+
+def test_validate_reports_each_problem_with_its_question():
+    data = [dict(VALID, id=1), dict(VALID, id=2, answer="z"), dict(VALID, id=1)]
+    with pytest.raises(InvalidTestFormat) as raised:
+        validate_test({"data": data})
+    assert [(error.index, error.question_id) for error in raised.value.errors] == [(1, 2), (2, 1)]
+    assert "duplicate 'id'" in str(raised.value.errors[1])
+
+def test_numeric_ids_beyond_javascript_precision_are_rejected():
+    assert item_errors(dict(VALID, id=schema.MAX_SAFE_ID)) == []
+    assert item_errors(dict(VALID, id=schema.MAX_SAFE_ID + 1))
+
+def test_validation_stops_at_max_errors():
+    with pytest.raises(InvalidTestFormat) as raised:
+        validate_test({"data": [{}] * 50}, max_errors=3)
+    assert len(raised.value.errors) == 3
+
+@pytest.mark.parametrize("document", [[], {"data": {}}, {"data": []}, {"items": [VALID]}])
+def test_documents_without_items_are_rejected(document):
+    with pytest.raises(InvalidTestFormat):
+        validate_test(document)
+
+def test_validator_passes_streamed_items_through():
+    items = [dict(VALID, id=i) for i in range(5)]
+    validator = schema.TestValidator()
+    assert list(validator.check(iter(items))) == items
+    validator.finish()
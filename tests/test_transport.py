@@ -0,0 +1,63 @@
+import pytest
+
+from transport import (
+    BOT_API_DOWNLOAD_LIMIT, BOT_API_UPLOAD_LIMIT, MB, MTPROTO_LIMIT, BotApiTransport, FileTooLarge,
+    MTProtoTransport, Transports,
+)
+
+def transports(mode="auto", mtproto=True, threshold=BOT_API_DOWNLOAD_LIMIT, bot_api=None):
+    # The client is never started: routing only looks at the limits
+    mtproto = MTProtoTransport(1, "hash", "token", client=object()) if mtproto else None
+    return Transports(bot_api or BotApiTransport(), mtproto, mode=mode, threshold=threshold)
+
+@pytest.mark.parametrize("size, expected", [
+    (0, "botapi"),
+    (BOT_API_DOWNLOAD_LIMIT, "botapi"),
+    (BOT_API_DOWNLOAD_LIMIT + 1, "mtproto"),
+    (MTPROTO_LIMIT, "mtproto"),
+])
+def test_auto_mode_routes_downloads_by_size(size, expected):
+    assert transports().for_download(size).name == expected
+
+@pytest.mark.parametrize("size, expected", [
+    (BOT_API_DOWNLOAD_LIMIT + 1, "mtproto"),
+    (BOT_API_UPLOAD_LIMIT + 1, "mtproto"),
+])
+def test_auto_mode_routes_uploads_over_the_threshold_to_mtproto(size, expected):
+    assert transports().for_upload(size).name == expected
+
+def test_threshold_above_the_bot_api_limit_still_respects_it():
+    routes = transports(threshold=100 * MB)
+    assert routes.for_upload(BOT_API_UPLOAD_LIMIT).name == "botapi"
+    assert routes.for_upload(BOT_API_UPLOAD_LIMIT + 1).name == "mtproto"
+    assert routes.for_download(BOT_API_DOWNLOAD_LIMIT + 1).name == "mtproto"
+
+def test_local_bot_api_limits_keep_large_files_on_the_bot_api():
+    routes = transports(threshold=100 * MB, bot_api=BotApiTransport(MTPROTO_LIMIT, MTPROTO_LIMIT))
+    assert routes.for_download(50 * MB).name == "botapi"
+    assert routes.for_download(101 * MB).name == "mtproto"
+
+def test_fixed_modes():
+    assert transports(mode="mtproto").for_download(1).name == "mtproto"
+    assert transports(mode="botapi").for_upload(1).name == "botapi"
+    assert transports(mtproto=False).for_upload(1).name == "botapi"
+
+@pytest.mark.parametrize("routes, size, limit", [
+    (transports(mode="botapi"), BOT_API_DOWNLOAD_LIMIT + 1, BOT_API_DOWNLOAD_LIMIT),
+    (transports(mtproto=False), BOT_API_DOWNLOAD_LIMIT + 1, BOT_API_DOWNLOAD_LIMIT),
+    (transports(), MTPROTO_LIMIT + 1, MTPROTO_LIMIT),
+])
+def test_files_over_the_chosen_transports_limit_are_refused(routes, size, limit):
+    with pytest.raises(FileTooLarge) as raised:
+        routes.for_download(size)
+    assert raised.value.limit == limit and raised.value.size == size
+
+def test_upload_limit_applies_to_uploads():
+    with pytest.raises(FileTooLarge):
+        transports(mode="botapi").for_upload(BOT_API_UPLOAD_LIMIT + 1)
+    assert transports(mode="botapi").for_upload(BOT_API_UPLOAD_LIMIT).name == "botapi"
+
+@pytest.mark.parametrize("mode, mtproto", [("carrier pigeon", True), ("mtproto", False)])
+def test_invalid_configurations(mode, mtproto):
+    with pytest.raises(ValueError):
+        transports(mode=mode, mtproto=mtproto)
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import types
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from webhook_server import SECRET_HEADER, WebhookServer
+
+UPDATE = json.dumps({
+    "update_id": 42,
+    "message": {"message_id": 1, "date": 0, "chat": {"id": 7, "type": "private"}, "text": "hi"},
+})
+
+def post_all(server, requests):
+    """Status of each (payload, headers) POSTed to the webhook path"""
+    async def scenario():
+        async with TestClient(TestServer(server.app)) as client:
+            statuses = []
+            for payload, headers in requests:
+                response = await client.post(server.path, data=payload, headers=headers)
+                statuses.append(response.status)
+            return statuses
+
+    return asyncio.run(scenario())
+
+def webhook():
+    application = types.SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+    return WebhookServer(application, secret_token="s3cret")
+
+def test_updates_with_the_secret_token_are_queued():
+    server = webhook()
+    assert post_all(server, [(UPDATE, {SECRET_HEADER: "s3cret"})]) == [200]
+    assert server.received == 1
+    assert server.application.update_queue.get_nowait().update_id == 42
+
+def test_requests_without_the_right_secret_are_rejected():
+    server = webhook()
+    headers = [{}, {SECRET_HEADER: ""}, {SECRET_HEADER: "s3cre"}, {SECRET_HEADER: "s3cret "}, {SECRET_HEADER: "S3CRET"}]
+    assert post_all(server, [(UPDATE, h) for h in headers]) == [403] * len(headers)
+    assert server.rejected == len(headers) and server.received == 0
+    assert server.application.update_queue.empty()
+
+def test_malformed_updates_are_rejected():
+    server = webhook()
+    payloads = ["not json", "[1, 2]", '"text"', b"\xff"]
+    assert post_all(server, [(p, {SECRET_HEADER: "s3cret"}) for p in payloads]) == [400] * len(payloads)
+    assert server.application.update_queue.empty()
@@ -0,0 +1,230 @@
+import asyncio
+import io
+import logging
+import os
+from pathlib import Path
+
+from telegram import InputFile
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Telegram's limits for bots: the Bot API serves downloads up to 20 MB and takes
+# uploads up to 50 MB (a self-hosted telegram-bot-api in --local mode lifts both);
+# MTProto takes up to 2000 MB either way
+BOT_API_DOWNLOAD_LIMIT = 20 * MB
+BOT_API_UPLOAD_LIMIT = 50 * MB
+MTPROTO_LIMIT = 2000 * MB
+
+# MTProto downloads are requested 1 MB at a time, one request in flight per
+# media session; files over PARALLEL_DOWNLOAD_MIN are split into ranges that
+# download on their own sessions at once
+DOWNLOAD_CHUNK = 1 * MB
+PARALLEL_DOWNLOAD_MIN = 10 * MB
+
+TRANSFER_MODES = ("auto", "botapi", "mtproto")
+
+class FileTooLarge(Exception):
+    """The file is over the limit of every transport allowed to move it"""
+
+    def __init__(self, size, limit):
+        super().__init__(f"{size / MB:.1f} MB is over the {limit / MB:.0f} MB limit")
+        self.size = size
+        self.limit = limit
+
+class StaleFileId(Exception):
+    """Telegram no longer accepts a file_id that was sent before"""
+
+class BotApiTransport:
+    """File transfers over the Bot API, through the python-telegram-bot objects of the update"""
+
+    name = "botapi"
+
+    def __init__(self, download_limit=BOT_API_DOWNLOAD_LIMIT, upload_limit=BOT_API_UPLOAD_LIMIT):
+        self.download_limit = download_limit
+        self.upload_limit = upload_limit
+
+    async def download(self, document, path=None):
+        """The document's bytes, or write it to path and return path"""
+        file = await document.get_file()
+        if path is None:
+            return bytes(await file.download_as_bytearray())
+        await file.download_to_drive(path)
+        return path
+
+    async def send_document(self, message, document, filename, caption=None):
+        """Send bytes, a Path or a file_id to message's chat with a Markdown caption; returns the sent file_id"""
+        if isinstance(document, Path):
+            with open(document, 'rb') as f:
+                document = InputFile(f, filename=filename)
+        elif isinstance(document, bytes):
+            document = InputFile(io.BytesIO(document), filename=filename)
+        try:
+            sent = await message.reply_document(document=document, caption=caption, parse_mode='Markdown')
+        except BadRequest as e:
+            if isinstance(document, str):
+                raise StaleFileId(str(e)) from e
+            raise
+        return sent.document.file_id
+
+class MTProtoTransport:
+    """File transfers over MTProto with a Pyrogram client logged in as the same bot
+
+    The client is started on first use and never receives updates; those keep
+    arriving through python-telegram-bot. Both APIs use the same file_ids for a
+    given bot, so files move freely between the two transports. Uploads over
+    10 MB go up in parallel parts and downloads over PARALLEL_DOWNLOAD_MIN in
+    parallel ranges; transmissions (Pyrogram's max_concurrent_transmissions)
+    bounds how many parts of all transfers are in flight at once.
+    """
+
+    name = "mtproto"
+
+    def __init__(self, api_id, api_hash, bot_token, workdir="sessions", transmissions=4, limit=MTPROTO_LIMIT,
+                 client=None):
+        self.api_id = api_id
+        self.api_hash = api_hash
+        self.bot_token = bot_token
+        self.workdir = workdir
+        self.transmissions = transmissions
+        self.download_limit = limit
+        self.upload_limit = limit
+        self._client = client
+        self._lock = asyncio.Lock()
+
+    async def client(self):
+        """The started Pyrogram client, logging in on first use"""
+        async with self._lock:
+            if self._client is None:
+                # Pyrogram is only imported by bots that transfer over MTProto
+                from pyrogram import Client
+                # The session file holds the bot's auth key
+                os.makedirs(self.workdir, mode=0o700, exist_ok=True)
+                self._client = Client(
+                    "transport",
+                    api_id=self.api_id,
+                    api_hash=self.api_hash,
+                    bot_token=self.bot_token,
+                    workdir=self.workdir,
+                    no_updates=True,
+                    max_concurrent_transmissions=self.transmissions
+                )
+            if not self._client.is_connected:
+                await self._client.start()
+                logger.info(f"MTProto transport connected ({self.transmissions} concurrent transmissions)")
+        return self._client
+
+    async def download(self, document, path=None):
+        """The document's bytes, or write it to path and return path"""
+        client = await self.client()
+        size = document.file_size or 0
+        if size > PARALLEL_DOWNLOAD_MIN and self.transmissions > 1:
+            return await self._download_ranges(client, document.file_id, size, path)
+        # stream_media raises on failure, where download_media would return None
+        if path is None:
+            content = bytearray()
+            async for chunk in client.stream_media(document.file_id):
+                content += chunk
+            return bytes(content)
+        with open(path, 'wb') as f:
+            async for chunk in client.stream_media(document.file_id):
+                f.write(chunk)
+        return path
+
+    async def _download_ranges(self, client, file_id, size, path):
+        chunks = -(-size // DOWNLOAD_CHUNK)
+        per_range = -(-chunks // min(self.transmissions, chunks))
+        content = bytearray(size) if path is None else None
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC) if path else None
+
+        async def fetch(first, count):
+            offset = first * DOWNLOAD_CHUNK
+            async for chunk in client.stream_media(file_id, limit=count, offset=first):
+                if fd is None:
+                    content[offset:offset + len(chunk)] = chunk
+                else:
+                    os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+
+        tasks = [
+            asyncio.create_task(fetch(first, min(per_range, chunks - first)))
+            for first in range(0, chunks, per_range)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if fd is not None:
+                os.close(fd)
+        return path if path else bytes(content)
+
+    async def send_document(self, message, document, filename, caption=None):
+        """Send bytes, a Path or a file_id to message's chat with a Markdown caption; returns the sent file_id"""
+        from pyrogram import enums
+        from pyrogram.errors import BadRequest as RpcBadRequest
+        client = await self.client()
+        resend = isinstance(document, str)
+        if isinstance(document, Path):
+            document = str(document)
+        elif isinstance(document, bytes):
+            document = io.BytesIO(document)
+            document.name = filename
+        try:
+            sent = await client.send_document(
+                message.chat_id, document, caption=caption, file_name=filename, parse_mode=enums.ParseMode.MARKDOWN
+            )
+        except RpcBadRequest as e:
+            if resend:
+                raise StaleFileId(str(e)) from e
+            raise
+        return sent.document.file_id
+
+    async def close(self):
+        if self._client is not None and self._client.is_connected:
+            await self._client.stop()
+
+class Transports:
+    """Chooses the transport for each transfer from TRANSFER_MODE and the file size
+
+    In auto mode files over the threshold, or over what the Bot API accepts, go
+    over MTProto and the rest over the Bot API, which needs no second login.
+    """
+
+    def __init__(self, bot_api, mtproto=None, mode="auto", threshold=BOT_API_DOWNLOAD_LIMIT):
+        if mode not in TRANSFER_MODES:
+            raise ValueError(f"Unknown transfer mode: {mode}")
+        if mode == "mtproto" and mtproto is None:
+            raise ValueError("Transfer mode mtproto needs an MTProto transport")
+        self.bot_api = bot_api
+        self.mtproto = mtproto
+        self.mode = mode
+        self.threshold = threshold
+
+    def _pick(self, size, bot_api_limit):
+        if self.mtproto is None or self.mode == "botapi":
+            return self.bot_api
+        if self.mode == "mtproto" or size > min(self.threshold, bot_api_limit):
+            return self.mtproto
+        return self.bot_api
+
+    def for_download(self, size):
+        transport = self._pick(size, self.bot_api.download_limit)
+        if size > transport.download_limit:
+            raise FileTooLarge(size, transport.download_limit)
+        return transport
+
+    def for_upload(self, size):
+        transport = self._pick(size, self.bot_api.upload_limit)
+        if size > transport.upload_limit:
+            raise FileTooLarge(size, transport.upload_limit)
+        return transport
+
+    async def close(self):
+        if self.mtproto:
+            await self.mtproto.close()
@@ -0,0 +1,71 @@
+import hmac
+import json
+import logging
+
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookServer:
+    """Embedded HTTP endpoint that feeds Telegram webhook updates into an Application's update queue
+
+    The request is answered as soon as the update is queued; handlers run on the
+    Application's concurrent update processing. TLS is expected to be terminated
+    by the load balancer or reverse proxy in front of it.
+    """
+
+    def __init__(self, application, path="/telegram", secret_token="", shutdown_timeout=10):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token.encode('utf-8')
+        self.shutdown_timeout = shutdown_timeout
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle_update)
+        self.app.router.add_get("/healthz", self.health)
+        self.runner = None
+        self.received = 0
+        self.rejected = 0
+
+    async def handle_update(self, request):
+        token = request.headers.get(SECRET_HEADER, "").encode('utf-8')
+        if not hmac.compare_digest(token, self.secret_token):
+            self.rejected += 1
+            logger.warning(f"Rejected webhook request from {request.remote}: bad secret token")
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot) if isinstance(data, dict) else None
+        except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Malformed webhook update: {e}")
+            update = None
+        if update is None:
+            self.rejected += 1
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return web.Response()
+
+    async def health(self, request):
+        """Liveness probe for the load balancer"""
+        return web.json_response({
+            "status": "ok",
+            "received": self.received,
+            "rejected": self.rejected,
+            "queued": self.application.update_queue.qsize(),
+        })
+
+    async def start(self, host="0.0.0.0", port=8443):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port, shutdown_timeout=self.shutdown_timeout)
+        await site.start()
+        logger.info(f"Webhook server listening on {host}:{port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting updates; requests already in flight are allowed to finish"""
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None